@@ -0,0 +1,123 @@
+#many games of one size and mode stepped together with numpy, same rules as SimpleGame/GeneralGame
+
+import numpy as np
+
+from sos_logic import (Mode, Player, InvalidMoveError, InvalidLetterError, validate_board_size, validate_mode,
+                       DEFAULT_STARTING_PLAYER, MAX_N, LARGE_MAX_N, EMPTY, S_CELL as S, O_CELL as O)
+
+NO_WINNER = 0
+PAD = 2 #border so neighbour lookups two cells out never leave the array
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1)) #horizontal, vert, diagonal, diagonal
+
+#scores, filled cells and move numbers, also used by sos_dataset, int32 holds the 4 * n * n
+#lines of the largest board
+MAX_BATCH_SIZE = LARGE_MAX_N
+COUNT_DTYPE = np.int32
+
+class BatchGames:
+    def __init__(self, count: int, board_size: int, mode: str | Mode,
+                 starting_player: Player = DEFAULT_STARTING_PLAYER, max_size: int = MAX_N) -> None:
+        validate_board_size(board_size, min(max_size, MAX_BATCH_SIZE))
+        if not isinstance(starting_player, Player):
+            raise ValueError("Invalid player")
+        self.count = count
+        self.board_size = board_size
+        self.mode = validate_mode(mode)
+        self._padded = np.zeros((count, board_size + 2 * PAD, board_size + 2 * PAD), dtype=np.int8)
+        self.current_player = np.full(count, int(starting_player), dtype=np.int8)
+        self.red_score = np.zeros(count, dtype=COUNT_DTYPE)
+        self.blue_score = np.zeros(count, dtype=COUNT_DTYPE)
+        self.filled = np.zeros(count, dtype=COUNT_DTYPE)
+        self.is_over = np.zeros(count, dtype=bool)
+        self.winner = np.full(count, NO_WINNER, dtype=np.int8)
+        self._games = np.arange(count)
+
+    #(K, n, n) view of cells, 0 empty, 1 S, 2 O
+    @property
+    def cells(self) -> np.ndarray:
+        return self._padded[:, PAD:-PAD, PAD:-PAD]
+
+    def empty_mask(self) -> np.ndarray:
+        return self.cells.reshape(self.count, -1) == EMPTY
+
+    #sos lines each move would complete, moves are not placed, padded coords
+    def _new_lines(self, games: np.ndarray, rows: np.ndarray, cols: np.ndarray, letters: np.ndarray) -> np.ndarray:
+        board = self._padded
+        counts = np.zeros(len(games), dtype=COUNT_DTYPE)
+        is_s = letters == S
+        is_o = ~is_s
+        for d_row, d_col in DIRECTIONS:
+            #placed O, must be in middle of SOS
+            before = board[games, rows - d_row, cols - d_col]
+            after = board[games, rows + d_row, cols + d_col]
+            counts += is_o & (before == S) & (after == S)
+            #placed S at start, then at end
+            far_after = board[games, rows + 2 * d_row, cols + 2 * d_col]
+            far_before = board[games, rows - 2 * d_row, cols - 2 * d_col]
+            counts += is_s & (after == O) & (far_after == S)
+            counts += is_s & (before == O) & (far_before == S)
+        return counts
+
+    #apply one move per game, ignored for games already over, returns lines scored per game
+    def apply(self, rows, cols, letters) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.intp)
+        cols = np.asarray(cols, dtype=np.intp)
+        letters = np.asarray(letters, dtype=np.int8)
+        scored = np.zeros(self.count, dtype=COUNT_DTYPE)
+        active = ~self.is_over
+        games = self._games[active]
+        if len(games) == 0:
+            return scored
+        rows, cols, letters = rows[active], cols[active], letters[active]
+
+        n = self.board_size
+        if np.any((rows < 0) | (rows >= n) | (cols < 0) | (cols >= n)):
+            raise InvalidMoveError("Out of bounds")
+        if np.any((letters != S) & (letters != O)):
+            raise InvalidLetterError("Letter must be S or O")
+        rows = rows + PAD
+        cols = cols + PAD
+        if np.any(self._padded[games, rows, cols] != EMPTY):
+            raise InvalidMoveError("Cell is already occupied")
+
+        self._padded[games, rows, cols] = letters
+        self.filled[games] += 1
+        counts = self._new_lines(games, rows, cols, letters)
+        scored[games] = counts
+
+        player = self.current_player[games]
+        red = player == Player.RED
+        self.red_score[games] += np.where(red, counts, 0).astype(COUNT_DTYPE)
+        self.blue_score[games] += np.where(red, 0, counts).astype(COUNT_DTYPE)
+
+        full = self.filled[games] == n * n
+        if self.mode == Mode.SIMPLE:
+            #first sos wins, full board without one is a draw
+            won = counts > 0
+            over = won | full
+            self.winner[games[won]] = player[won]
+        else:
+            over = full
+            done = games[over]
+            red_score = self.red_score[done]
+            blue_score = self.blue_score[done]
+            self.winner[done] = np.where(red_score > blue_score, int(Player.RED),
+                                         np.where(blue_score > red_score, int(Player.BLUE), NO_WINNER))
+        self.is_over[games[over]] = True
+        #no turn switch after game over
+        switch = games[~over]
+        self.current_player[switch] = 3 - self.current_player[switch]
+        return scored
+
+    #uniform random empty cell and letter for each game still running
+    def random_moves(self, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        weights = rng.random((self.count, self.board_size * self.board_size))
+        weights[~self.empty_mask()] = -1.0
+        flat = weights.argmax(axis=1)
+        letters = rng.integers(S, O + 1, size=self.count, dtype=np.int8)
+        return flat // self.board_size, flat % self.board_size, letters
+
+    def play_random(self, rng: np.random.Generator) -> None:
+        while not self.is_over.all():
+            self.apply(*self.random_moves(rng))
@@ -0,0 +1,153 @@
+#benchmarks for game logic and opponent hot paths, run from the sos folder:
+#python -m sos_bench --save baseline.json, later python -m sos_bench --baseline baseline.json
+
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Callable
+
+from sos_logic import start_game, Board, Mode, MIN_N, MAX_N
+from sos_computer import EasyComputerOpponent
+
+#name -> (setup returning the timed callable, operations per call)
+Bench = Callable[[], tuple[Callable[[], object], int]]
+
+def _random_position(board_size: int, filled: int, seed: int, mode: Mode = Mode.GENERAL):
+    rng = random.Random(seed)
+    game = start_game(board_size=board_size, mode=mode)
+    cells = game.board.empty_cells()
+    rng.shuffle(cells)
+    for row, col in cells[:filled]:
+        game.make_move(row, col, rng.choice("SO"))
+    return game
+
+def bench_board_place() -> tuple[Callable[[], object], int]:
+    cells = [(row, col) for row in range(MAX_N) for col in range(MAX_N)]
+    def run() -> None:
+        board = Board(MAX_N)
+        for row, col in cells:
+            board.place(row, col, "S")
+    return run, len(cells)
+
+def bench_new_lines(board_size: int) -> Bench:
+    def setup() -> tuple[Callable[[], object], int]:
+        game = _random_position(board_size, board_size * board_size // 2, seed=board_size)
+        moves = [(row, col, letter) for row, col in game.board.empty_cells() for letter in ("S", "O")]
+        player = game.current_player
+        def run() -> None:
+            for row, col, letter in moves:
+                game.new_lines_from_move(row, col, letter, player)
+        return run, len(moves)
+    return setup
+
+def bench_is_full() -> tuple[Callable[[], object], int]:
+    board = _random_position(MAX_N, MAX_N * MAX_N - 1, seed=1).board
+    def run() -> None:
+        for _ in range(100):
+            board.is_full()
+    return run, 100
+
+def bench_random_game(board_size: int, mode: Mode) -> Bench:
+    def setup() -> tuple[Callable[[], object], int]:
+        rng = random.Random(board_size)
+        def run() -> None:
+            game = start_game(board_size=board_size, mode=mode)
+            while not game.is_over:
+                row, col = rng.choice(game.board.empty_cells())
+                game.place_letter(row, col, rng.choice("SO"))
+        return run, 1
+    return setup
+
+def bench_easy_choose_move() -> tuple[Callable[[], object], int]:
+    game = _random_position(MAX_N, MAX_N * MAX_N // 4, seed=2)
+    computer = EasyComputerOpponent(game.current_player)
+    random.seed(0)
+    return (lambda: computer.choose_move(game)), 1
+
+def default_benchmarks() -> dict[str, Bench]:
+    benches: dict[str, Bench] = {
+        "board_place": bench_board_place,
+        "is_full": bench_is_full,
+        "easy_choose_move_8": bench_easy_choose_move,
+    }
+    for size in range(MIN_N, MAX_N + 1):
+        benches[f"new_lines_from_move_{size}"] = bench_new_lines(size)
+        for mode in Mode:
+            benches[f"random_game_{mode}_{size}"] = bench_random_game(size, mode)
+    return benches
+
+#best of repeats, each repeat runs for at least min_time
+def measure(bench: Bench, repeat: int = 5, min_time: float = 0.05) -> dict:
+    run, ops = bench()
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        best = min(best, time.perf_counter() - start)
+    return {"seconds_per_op": best / (loops * ops), "ops": loops * ops}
+
+def run_benchmarks(names: list[str] | None = None, repeat: int = 5, min_time: float = 0.05) -> dict[str, dict]:
+    benches = default_benchmarks()
+    if names:
+        unknown = [name for name in names if name not in benches]
+        if unknown:
+            raise ValueError(f"Unknown benchmarks: {', '.join(unknown)}")
+        benches = {name: benches[name] for name in names}
+    return {name: measure(bench, repeat, min_time) for name, bench in benches.items()}
+
+#benchmarks slower than baseline by more than tolerance (0.25 = 25%), name -> ratio
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float = 0.25) -> dict[str, float]:
+    regressions: dict[str, float] = {}
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["seconds_per_op"] / baseline[name]["seconds_per_op"]
+        if ratio > 1 + tolerance:
+            regressions[name] = ratio
+    return regressions
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="sos_bench", description="Benchmark SOS game logic")
+    parser.add_argument("names", nargs="*", help="benchmarks to run, default all")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per repeat")
+    parser.add_argument("--save", help="write results JSON to this file")
+    parser.add_argument("--baseline", help="compare against a saved results file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing")
+    parser.add_argument("--list", action="store_true", help="list benchmark names")
+    return parser
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.list:
+        print("\n".join(default_benchmarks()))
+        return 0
+    results = run_benchmarks(args.names or None, args.repeat, args.min_time)
+    print(json.dumps(results, indent=2))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, ratio in sorted(regressions.items()):
+            print(f"REGRESSION {name}: {ratio:.2f}x slower than baseline", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+#opening book built from game records, run from the sos folder:
+#python -m sos_selfplay --games 2000 --sizes 6 --red hard:time_limit=0.2 --blue hard:time_limit=0.2 --record games.sos
+#python -m sos_book games.sos --out book.sosb --max-ply 8
+#positions are keyed by canonical zobrist hash and moves stored on the canonical board, so the
+#8 symmetric copies of an opening share their statistics
+
+import argparse
+import mmap
+import struct
+from dataclasses import dataclass
+from typing import Iterable
+
+from sos_logic import BaseGame, transform_cell, untransform_cell
+from sos_record import GameRecord, read_records
+from sos_search import Move
+
+MAGIC = b"SOSB\x01"
+HEADER = struct.Struct("<5sxxxQ") #magic, entry count
+ENTRY = struct.Struct("<QIIII") #canonical key, move code, plays, wins, draws, sorted by key then move
+
+@dataclass(frozen=True, slots=True)
+class BookMove:
+    move: Move
+    plays: int
+    wins: int
+    draws: int
+
+    #expected result for the player making the move, win 1, draw 1/2
+    @property
+    def score(self) -> float:
+        return (self.wins + self.draws / 2) / self.plays
+
+def _move_code(row: int, col: int, letter: str, board_size: int) -> int:
+    return (row * board_size + col) * 2 + (1 if letter == "O" else 0)
+
+def _code_move(code: int, board_size: int) -> Move:
+    row, col = divmod(code >> 1, board_size)
+    return row, col, "O" if code & 1 else "S"
+
+class BookBuilder:
+    def __init__(self, max_ply: int = 10) -> None:
+        self.max_ply = max_ply
+        self.games = 0
+        #(key, move code) -> [plays, wins, draws]
+        self.stats: dict[tuple[int, int], list[int]] = {}
+
+    #replay the record and credit the first max_ply moves with the final result
+    def add_record(self, record: GameRecord) -> None:
+        game = record.replay()
+        winner = game.winner
+        for _ in range(len(record.moves)):
+            game.unmake_move()
+        size = game.board_size
+        for row, col, letter in record.moves[:self.max_ply]:
+            #on a symmetric position equivalent moves are merged into the smallest code
+            key, transforms = game.canonical_transforms()
+            code = min(_move_code(*transform_cell(transform, row, col, size), letter, size) for transform in transforms)
+            stats = self.stats.setdefault((key, code), [0, 0, 0])
+            stats[0] += 1
+            if winner is None:
+                stats[2] += 1
+            elif winner == game.current_player:
+                stats[1] += 1
+            game.make_move(row, col, letter)
+        self.games += 1
+
+    def add_game(self, game: BaseGame) -> None:
+        self.add_record(GameRecord.from_game(game))
+
+    #moves seen fewer than min_plays times are left out, returns entries written
+    def write(self, path: str, min_plays: int = 1) -> int:
+        entries = sorted((key, code, *stats) for (key, code), stats in self.stats.items() if stats[0] >= min_plays)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(entries)))
+            for entry in entries:
+                f.write(ENTRY.pack(*entry))
+        return len(entries)
+
+#sorted book file, mapped on first lookup and binary searched
+class OpeningBook:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            magic, self.count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an opening book")
+        self._file = None
+        self._map: mmap.mmap | None = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _mapped(self) -> mmap.mmap:
+        if self._map is None:
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    #first entry with this key or after it
+    def _lower_bound(self, data: mmap.mmap, key: int) -> int:
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if ENTRY.unpack_from(data, HEADER.size + middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    #book moves for the position, mapped back to the real board
+    def lookup(self, game: BaseGame) -> list[BookMove]:
+        if not self.count:
+            return []
+        data = self._mapped()
+        key, transform = game.canonical_zobrist()
+        size = game.board_size
+        moves = []
+        index = self._lower_bound(data, key)
+        while index < self.count:
+            entry_key, code, plays, wins, draws = ENTRY.unpack_from(data, HEADER.size + index * ENTRY.size)
+            if entry_key != key:
+                break
+            row, col, letter = _code_move(code, size)
+            if row < size: #a key from another board size can only match by chance
+                row, col = untransform_cell(transform, row, col, size)
+                moves.append(BookMove((row, col, letter), plays, wins, draws))
+            index += 1
+        return moves
+
+    #best scoring legal move played at least min_plays times, more plays breaks ties
+    def best_move(self, game: BaseGame, min_plays: int = 1) -> Move | None:
+        candidates = [m for m in self.lookup(game) if m.plays >= min_plays and game.board.is_empty(*m.move[:2])]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda m: (m.score, m.plays)).move
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+            self._file = None
+
+def build_book(records: Iterable[GameRecord], path: str, max_ply: int = 10, min_plays: int = 1) -> int:
+    builder = BookBuilder(max_ply)
+    for record in records:
+        builder.add_record(record)
+    return builder.write(path, min_plays)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="sos_book", description="Build an opening book from game records")
+    parser.add_argument("records", nargs="+", help="sos_record files, binary or .jsonl")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--max-ply", type=int, default=10, help="moves per game to add")
+    parser.add_argument("--min-plays", type=int, default=1, help="drop moves seen fewer times")
+    return parser
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    builder = BookBuilder(args.max_ply)
+    for path in args.records:
+        for record in read_records(path):
+            builder.add_record(record)
+    count = builder.write(args.out, args.min_plays)
+    print(f"{count} book moves from {builder.games} games")
+    return count
+
+if __name__ == "__main__":
+    main()
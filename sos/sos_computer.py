@@ -1,33 +1,37 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+import math
+import os
 import random
+import threading
+import time
 
-from sos_logic import BaseGame, Player
+from sos_logic import BaseGame, Player, Mode, transform_cell, untransform_cell
+from sos_search import TranspositionTable, Bound, Move
+from sos_tablebase import Tablebase
+from sos_book import OpeningBook
 
 class ComputerOpponent(ABC):
     def __init__(self, side: Player):
         self.side = side
 
+    #time_limit is seconds per move, opponents without search ignore it
     @abstractmethod
-    def choose_move(self, game: BaseGame) -> tuple[int, int, str]:
+    def choose_move(self, game: BaseGame, time_limit: float | None = None) -> tuple[int, int, str]:
         ...
 
-class EasyComputerOpponent(ComputerOpponent):
-    def choose_move(self, game: BaseGame) -> tuple[int, int, str]:
-        board = game.board
-        size = board.board_size
+    #called from another thread when the game being searched is abandoned, searching opponents return early
+    def stop(self) -> None:
+        pass
 
-        scoring_moves: list[tuple[int, int, str]] = []
-        empty_cells: list[tuple[int, int]] = []
+    #think on the other side's turn until stop_event is set, opponents without search return at once
+    def ponder(self, game: BaseGame, stop_event: threading.Event) -> Move | None:
+        return None
 
-        #loop through cells
-        for row in range(size):
-            for col in range(size):
-                if not board.is_empty(row, col):
-                    continue
-                empty_cells.append((row, col))
-                for letter in ("S", "O"):
-                    if game.new_lines_from_move(row, col, letter, self.side):
-                        scoring_moves.append((row, col, letter))
+class EasyComputerOpponent(ComputerOpponent):
+    def choose_move(self, game: BaseGame, time_limit: float | None = None) -> tuple[int, int, str]:
+        scoring_moves = [(row, col, letter) for row, col, letter, _ in game.scoring_moves()]
+        empty_cells = game.board.empty_cells()
 
         #choose random scoring move
         if scoring_moves:
@@ -39,4 +43,415 @@ class EasyComputerOpponent(ComputerOpponent):
         letter = random.choice(["S", "O"])
         return row, col, letter
 
+WIN_SCORE = 10_000
+INFINITY = 1_000_000
+
+class _SearchTimeout(Exception):
+    pass
+
+#negamax alpha-beta with iterative deepening, values are from the side to move
+class HardComputerOpponent(ComputerOpponent):
+    def __init__(self, side: Player, time_limit: float | None = 1.0, node_limit: int | None = None,
+                 max_depth: int | None = None, table: TranspositionTable | None = None, symmetry: bool = True):
+        super().__init__(side)
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.max_depth = max_depth
+        self.table = table if table is not None else TranspositionTable() #pass one table to share it
+        #key the table by canonical hash so the 8 symmetric copies of a position share one entry
+        self.symmetry = symmetry
+        self.nodes = 0
+        self.depth_reached = 0
+        self._deadline: float | None = None
+        self._stopped = False
+        self._ponder_event: threading.Event | None = None
+        #reply predicted by the last ponder, hits count the times the other side played it
+        self.ponder_move: Move | None = None
+        self.ponder_hits = 0
+
+    def choose_move(self, game: BaseGame, time_limit: float | None = None) -> tuple[int, int, str]:
+        if self.ponder_move is not None and game.history:
+            row, col = game.history[-1][:2]
+            if (row, col, game.board.get_cell(row, col)) == self.ponder_move:
+                self.ponder_hits += 1
+        self.ponder_move = None
+        limit = self.time_limit if time_limit is None else time_limit
+        return self._iterate(game, time.perf_counter() + limit if limit is not None else None)
+
+    #search while the other side is to move until stop_event is set, every reply and the positions after it
+    #land in the table for the next choose_move, returns the predicted reply
+    def ponder(self, game: BaseGame, stop_event: threading.Event) -> Move | None:
+        if game.is_over or game.board.is_full():
+            return None
+        self._ponder_event = stop_event
+        try:
+            self.ponder_move = self._iterate(game, None)
+        finally:
+            self._ponder_event = None
+        return self.ponder_move
+
+    #iterative deepening, starts from the depth already in the table for this position
+    def _iterate(self, game: BaseGame, deadline: float | None) -> Move:
+        key, transform = self._table_key(game)
+        entry = self.table.probe(key)
+        tt_move = self._from_table(entry.move, transform, game) if entry is not None else None
+        moves = self._ordered_moves(game, tt_move, shuffle=True)
+        if not moves:
+            raise RuntimeError("Not empty")
+        self._deadline = deadline
+        self._stopped = False #a stop only ends the search it interrupted
+        self.nodes = 0
+        self.depth_reached = 0
+        self.table.new_search()
+
+        best = moves[0]
+        max_depth = game.board_size * game.board_size - game.board.filled_count
+        if self.max_depth is not None:
+            max_depth = min(max_depth, self.max_depth)
+        first_depth = 1
+        if entry is not None and tt_move in moves:
+            first_depth = max(1, min(entry.depth, max_depth)) #earlier depths were searched already
+        base = len(game.history)
+        for depth in range(first_depth, max_depth + 1):
+            try:
+                value, move = self._search_root(game, moves, depth)
+            except _SearchTimeout:
+                #unwind the moves the interrupted search left on the board
+                while len(game.history) > base:
+                    game.unmake_move()
+                break
+            best = move
+            self.depth_reached = depth
+            #previous best goes first next iteration
+            moves.remove(move)
+            moves.insert(0, move)
+            if abs(value) >= WIN_SCORE:
+                break #result is decided
+        return best
+
+    def stop(self) -> None:
+        self._stopped = True
+
+    def _check_budget(self) -> None:
+        if self._stopped or (self._ponder_event is not None and self._ponder_event.is_set()):
+            raise _SearchTimeout
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise _SearchTimeout
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise _SearchTimeout
+
+    def _search_root(self, game: BaseGame, moves: list[Move], depth: int) -> tuple[int, Move]:
+        alpha = -INFINITY
+        best_move = moves[0]
+        for move in moves:
+            value = self._child_value(game, move, depth, alpha, INFINITY)
+            if value > alpha:
+                alpha = value
+                best_move = move
+        key, transform = self._table_key(game)
+        self.table.store(key, depth, alpha, Bound.EXACT, self._to_table(best_move, transform, game))
+        return alpha, best_move
+
+    def _table_key(self, game: BaseGame) -> tuple[int, int]:
+        if self.symmetry:
+            return game.canonical_zobrist()
+        return game.zobrist, 0
+
+    #table moves are stored on the canonical board
+    @staticmethod
+    def _to_table(move: Move | None, transform: int, game: BaseGame) -> Move | None:
+        if move is None or transform == 0:
+            return move
+        row, col = transform_cell(transform, move[0], move[1], game.board_size)
+        return row, col, move[2]
+
+    @staticmethod
+    def _from_table(move: Move | None, transform: int, game: BaseGame) -> Move | None:
+        if move is None or transform == 0:
+            return move
+        row, col = untransform_cell(transform, move[0], move[1], game.board_size)
+        return row, col, move[2]
+
+    def _negamax(self, game: BaseGame, depth: int, alpha: int, beta: int) -> int:
+        self.nodes += 1
+        if depth == 0:
+            if self.nodes & 1023 == 0:
+                self._check_budget()
+            return self._evaluate(game)
+        #interior nodes walk every empty cell, on large boards 1024 of them take seconds
+        self._check_budget()
+
+        alpha_orig = alpha
+        key, transform = self._table_key(game)
+        tt_move = None
+        entry = self.table.probe(key)
+        if entry is not None:
+            tt_move = self._from_table(entry.move, transform, game)
+            if entry.depth >= depth:
+                if entry.bound == Bound.EXACT:
+                    return entry.value
+                if entry.bound == Bound.LOWER:
+                    alpha = max(alpha, entry.value)
+                else:
+                    beta = min(beta, entry.value)
+                if alpha >= beta:
+                    return entry.value
+
+        best_value = -INFINITY
+        best_move = None
+        for move in self._ordered_moves(game, tt_move):
+            value = self._child_value(game, move, depth, alpha, beta)
+            if value > best_value:
+                best_value = value
+                best_move = move
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+
+        if best_value <= alpha_orig:
+            bound = Bound.UPPER
+        elif best_value >= beta:
+            bound = Bound.LOWER
+        else:
+            bound = Bound.EXACT
+        self.table.store(key, depth, best_value, bound, self._to_table(best_move, transform, game))
+        return best_value
+
+    def _child_value(self, game: BaseGame, move: Move, depth: int, alpha: int, beta: int) -> int:
+        row, col, letter = move
+        player = game.current_player
+        game.make_move(row, col, letter)
+        if game.is_over:
+            value = self._terminal_value(game, player)
+        else:
+            #turns always alternate so the child value flips sign
+            value = -self._negamax(game, depth - 1, -beta, -alpha)
+        game.unmake_move()
+        return value
+
+    @staticmethod
+    def _score_diff(game: BaseGame, player: Player) -> int:
+        diff = game.red_score - game.blue_score
+        return diff if player == Player.RED else -diff
+
+    def _terminal_value(self, game: BaseGame, player: Player) -> int:
+        if game.winner is None:
+            result = 0
+        else:
+            result = WIN_SCORE if game.winner == player else -WIN_SCORE
+        if game.mode == Mode.GENERAL:
+            return result + self._score_diff(game, player) #prefer bigger margins
+        return result
+
+    #leaf, simple: side to move wins if it can score, general: score difference
+    def _evaluate(self, game: BaseGame) -> int:
+        if game.mode == Mode.SIMPLE:
+            return WIN_SCORE if game.board.open_threats else 0
+        return self._score_diff(game, game.current_player)
+
+    #scoring moves first (most lines first), then quiet moves, gift moves last
+    def _ordered_moves(self, game: BaseGame, tt_move: Move | None, shuffle: bool = False) -> list[Move]:
+        board = game.board
+        size = board.board_size
+        threat_counts = (board.s_threats, board.o_threats)
+        gift_counts = (board.s_gifts, board.o_gifts)
+        scoring: list[tuple[int, Move]] = []
+        quiet: list[Move] = []
+        gifts: list[Move] = []
+        for row, col in board.empty_cells():
+            index = row * size + col
+            for letter, threats, gift in zip("SO", threat_counts, gift_counts):
+                count = threats[index]
+                if count:
+                    scoring.append((count, (row, col, letter)))
+                elif gift[index]:
+                    gifts.append((row, col, letter))
+                else:
+                    quiet.append((row, col, letter))
+        if shuffle:
+            random.shuffle(quiet)
+            random.shuffle(gifts)
+        scoring.sort(key=lambda item: item[0], reverse=True)
+        moves = [move for _, move in scoring] + quiet + gifts
+        if tt_move is not None and tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        return moves
+
+#uct tree node, value is summed reward for the player who made move
+class _Node:
+    __slots__ = ("move", "parent", "player", "children", "untried", "visits", "value")
+
+    def __init__(self, move: Move | None, parent: "_Node | None", player: Player | None, untried: list[Move]):
+        self.move = move
+        self.parent = parent
+        self.player = player
+        self.children: list[_Node] = []
+        self.untried = untried
+        self.visits = 0
+        self.value = 0.0
+
+    def select_child(self, exploration: float) -> "_Node":
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.value / child.visits
+                   + exploration * math.sqrt(log_visits / child.visits))
+
+def _legal_moves(game: BaseGame, rng: random.Random) -> list[Move]:
+    moves = [(row, col, letter) for row, col in game.board.empty_cells() for letter in ("S", "O")]
+    rng.shuffle(moves)
+    return moves
+
+def _reward(game: BaseGame, player: Player) -> float:
+    if game.winner is None:
+        return 0.5
+    return 1.0 if game.winner == player else 0.0
+
+#one uct search from the root, returns {move: (visits, value)} and playouts run, top level so workers can pickle it
+def _uct_search(game: BaseGame, playouts: int, time_limit: float | None, exploration: float,
+                seed: int | None) -> tuple[dict[Move, tuple[int, float]], int]:
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    base = len(game.history)
+    root = _Node(None, None, None, _legal_moves(game, rng))
+    done = 0
+    while done < playouts and (deadline is None or time.perf_counter() < deadline):
+        node = root
+        #selection
+        while not node.untried and node.children:
+            node = node.select_child(exploration)
+            game.make_move(*node.move)
+        #expansion
+        if node.untried and not game.is_over:
+            move = node.untried.pop()
+            player = game.current_player
+            game.make_move(*move)
+            child = _Node(move, node, player, [] if game.is_over else _legal_moves(game, rng))
+            node.children.append(child)
+            node = child
+        #random playout
+        while not game.is_over:
+            row, col = rng.choice(game.board.empty_cells())
+            game.make_move(row, col, "S" if rng.random() < 0.5 else "O")
+        #backpropagation
+        while node is not None:
+            node.visits += 1
+            if node.player is not None:
+                node.value += _reward(game, node.player)
+            node = node.parent
+        while len(game.history) > base:
+            game.unmake_move()
+        done += 1
+    return {child.move: (child.visits, child.value) for child in root.children}, done
+
+#monte carlo tree search, root parallel across worker processes
+class MCTSComputerOpponent(ComputerOpponent):
+    def __init__(self, side: Player, playouts: int = 5000, exploration: float = math.sqrt(2),
+                 time_limit: float | None = 1.0, workers: int | None = 1, seed: int | None = None):
+        super().__init__(side)
+        self.playouts = playouts
+        self.exploration = exploration
+        self.time_limit = time_limit
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self._rng = random.Random(seed)
+        self._executor: ProcessPoolExecutor | None = None
+        self.last_playouts = 0
+        self.playouts_per_second = 0.0
+
+    def choose_move(self, game: BaseGame, time_limit: float | None = None) -> tuple[int, int, str]:
+        if not game.board.empty_cells():
+            raise RuntimeError("Not empty")
+        #a scoring move ends simple games, no need to search
+        if game.mode == Mode.SIMPLE:
+            for row, col, letter, _ in game.scoring_moves():
+                return row, col, letter
+
+        limit = self.time_limit if time_limit is None else time_limit
+        start = time.perf_counter()
+        if self.workers <= 1:
+            results = [_uct_search(game, self.playouts, limit, self.exploration, self._rng.getrandbits(32))]
+        else:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            share = max(1, self.playouts // self.workers)
+            futures = [self._executor.submit(_uct_search, game, share, limit, self.exploration,
+                                             self._rng.getrandbits(32)) for _ in range(self.workers)]
+            results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+
+        #merge root statistics, most visited move wins
+        totals: dict[Move, list[float]] = {}
+        self.last_playouts = 0
+        for stats, done in results:
+            self.last_playouts += done
+            for move, (visits, value) in stats.items():
+                total = totals.setdefault(move, [0, 0.0])
+                total[0] += visits
+                total[1] += value
+        self.playouts_per_second = self.last_playouts / elapsed if elapsed > 0 else 0.0
+        if not totals:
+            row, col = random.choice(game.board.empty_cells())
+            return row, col, random.choice(["S", "O"])
+        return max(totals, key=lambda move: (totals[move][0], totals[move][1]))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+#plays from a solved tablebase, only for the board size and mode it was built for
+class PerfectComputerOpponent(ComputerOpponent):
+    def __init__(self, side: Player, tablebase: Tablebase | str):
+        super().__init__(side)
+        self.tablebase = Tablebase(tablebase) if isinstance(tablebase, str) else tablebase
+
+    #value of the move for the player making it, same scale as the tablebase
+    def _move_value(self, game: BaseGame, row: int, col: int, letter: str) -> int:
+        scored = game.make_move(row, col, letter)
+        try:
+            if game.mode == Mode.SIMPLE and scored:
+                return 1
+            child = 0 if game.board.is_full() else self.tablebase.lookup(game.board.cells)
+            if child is None:
+                raise ValueError("Position missing from tablebase")
+            return scored - child if game.mode == Mode.GENERAL else -child
+        finally:
+            game.unmake_move()
+
+    def choose_move(self, game: BaseGame, time_limit: float | None = None) -> tuple[int, int, str]:
+        if not self.tablebase.covers(game):
+            size = self.tablebase.board_size
+            raise ValueError(f"Tablebase is for {self.tablebase.mode} games on {size}x{size} boards")
+        empty_cells = game.board.empty_cells()
+        if not empty_cells:
+            raise RuntimeError("Not empty")
+        values = {(row, col, letter): self._move_value(game, row, col, letter)
+                  for row, col in empty_cells for letter in ("S", "O")}
+        best = max(values.values())
+        return random.choice([move for move, value in values.items() if value == best])
+
+#plays book moves while the position is in the book, then hands over to another opponent
+class OpeningBookOpponent(ComputerOpponent):
+    def __init__(self, side: Player, book: OpeningBook | str, fallback: ComputerOpponent | str = "hard",
+                 min_plays: int = 1):
+        super().__init__(side)
+        self.book = OpeningBook(book) if isinstance(book, str) else book
+        if isinstance(fallback, str):
+            fallback = {"easy": EasyComputerOpponent, "hard": HardComputerOpponent,
+                        "mcts": MCTSComputerOpponent}[fallback](side)
+        self.fallback = fallback
+        self.min_plays = min_plays
+        self.book_moves = 0
+
+    def choose_move(self, game: BaseGame, time_limit: float | None = None) -> tuple[int, int, str]:
+        move = self.book.best_move(game, self.min_plays)
+        if move is not None:
+            self.book_moves += 1
+            return move
+        return self.fallback.choose_move(game, time_limit)
+
+    def stop(self) -> None:
+        self.fallback.stop()
 
+    def ponder(self, game: BaseGame, stop_event: threading.Event) -> Move | None:
+        return self.fallback.ponder(game, stop_event)
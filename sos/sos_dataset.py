@@ -0,0 +1,129 @@
+#fixed stride position datasets in .npy files, opened with mmap for zero-copy random access
+#one row per position before each move: S/O planes, side to move, scores, move played and final outcome
+
+from typing import BinaryIO, Iterable
+
+import numpy as np
+
+from sos_logic import BaseGame, Mode, Player, S_CELL, O_CELL, validate_board_size
+from sos_batch import COUNT_DTYPE, MAX_BATCH_SIZE
+from sos_record import GameRecord, read_records
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+
+def position_dtype(board_size: int) -> np.dtype:
+    return np.dtype([
+        ("planes", np.uint8, (2, board_size, board_size)), #plane 0 S, plane 1 O
+        ("side_to_move", np.int8), #Player value
+        ("mode", np.int8), #0 simple, 1 general
+        ("move_number", COUNT_DTYPE),
+        ("red_score", COUNT_DTYPE),
+        ("blue_score", COUNT_DTYPE),
+        ("move", np.int32), #cell index * 2 + (1 if O) played from this position
+        ("outcome", np.int8), #final result for side to move, 1 win, 0 draw, -1 loss
+    ])
+
+#npy header padded to a fixed size so the row count can be rewritten in place on close
+def _npy_header(dtype: np.dtype, count: int, size: int | None = None) -> bytes:
+    text = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (count,)})
+    if size is None:
+        longest = len(NPY_MAGIC) + 2 + len(text) + len(str(2 ** 63)) + 1
+        size = (longest + 63) // 64 * 64
+    text = text.ljust(size - len(NPY_MAGIC) - 2 - 1) + "\n"
+    return NPY_MAGIC + len(text).to_bytes(2, "little") + text.encode("latin1")
+
+class PositionWriter:
+    def __init__(self, path: str, board_size: int, buffer_rows: int = 4096) -> None:
+        validate_board_size(board_size, MAX_BATCH_SIZE)
+        self.board_size = board_size
+        self.dtype = position_dtype(board_size)
+        self.count = 0
+        self._buffer = np.zeros(buffer_rows, dtype=self.dtype)
+        self._buffered = 0
+        self._file: BinaryIO = open(path, "wb")
+        self._header = _npy_header(self.dtype, 0)
+        self._file.write(self._header)
+
+    def _flush_buffer(self) -> None:
+        if self._buffered:
+            self._file.write(self._buffer[:self._buffered].tobytes())
+            self._buffered = 0
+
+    def _row(self) -> np.void:
+        if self._buffered == len(self._buffer):
+            self._flush_buffer()
+        row = self._buffer[self._buffered]
+        self._buffered += 1
+        self.count += 1
+        return row
+
+    #replay a record and write one row per position
+    def add_record(self, record: GameRecord) -> int:
+        if record.board_size != self.board_size:
+            raise ValueError(f"Dataset holds {self.board_size}x{self.board_size} positions")
+        game = record.replay()
+        winner = game.winner
+        for _ in range(len(record.moves)):
+            game.unmake_move()
+        size = self.board_size
+        for number, (row, col, letter) in enumerate(record.moves):
+            out = self._row()
+            cells = np.frombuffer(game.board.cells, dtype=np.uint8).reshape(size, size)
+            out["planes"][0] = cells == S_CELL
+            out["planes"][1] = cells == O_CELL
+            out["side_to_move"] = game.current_player
+            out["mode"] = 1 if game.mode == Mode.GENERAL else 0
+            out["move_number"] = number
+            out["red_score"] = game.red_score
+            out["blue_score"] = game.blue_score
+            out["move"] = (row * size + col) * 2 + (1 if letter == "O" else 0)
+            out["outcome"] = 0 if winner is None else (1 if winner == game.current_player else -1)
+            game.make_move(row, col, letter)
+        return len(record.moves)
+
+    def add_game(self, game: BaseGame) -> int:
+        return self.add_record(GameRecord.from_game(game))
+
+    def close(self) -> None:
+        self._flush_buffer()
+        self._file.seek(0)
+        self._file.write(_npy_header(self.dtype, self.count, len(self._header)))
+        self._file.close()
+
+    def __enter__(self) -> "PositionWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+#stream game records (sos_record files) of one board size into a dataset, returns rows written
+def export_records(records: Iterable[GameRecord] | str, path: str, board_size: int) -> int:
+    if isinstance(records, str):
+        records = read_records(records)
+    with PositionWriter(path, board_size) as writer:
+        for record in records:
+            if record.board_size == board_size:
+                writer.add_record(record)
+        return writer.count
+
+class PositionDataset:
+    def __init__(self, path: str) -> None:
+        self.data = np.load(path, mmap_mode="r")
+        self.board_size = self.data.dtype["planes"].shape[-1]
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    #contiguous rows as a view of the mapped file, nothing is copied
+    def batch(self, start: int, stop: int) -> np.ndarray:
+        return self.data[start:stop]
+
+    def field(self, name: str, start: int = 0, stop: int | None = None) -> np.ndarray:
+        return self.data[name][start:stop]
+
+    #random rows, gathered into memory
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        return self.data[np.sort(rng.integers(0, len(self.data), size=size))]
+
+    def side_to_move(self, index: int) -> Player:
+        return Player(int(self.data["side_to_move"][index]))
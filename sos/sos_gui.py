@@ -1,11 +1,26 @@
-from PyQt5.QtCore import Qt, QRect, pyqtSignal
-from PyQt5.QtGui import QPainter, QPen, QFont
-from PyQt5.QtWidgets import (QWidget, QMainWindow, QLabel, QGroupBox, QRadioButton,
+import copy
+import threading
+
+from PyQt5.QtCore import Qt, QRect, QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QPainter, QPen, QFont, QPixmap
+from PyQt5.QtWidgets import (QWidget, QMainWindow, QLabel, QGroupBox, QRadioButton, QScrollArea, QCheckBox,
                              QSpinBox, QPushButton, QVBoxLayout, QHBoxLayout, QMessageBox, QButtonGroup)
 
 from sos_logic import start_game, Mode, InvalidMoveError, InvalidGameModeError, InvalidBoardSizeError, \
-    InvalidLetterError, Player
-from sos_computer import EasyComputerOpponent
+    InvalidLetterError, Player, MIN_N, MAX_N
+from sos_computer import ComputerOpponent, EasyComputerOpponent, HardComputerOpponent
+
+#seconds the hard computer may think per move
+COMPUTER_MOVE_TIME = 1.0
+#default milliseconds before each computer move so computer vs computer games can be followed
+COMPUTER_MOVE_DELAY = 300
+MAX_MOVE_DELAY = 5000
+#largest board offered in the size box, boards past MAX_N shrink cells and then scroll
+GUI_MAX_N = 64
+DEFAULT_CELL_SIZE = 35
+BOARD_MARGIN = 5
+MIN_CELL_SIZE = 12
+BOARD_PIXELS = MAX_N * DEFAULT_CELL_SIZE #boards are shrunk to fit this before scrolling
 
 
 class GameBoard(QWidget):
@@ -15,26 +30,57 @@ class GameBoard(QWidget):
     def __init__(self, parent: QWidget | None = None) -> None:
         super().__init__(parent)
         self._game = None
-        self._cell_size = 35
-        self._margin = 5
+        self._cell_size = DEFAULT_CELL_SIZE
+        self._margin = BOARD_MARGIN
+        #empty grid per (board size, cell size), copied into the board pixmap on each new game
+        self._grid_cache: dict[tuple[int, int], QPixmap] = {}
+        #grid with every drawn letter and line, paintEvent only copies the dirty part of it to the screen
+        self._pixmap: QPixmap | None = None
+        self._drawn_moves = 0
+        self._drawn_lines = 0
+        self._font = QFont()
+        self._line_pens: dict[Player, QPen] = {}
         self._init_minimum_size()
 
     def _init_minimum_size(self) -> None:
-        max_board_size = 8
-        side = max_board_size * self._cell_size + 2 * self._margin
-        self.setMinimumSize(side, side)
+        side = BOARD_PIXELS + 2 * self._margin
+        self.setFixedSize(side, side)
 
+    #cells shrink to fit large boards down to MIN_CELL_SIZE, past that the scroll area takes over
     def _update_board_size(self) -> None:
         if not self._game:
             return
-        side = self._game.board_size * self._cell_size + 2 * self._margin
-        self.setMinimumSize(side, side)
+        board_size = self._game.board_size
+        self._cell_size = max(MIN_CELL_SIZE, min(DEFAULT_CELL_SIZE, BOARD_PIXELS // board_size))
+        side = max(board_size * self._cell_size, BOARD_PIXELS) + 2 * self._margin
+        self.setFixedSize(side, side)
+        #font and pens depend only on the cell size
+        self._font = QFont()
+        self._font.setPointSize(max(6, self._cell_size // 2))
+        self._line_pens = {}
+        for player, color in ((Player.RED, Qt.red), (Player.BLUE, Qt.blue)):
+            pen = QPen(color)
+            pen.setWidth(max(1, self._cell_size // 12))
+            self._line_pens[player] = pen
 
     def set_game(self, game) -> None:
         self._game = game
         self._update_board_size()
+        self._rebuild()
         self.update() #repaint event, calls paintEvent()
 
+    #draw moves made since the last call onto the pixmap and repaint only the cells and lines they touched
+    def refresh(self) -> None:
+        if not self._game:
+            return
+        if self._pixmap is None or len(self._game.history) < self._drawn_moves:
+            self._rebuild() #moves were undone
+            self.update()
+            return
+        dirty = self._draw_new()
+        if not dirty.isNull():
+            self.update(dirty)
+
     def _board_geometry(self) -> tuple[int, int, int, int]:
         board_size = self._game.board_size
         cell_size = self._cell_size
@@ -42,15 +88,53 @@ class GameBoard(QWidget):
         size = board_size * cell_size
         return board_size, cell_size, margin, size
 
+    def _rebuild(self) -> None:
+        board_size, cell, margin, size = self._board_geometry()
+        grid = self._grid_cache.get((board_size, cell))
+        if grid is None:
+            grid = self._grid_cache[(board_size, cell)] = self._new_pixmap(max(size, BOARD_PIXELS) + 2 * margin)
+            painter = QPainter(grid)
+            self._draw_grid(painter, board_size, cell, margin, size)
+            painter.end()
+        self._pixmap = grid.copy()
+        self._drawn_moves = 0
+        self._drawn_lines = 0
+        self._draw_new()
+
+    def _new_pixmap(self, side: int) -> QPixmap:
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(int(side * ratio), int(side * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(self.palette().color(self.backgroundRole()))
+        return pixmap
+
+    def _draw_new(self) -> QRect:
+        _, cell, margin, _ = self._board_geometry()
+        history = self._game.history
+        lines = self._game.lines
+        dirty = QRect()
+        if self._drawn_moves == len(history) and self._drawn_lines == len(lines):
+            return dirty
+        painter = QPainter(self._pixmap)
+        dirty = dirty.united(self._draw_letters(painter, history[self._drawn_moves:], cell, margin))
+        dirty = dirty.united(self._draw_sos_lines(painter, lines[self._drawn_lines:], cell, margin))
+        painter.end()
+        self._drawn_moves = len(history)
+        self._drawn_lines = len(lines)
+        return dirty
+
     def paintEvent(self, event) -> None:
-        if not self._game:
+        if not self._game or self._pixmap is None:
             return
         painter = QPainter(self)
-        board_size, cell, margin, size = self._board_geometry()
+        rect = event.rect()
+        painter.drawPixmap(rect, self._pixmap, self._source_rect(rect))
 
-        self._draw_grid(painter, board_size, cell, margin, size)
-        self._draw_letters(painter, board_size, cell, margin)
-        self._draw_sos_lines(painter, cell, margin)
+    #widget rect to pixmap pixels on high dpi screens
+    def _source_rect(self, rect: QRect) -> QRect:
+        ratio = self._pixmap.devicePixelRatioF()
+        return QRect(int(rect.x() * ratio), int(rect.y() * ratio), int(rect.width() * ratio),
+                     int(rect.height() * ratio))
 
     def _draw_grid(self, painter: QPainter, board_size: int, cell: int, margin: int, size: int) ->None:
         pen = QPen(Qt.black)
@@ -64,37 +148,27 @@ class GameBoard(QWidget):
             y = margin + i * cell #hortizontal
             painter.drawLine(margin, y, margin + size, y)
 
-    def _draw_letters(self, painter: QPainter, board_size: int, cell: int, margin: int) ->None:
-        #draw letter for S and O
-        font = QFont()
-        font.setPointSize(18)
-        painter.setFont(font)
-        for row in range(board_size): #value in position
-            for col in range(board_size):
-                value = self._game.board.get_cell(row, col)
-                if value:
-                    rect = QRect(margin + col * cell, margin + row * cell, cell, cell) #cell rectangle coord
-                    painter.drawText(rect, Qt.AlignCenter, value)
-
-    def _draw_sos_lines(self, painter: QPainter, cell: int, margin: int) ->None:
-        if not self._game:
-            return
-
-        segments = self._game.get_lines()
-        if not segments:
-            return
-
-        line_pen = QPen()
-        line_pen.setWidth(3)
+    #draw letter for S and O in the cells of the given history entries, returns the area drawn
+    def _draw_letters(self, painter: QPainter, moves, cell: int, margin: int) -> QRect:
+        painter.setFont(self._font)
+        painter.setPen(Qt.black)
+        dirty = QRect()
+        for row, col, *_ in moves:
+            value = self._game.board.get_cell(row, col)
+            if value:
+                rect = QRect(margin + col * cell, margin + row * cell, cell, cell) #cell rectangle coord
+                painter.drawText(rect, Qt.AlignCenter, value)
+                dirty = dirty.united(rect)
+        return dirty
+
+    def _draw_sos_lines(self, painter: QPainter, segments, cell: int, margin: int) -> QRect:
+        dirty = QRect()
         #color by owner
         for segment in segments:
-            if segment.player == Player.RED:
-                line_pen.setColor(Qt.red)
-            elif segment.player == Player.BLUE:
-                line_pen.setColor(Qt.blue)
-            else:
+            pen = self._line_pens.get(segment.player)
+            if pen is None:
                 continue
-            painter.setPen(line_pen)
+            painter.setPen(pen)
 
             #grid coords to pixel center
             start_row, start_col = segment.start
@@ -105,6 +179,10 @@ class GameBoard(QWidget):
             y2 = margin + end_row * cell + cell // 2
 
             painter.drawLine(x1, y1, x2, y2)
+            pad = pen.width() + 1
+            dirty = dirty.united(QRect(min(x1, x2) - pad, min(y1, y2) - pad, abs(x2 - x1) + 2 * pad,
+                                       abs(y2 - y1) + 2 * pad))
+        return dirty
 
     def mousePressEvent(self, event) -> None:
         if not self._game:
@@ -126,17 +204,48 @@ class GameBoard(QWidget):
 
         self.cell_clicked.emit(row,col)
 
+#lives on its own thread and runs choose_move there, the move comes back to the gui thread as a signal
+class ComputerWorker(QObject):
+    move_ready = pyqtSignal(int, int, int, str) #request id, row, col, letter
+    failed = pyqtSignal(int, str)
+
+    @pyqtSlot(int, object, object, object)
+    def think(self, request: int, computer: ComputerOpponent, game, time_limit) -> None:
+        try:
+            row, col, letter = computer.choose_move(game, time_limit=time_limit)
+        except Exception as e: #shown by the window, the thread keeps running
+            self.failed.emit(request, str(e))
+            return
+        self.move_ready.emit(request, row, col, letter)
+
+    #runs until the event is set, think requests queue behind it and start once it returns
+    @pyqtSlot(object, object, object)
+    def ponder(self, computer: ComputerOpponent, game, stop_event: threading.Event) -> None:
+        try:
+            computer.ponder(game, stop_event)
+        except Exception: #pondering is only a head start, the real search reports errors
+            pass
+
 #main app window
 class MainWindow(QMainWindow):
+    think_requested = pyqtSignal(int, object, object, object) #request id, computer, game copy, time limit
+    ponder_requested = pyqtSignal(object, object, object) #computer, game copy, stop event
+
     def __init__(self) -> None:
         super().__init__()
         self.game = None #hold current game instance
 
-        self.computers: dict[Player, EasyComputerOpponent] = {}
+        self.computers: dict[Player, ComputerOpponent] = {}
+        self.move_time_limit = COMPUTER_MOVE_TIME
+        #answers carrying an older request id belong to an abandoned game and are dropped
+        self._request = 0
+        self._thinking = False
+        self._ponder_event: threading.Event | None = None
 
         self._setup_window()
         self._create_widget()
         self._create_layout()
+        self._create_worker()
         self._signals()
         self._start_new_game()
 
@@ -146,11 +255,20 @@ class MainWindow(QMainWindow):
     def _create_widget(self) -> None:
         self.mode_box = self._create_mode_box()
         self.size_box = self._create_size_box()
+        self.delay_box = self._create_delay_box()
         self.new_button = QPushButton("Start new game")
         self.board_widget = GameBoard() #board placement
+        self.board_scroll = QScrollArea()
+        self.board_scroll.setWidget(self.board_widget)
+        self.board_scroll.setWidgetResizable(False)
+        self.board_scroll.setAlignment(Qt.AlignCenter)
+        viewport = BOARD_PIXELS + 2 * BOARD_MARGIN + 4
+        self.board_scroll.setMinimumSize(viewport, viewport)
         # s/o picker
-        self.red_box, self.red_human, self.red_computer, self.red_s, self.red_o = self._create_player_box("Red")
-        self.blue_box, self.blue_human, self.blue_computer, self.blue_s, self.blue_o = self._create_player_box("Blue")
+        (self.red_box, self.red_human, self.red_computer, self.red_hard,
+         self.red_s, self.red_o) = self._create_player_box("Red")
+        (self.blue_box, self.blue_human, self.blue_computer, self.blue_hard,
+         self.blue_s, self.blue_o) = self._create_player_box("Blue")
         self.red_s.setChecked(True)
         self.blue_s.setChecked(True)
         self.red_human.setChecked(True)
@@ -169,6 +287,20 @@ class MainWindow(QMainWindow):
         root_layout.addWidget(self.turn_label)
         self.setCentralWidget(root)
 
+    def _create_worker(self) -> None:
+        self.worker_thread = QThread(self)
+        self.worker = ComputerWorker()
+        self.worker.moveToThread(self.worker_thread)
+        self.think_requested.connect(self.worker.think) #queued, runs on the worker thread
+        self.ponder_requested.connect(self.worker.ponder)
+        self.worker.move_ready.connect(self._on_computer_move)
+        self.worker.failed.connect(self._on_computer_failed)
+        self.worker_thread.finished.connect(self.worker.deleteLater)
+        self.worker_thread.start()
+        self.move_timer = QTimer(self)
+        self.move_timer.setSingleShot(True)
+        self.move_timer.timeout.connect(self._request_computer_move)
+
     def _signals(self) -> None:
         self.new_button.clicked.connect(self._start_new_game) #add start_new_game method
         self.board_widget.cell_clicked.connect(self._on_cell_clicked)
@@ -185,20 +317,36 @@ class MainWindow(QMainWindow):
         return mode_box
 
     def _create_size_box(self) -> QGroupBox:
-        #QSpinBox only allows values between 3-8 regardless of input, arrows wont go outside this range
+        #QSpinBox only allows values between MIN_N and GUI_MAX_N regardless of input, arrows wont go outside this range
         size_box = QGroupBox("Board Size")
         self.size_spin = QSpinBox()
-        self.size_spin.setRange(3, 8)
+        self.size_spin.setRange(MIN_N, GUI_MAX_N)
         self.size_spin.setValue(3)
         layout_size = QVBoxLayout()
         layout_size.addWidget(self.size_spin)
         size_box.setLayout(layout_size)
         return size_box
 
+    def _create_delay_box(self) -> QGroupBox:
+        delay_box = QGroupBox("Computer")
+        self.delay_spin = QSpinBox()
+        self.delay_spin.setRange(0, MAX_MOVE_DELAY)
+        self.delay_spin.setSingleStep(100)
+        self.delay_spin.setValue(COMPUTER_MOVE_DELAY)
+        self.delay_spin.setSuffix(" ms delay")
+        self.ponder_check = QCheckBox("Think on your turn")
+        self.ponder_check.setChecked(True)
+        layout_delay = QVBoxLayout()
+        layout_delay.addWidget(self.delay_spin)
+        layout_delay.addWidget(self.ponder_check)
+        delay_box.setLayout(layout_delay)
+        return delay_box
+
     def _build_top_row(self) -> QHBoxLayout:
         top_row = QHBoxLayout()
         top_row.addWidget(self.mode_box)
         top_row.addStretch(1)
+        top_row.addWidget(self.delay_box)
         top_row.addWidget(self.size_box)
         top_row.addWidget(self.new_button)
         return top_row
@@ -206,7 +354,7 @@ class MainWindow(QMainWindow):
     def _build_side_row(self) -> QHBoxLayout:
         board_wrap = QHBoxLayout()
         board_wrap.addStretch(1)
-        board_wrap.addWidget(self.board_widget)
+        board_wrap.addWidget(self.board_scroll)
         board_wrap.addStretch(1)
 
         side_row = QHBoxLayout()
@@ -216,11 +364,13 @@ class MainWindow(QMainWindow):
         return side_row
 
     #s/o selection
-    def _create_player_box(self, title) -> tuple[QGroupBox, QRadioButton, QRadioButton, QRadioButton, QRadioButton]:
+    def _create_player_box(self, title) -> tuple[QGroupBox, QRadioButton, QRadioButton, QRadioButton, QRadioButton,
+                                                 QRadioButton]:
         box = QGroupBox(title)
 
         human_radio = QRadioButton("Human")
         computer_radio = QRadioButton("Computer")
+        hard_radio = QRadioButton("Computer (Hard)")
         s_radio = QRadioButton("S")
         o_radio = QRadioButton("O")
 
@@ -228,6 +378,7 @@ class MainWindow(QMainWindow):
         human_group.setExclusive(True)
         human_group.addButton(human_radio)
         human_group.addButton(computer_radio)
+        human_group.addButton(hard_radio)
 
         letter_group = QButtonGroup(box)
         letter_group.setExclusive(True)
@@ -237,13 +388,14 @@ class MainWindow(QMainWindow):
         layout = QVBoxLayout()
         layout.addWidget(human_radio)
         layout.addWidget(computer_radio)
+        layout.addWidget(hard_radio)
         layout.addSpacing(8)
         layout.addWidget(s_radio)
         layout.addWidget(o_radio)
 
         box.setLayout(layout)
 
-        return box, human_radio, computer_radio, s_radio, o_radio
+        return box, human_radio, computer_radio, hard_radio, s_radio, o_radio
 
     def _current_player_computer(self) -> bool:
         if not self.game:
@@ -291,40 +443,103 @@ class MainWindow(QMainWindow):
             else:
                 QMessageBox.information(self, "Game Over", f"Draw {red_score}-{blue_score}")
 
+    #schedule the next computer move after the delay, one move at a time so the board repaints between them
     def _handle_computer_move(self):
-        if not self.game:
+        if not self.game or self.game.is_over or self._thinking:
+            return
+        if not self._current_player_computer():
+            return
+        self.move_timer.start(self.delay_spin.value())
+
+    #the worker searches a copy, the real game is only changed on the gui thread
+    def _request_computer_move(self):
+        if not self.game or self.game.is_over:
+            return
+        computer = self.computers.get(self.game.current_player)
+        if computer is None:
             return
-        #stop counter
-        moves_left = self.game.board_size * self.game.board_size
-
-        while not self.game.is_over and moves_left > 0:
-            computer = self.computers.get(self.game.current_player) #check if current player is computer
-            if computer is None:
-                break
-            row, col, letter = computer.choose_move(self.game)
+        self._thinking = True
+        self.turn_label.setText(self.turn_label.text().strip() + " (thinking)")
+        self.think_requested.emit(self._request, computer, copy.deepcopy(self.game), self.move_time_limit)
+
+    def _on_computer_move(self, request: int, row: int, col: int, letter: str):
+        if request != self._request or not self.game:
+            return
+        self._thinking = False
+        try:
             self.game.place_letter(row, col, letter)
-            moves_left -= 1
+        except InvalidMoveError as e:
+            QMessageBox.warning(self, "Computer error", str(e))
+            return
 
-        self.board_widget.update()
+        self.board_widget.refresh()
 
         if self.game.is_over:
             self._game_over_dialog()
-        else:
-            self._update_turn_label()
+            return
+
+        self._update_turn_label()
+        self._handle_computer_move()
+        self._start_pondering()
+
+    #the computer that moves after the human searches on a copy while the human decides
+    def _start_pondering(self):
+        if not self.game or self.game.is_over or self._current_player_computer():
+            return
+        if not self.ponder_check.isChecked():
+            return
+        opponent = Player.BLUE if self.game.current_player == Player.RED else Player.RED
+        computer = self.computers.get(opponent)
+        if computer is None:
+            return
+        self._stop_pondering()
+        self._ponder_event = threading.Event()
+        self.ponder_requested.emit(computer, copy.deepcopy(self.game), self._ponder_event)
+
+    def _stop_pondering(self):
+        if self._ponder_event is not None:
+            self._ponder_event.set()
+            self._ponder_event = None
+
+    def _on_computer_failed(self, request: int, message: str):
+        if request != self._request:
+            return
+        self._thinking = False
+        QMessageBox.warning(self, "Computer error", message)
+
+    #drop any pending or running computer move, a running search is told to stop
+    def _cancel_computer_move(self):
+        self.move_timer.stop()
+        self._stop_pondering()
+        self._request += 1
+        self._thinking = False
+        for computer in self.computers.values():
+            computer.stop()
+
+    def closeEvent(self, event) -> None:
+        self._cancel_computer_move()
+        self.worker_thread.quit()
+        self.worker_thread.wait()
+        super().closeEvent(event)
 
     #resets everything on start a new game, pass Game to Gameboard to draw empty grid
     def _start_new_game(self):
         board_size = self.size_spin.value()
         mode = self._get_current_mode()
+        self._cancel_computer_move()
         #set computer
         self.computers = {}
         if self.red_computer.isChecked():
             self.computers[Player.RED] = EasyComputerOpponent(Player.RED)
+        elif self.red_hard.isChecked():
+            self.computers[Player.RED] = HardComputerOpponent(Player.RED)
         if self.blue_computer.isChecked():
             self.computers[Player.BLUE] = EasyComputerOpponent(Player.BLUE)
+        elif self.blue_hard.isChecked():
+            self.computers[Player.BLUE] = HardComputerOpponent(Player.BLUE)
 
         try:
-            self.game = start_game(board_size=board_size, mode=mode)
+            self.game = start_game(board_size=board_size, mode=mode, max_size=GUI_MAX_N)
         except (InvalidBoardSizeError, InvalidGameModeError) as e:
             QMessageBox.warning(self, "Invalid settings", str(e))
             return
@@ -332,6 +547,7 @@ class MainWindow(QMainWindow):
         self.board_widget.set_game(self.game)
         self._update_turn_label()
         self._handle_computer_move()
+        self._start_pondering()
 
     def _on_cell_clicked(self, row, col):
         if not self.game:
@@ -349,8 +565,9 @@ class MainWindow(QMainWindow):
         except InvalidLetterError as e:
             QMessageBox.warning(self, "Invalid letter", str(e))
             return
+        self._stop_pondering() #the search queued next picks up what pondering found
 
-        self.board_widget.update() #redraw board
+        self.board_widget.refresh() #redraw the cells the move touched
 
         if self.game.is_over:
             self._game_over_dialog()
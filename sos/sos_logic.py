@@ -1,6 +1,11 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from abc import ABC, abstractmethod
+from array import array
+from collections.abc import Sequence
 from enum import IntEnum, StrEnum
+from operator import itemgetter
+from typing import ClassVar, Iterator, NamedTuple, overload
+import random
 
 class InvalidBoardSizeError(ValueError):
     pass
@@ -23,20 +28,24 @@ class Mode(StrEnum):
     GENERAL = "general"
 
 MIN_N = 3
-MAX_N = 8
+MAX_N = 8 #default limit, gui and games accept a larger max_size
+LARGE_MAX_N = 256
 Cell = str | None
 Coordinates = tuple[int, int]
+MoveRecord = tuple[int, int, int, Player, int]
 
 DEFAULT_STARTING_PLAYER = Player.RED
 
 #validations for separation of concerns (most constraint checks done by GUI)
-def validate_board_size(board_size: int) -> None:
+def validate_board_size(board_size: int, max_size: int = MAX_N) -> None:
     if not isinstance(board_size, int):
         raise InvalidBoardSizeError("Board size invalid")
+    if not MIN_N <= max_size <= LARGE_MAX_N:
+        raise InvalidBoardSizeError(f"Max board size must be between {MIN_N} and {LARGE_MAX_N}")
     if board_size < MIN_N:
         raise InvalidBoardSizeError("Board must be at least 3")
-    if board_size > MAX_N:
-        raise InvalidBoardSizeError("Board must less than or 8")
+    if board_size > max_size:
+        raise InvalidBoardSizeError(f"Board must less than or {max_size}")
 
 def validate_mode(mode: str | Mode) -> Mode:
     if isinstance(mode, Mode):
@@ -57,21 +66,397 @@ def validate_letter(letter:str) -> str:
         raise InvalidLetterError("Letter must be S or O")
     return letter
 
-#completed sos segment
-@dataclass(frozen=True)
-class CompletedSOS:
+#completed sos segment, a named tuple so the scoring path builds it cheaply
+class CompletedSOS(NamedTuple):
     start: Coordinates
     end: Coordinates
     player: Player
 
-@dataclass #__init__
+#completed lines are stored packed as start index << 4 | direction << 2 | player
+LINE_DIRECTIONS: tuple[Coordinates, ...] = ((0, 1), (1, 0), (1, 1), (1, -1))
+_DIRECTION_CODES = {direction: code for code, direction in enumerate(LINE_DIRECTIONS)}
+
+def pack_line(line: CompletedSOS, board_size: int) -> int:
+    (start_row, start_col), (end_row, end_col) = line.start, line.end
+    step = ((end_row - start_row) // 2, (end_col - start_col) // 2)
+    if step not in _DIRECTION_CODES: #written end to start
+        start_row, start_col = end_row, end_col
+        step = (-step[0], -step[1])
+    return (start_row * board_size + start_col) << 4 | _DIRECTION_CODES[step] << 2 | line.player
+
+def unpack_line(value: int, board_size: int) -> CompletedSOS:
+    start_row, start_col = divmod(value >> 4, board_size)
+    d_row, d_col = LINE_DIRECTIONS[(value >> 2) & 3]
+    return CompletedSOS((start_row, start_col), (start_row + 2 * d_row, start_col + 2 * d_col), Player(value & 3))
+
+#read-only sequence of CompletedSOS decoded on access from a packed array
+class LinesView(Sequence[CompletedSOS]):
+    __slots__ = ("_data", "_board_size")
+
+    def __init__(self, data: array, board_size: int) -> None:
+        self._data = data
+        self._board_size = board_size
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @overload
+    def __getitem__(self, index: int) -> CompletedSOS: ...
+    @overload
+    def __getitem__(self, index: slice) -> list[CompletedSOS]: ...
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [unpack_line(value, self._board_size) for value in self._data[index]]
+        return unpack_line(self._data[index], self._board_size)
+
+    def __iter__(self) -> Iterator[CompletedSOS]:
+        size = self._board_size
+        for value in self._data:
+            yield unpack_line(value, size)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (LinesView, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    #raw packed values, shares memory with the game
+    def packed(self) -> memoryview:
+        return memoryview(self._data).toreadonly()
+
+    def __repr__(self) -> str:
+        return f"LinesView({list(self)!r})"
+
+#moves are stored as two 64 bit slots, index << 6 | lines scored << 2 | player, then the zobrist before the move
+PLAYERS: tuple[Player | None, Player, Player] = (None, Player.RED, Player.BLUE)
+
+#read-only sequence of (row, col, lines scored, player, zobrist before) decoded on access from a packed array
+class HistoryView(Sequence[MoveRecord]):
+    __slots__ = ("_data", "_board_size")
+
+    def __init__(self, data: array, board_size: int) -> None:
+        self._data = data
+        self._board_size = board_size
+
+    def _record(self, position: int) -> MoveRecord:
+        packed = self._data[2 * position]
+        row, col = divmod(packed >> 6, self._board_size)
+        return row, col, (packed >> 2) & 15, PLAYERS[packed & 3], self._data[2 * position + 1]
+
+    def __len__(self) -> int:
+        return len(self._data) // 2
+
+    @overload
+    def __getitem__(self, index: int) -> MoveRecord: ...
+    @overload
+    def __getitem__(self, index: slice) -> list[MoveRecord]: ...
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._record(position) for position in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        return self._record(index)
+
+    def __iter__(self) -> Iterator[MoveRecord]:
+        for position in range(len(self)):
+            yield self._record(position)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (HistoryView, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"HistoryView({list(self)!r})"
+
+#cell codes in Board.cells
+EMPTY = 0
+S_CELL = 1
+O_CELL = 2
+CELL_LETTERS: tuple[Cell, Cell, Cell] = (None, "S", "O")
+
+#per cell sos triplets as flat indices, S: (start, end, other S, mid O), O: (start, end) which must both be S
+STriplet = tuple[int, int, int, int]
+OTriplet = tuple[int, int]
+
+def build_triplet_table(board_size: int) -> tuple[tuple[tuple[STriplet, ...], ...], tuple[tuple[OTriplet, ...], ...]]:
+    directions = [(0, 1), (1, 0), (1, 1), (1, -1)] #horizontal, vert, diagonal, diagonal
+    cells = board_size * board_size
+    s_table: list[list[STriplet]] = [[] for _ in range(cells)]
+    o_table: list[list[OTriplet]] = [[] for _ in range(cells)]
+
+    for row in range(board_size):
+        for col in range(board_size):
+            for d_row, d_col in directions:
+                end_row, end_col = row + 2 * d_row, col + 2 * d_col
+                if not (0 <= end_row < board_size and 0 <= end_col < board_size):
+                    continue
+                start = row * board_size + col
+                mid = start + d_row * board_size + d_col
+                end = end_row * board_size + end_col
+                #S at start needs S end, S at end needs S start, both need O mid, O needs both S
+                s_table[start].append((start, end, end, mid))
+                s_table[end].append((start, end, start, mid))
+                o_table[mid].append((start, end))
+    return tuple(map(tuple, s_table)), tuple(map(tuple, o_table))
+
+#the 8 rotations and reflections of the square, transform t sends (row, col) to transform_cell(t, row, col, n)
+SYMMETRIES = 8
+INVERSE_TRANSFORM = (0, 3, 2, 1, 4, 5, 6, 7)
+
+def transform_cell(transform: int, row: int, col: int, board_size: int) -> Coordinates:
+    last = board_size - 1
+    if transform == 0:
+        return row, col
+    if transform == 1: #quarter turn clockwise
+        return col, last - row
+    if transform == 2:
+        return last - row, last - col
+    if transform == 3:
+        return last - col, row
+    if transform == 4: #mirror left right
+        return row, last - col
+    if transform == 5:
+        return last - row, col
+    if transform == 6: #main diagonal
+        return col, row
+    return last - col, last - row
+
+#map a cell on the transformed board back to the real board
+def untransform_cell(transform: int, row: int, col: int, board_size: int) -> Coordinates:
+    return transform_cell(INVERSE_TRANSFORM[transform], row, col, board_size)
+
+@dataclass(frozen=True)
+class SymmetryTables:
+    destinations: tuple[tuple[int, ...], ...] #[transform][index] flat index on the transformed board
+    gathers: tuple[itemgetter, ...] #[transform](cells) gives the transformed cells in flat order
+
+def build_symmetry_tables(board_size: int) -> SymmetryTables:
+    destinations = []
+    gathers = []
+    for transform in range(SYMMETRIES):
+        destination = [0] * (board_size * board_size)
+        for row in range(board_size):
+            for col in range(board_size):
+                new_row, new_col = transform_cell(transform, row, col, board_size)
+                destination[row * board_size + col] = new_row * board_size + new_col
+        source = [0] * len(destination)
+        for index, target in enumerate(destination):
+            source[target] = index
+        destinations.append(tuple(destination))
+        gathers.append(itemgetter(*source))
+    return SymmetryTables(tuple(destinations), tuple(gathers))
+
+#random 64 bit keys for zobrist hashing, fixed seed so hashes are stable across runs
+ZOBRIST_SEED = 0x5053
+
+#splitmix64 finalizer, keys for values with no fixed range
+def _mix64(value: int) -> int:
+    value = (value + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return value ^ (value >> 31)
+
+@dataclass(frozen=True)
+class ZobristKeys:
+    cells: tuple[tuple[int, int], ...] #per flat cell index, (S key, O key)
+    #per flat cell index, (S, O) keys of the cells it lands on under the 8 transforms, 64 bits each
+    #packed in one int so a placement updates every symmetric hash with a single xor
+    symmetric: tuple[tuple[int, int], ...]
+    blue_to_move: int
+    general_mode: int
+    score_seed: int
+
+    #key for red - blue score difference
+    def score_diff(self, diff: int) -> int:
+        return _mix64(self.score_seed ^ (diff & 0xFFFFFFFF))
+
+def build_zobrist_keys(board_size: int, destinations: tuple[tuple[int, ...], ...]) -> ZobristKeys:
+    rng = random.Random(ZOBRIST_SEED + board_size)
+    cells = tuple((rng.getrandbits(64), rng.getrandbits(64)) for _ in range(board_size * board_size))
+    symmetric = []
+    for index in range(len(cells)):
+        s_keys = o_keys = 0
+        for transform, destination in enumerate(destinations):
+            s_key, o_key = cells[destination[index]]
+            s_keys |= s_key << 64 * transform
+            o_keys |= o_key << 64 * transform
+        symmetric.append((s_keys, o_keys))
+    return ZobristKeys(
+        cells=cells,
+        symmetric=tuple(symmetric),
+        blue_to_move=rng.getrandbits(64),
+        general_mode=rng.getrandbits(64),
+        score_seed=rng.getrandbits(64),
+    )
+
+#immutable per size tables, built once and shared by every board and game of that size
+@dataclass(frozen=True, slots=True)
+class Geometry:
+    board_size: int
+    s_triplets: tuple[tuple[STriplet, ...], ...]
+    o_triplets: tuple[tuple[OTriplet, ...], ...]
+    coordinates: tuple[Coordinates, ...] #(row, col) of each flat index
+    symmetry: SymmetryTables
+    zobrist: ZobristKeys
+
+def build_geometry(board_size: int) -> Geometry:
+    s_triplets, o_triplets = build_triplet_table(board_size)
+    symmetry = build_symmetry_tables(board_size)
+    return Geometry(board_size, s_triplets, o_triplets,
+                    tuple(divmod(index, board_size) for index in range(board_size * board_size)), symmetry,
+                    build_zobrist_keys(board_size, symmetry.destinations))
+
+#the common sizes are ready at import, larger boards build theirs on first use
+PREBUILT_SIZES = range(MIN_N, 9)
+_geometry_cache: dict[int, Geometry] = {size: build_geometry(size) for size in PREBUILT_SIZES}
+
+def geometry(board_size: int) -> Geometry:
+    shared = _geometry_cache.get(board_size)
+    if shared is None:
+        shared = _geometry_cache[board_size] = build_geometry(board_size)
+    return shared
+
+def symmetry_tables(board_size: int) -> SymmetryTables:
+    return geometry(board_size).symmetry
+
+def zobrist_keys(board_size: int) -> ZobristKeys:
+    return geometry(board_size).zobrist
+
+@dataclass(slots=True) #__init__
 class Board:
     board_size: int
-    grid: list[list[Cell]] = field(init=False)
+    max_size: int = MAX_N
+    #flat row * board_size + col array of EMPTY, S_CELL, O_CELL, scoring reads it through the per cell
+    #triplet tables, a byte lookup per triplet beats shifting and masking Python ints
+    cells: bytearray = field(init=False, repr=False)
+    #shared per size tables, the triplet and key tables are also kept on the board for the hot loops
+    geometry: Geometry = field(init=False, repr=False)
+    s_triplets: tuple[tuple[STriplet, ...], ...] = field(init=False, repr=False)
+    o_triplets: tuple[tuple[OTriplet, ...], ...] = field(init=False, repr=False)
+    coordinates: tuple[Coordinates, ...] = field(init=False, repr=False)
+    #per flat cell index, lines an S or O placed there would complete right now
+    s_threats: bytearray = field(init=False, repr=False)
+    o_threats: bytearray = field(init=False, repr=False)
+    #per flat cell index, lines an S or O placed there would leave one cell short for the next player
+    s_gifts: bytearray = field(init=False, repr=False)
+    o_gifts: bytearray = field(init=False, repr=False)
+    #threat counts summed over the empty cells, nonzero when the side to move can score
+    open_threats: int = field(default=0, init=False)
+    #letters placed so far
+    filled_count: int = field(default=0, init=False)
+    #flat indices, the first board_size * board_size - filled_count are the empty cells, _empty_pos[index] is
+    #where index sits so a placement swap-removes in O(1) and undoing it swaps back
+    _empty: array = field(init=False, repr=False)
+    _empty_pos: array = field(init=False, repr=False)
+    #zobrist hashes of the cells under the 8 transforms packed 64 bits each, read through sym_hashes
+    sym_hash: int = field(default=0, init=False, repr=False)
+    _sym_keys: tuple[tuple[int, int], ...] = field(init=False, repr=False)
     #validate board, each none = empty cell for gui
     def __post_init__(self) -> None:
-        validate_board_size(self.board_size)
-        self.grid = [[None for _ in range(self.board_size)] for _ in range(self.board_size)] #list of lists grid with value none
+        validate_board_size(self.board_size, self.max_size)
+        self.cells = bytearray(self.board_size * self.board_size)
+        self._attach(geometry(self.board_size))
+        self._set_threats(*(bytearray(len(self.cells)) for _ in range(4)))
+        self._empty = array("H", range(len(self.cells)))
+        self._empty_pos = array("H", self._empty)
+
+    #copies and pickles leave out the shared per-size tables and look them up again on load
+    def __getstate__(self) -> tuple:
+        return (self.board_size, self.max_size, bytes(self.cells), self.filled_count, self._empty.tobytes(),
+                self._empty_pos.tobytes(), self.sym_hash, bytes(self.s_threats), bytes(self.o_threats),
+                bytes(self.s_gifts), bytes(self.o_gifts), self.open_threats)
+
+    def __setstate__(self, state: tuple) -> None:
+        (self.board_size, self.max_size, cells, self.filled_count, empty, empty_pos,
+         self.sym_hash, s_threats, o_threats, s_gifts, o_gifts, self.open_threats) = state
+        self.cells = bytearray(cells)
+        self._empty = array("H")
+        self._empty.frombytes(empty)
+        self._empty_pos = array("H")
+        self._empty_pos.frombytes(empty_pos)
+        self._attach(geometry(self.board_size))
+        self._set_threats(*map(bytearray, (s_threats, o_threats, s_gifts, o_gifts)))
+
+    def _attach(self, shared: Geometry) -> None:
+        self.geometry = shared
+        self.s_triplets = shared.s_triplets
+        self.o_triplets = shared.o_triplets
+        self.coordinates = shared.coordinates
+        self._sym_keys = shared.zobrist.symmetric
+
+    def _set_threats(self, s_threats: bytearray, o_threats: bytearray, s_gifts: bytearray,
+                     o_gifts: bytearray) -> None:
+        self.s_threats, self.o_threats, self.s_gifts, self.o_gifts = s_threats, o_threats, s_gifts, o_gifts
+
+    #adjust the counts of the cells sharing a line with index when code is placed there (sign 1) or
+    #removed (sign -1), the counts only depend on the other cells of each line so order does not matter
+    def _update_threats(self, index: int, code: int, sign: int) -> None:
+        cells = self.cells
+        s_threats = self.s_threats
+        s_gifts = self.s_gifts
+        opened = 0
+        if code == S_CELL:
+            o_threats = self.o_threats
+            o_gifts = self.o_gifts
+            #lines this S ends, the mid needs an O and the far end an S
+            for _, _, far, mid in self.s_triplets[index]:
+                mid_code = cells[mid]
+                far_code = cells[far]
+                if far_code == S_CELL:
+                    o_threats[mid] += sign
+                    o_gifts[mid] -= sign
+                    if mid_code == EMPTY:
+                        opened += sign
+                elif far_code == EMPTY:
+                    o_gifts[mid] += sign
+                if mid_code == O_CELL:
+                    s_threats[far] += sign
+                    s_gifts[far] -= sign
+                    if far_code == EMPTY:
+                        opened += sign
+                elif mid_code == EMPTY:
+                    s_gifts[far] += sign
+            #lines that needed an O here are dead, an end was a gift while the other end was S
+            for start, end in self.o_triplets[index]:
+                if cells[end] == S_CELL:
+                    s_gifts[start] -= sign
+                if cells[start] == S_CELL:
+                    s_gifts[end] -= sign
+        else:
+            #lines this O is the mid of, both ends need an S
+            for start, end in self.o_triplets[index]:
+                start_code = cells[start]
+                end_code = cells[end]
+                if end_code == S_CELL:
+                    s_threats[start] += sign
+                    s_gifts[start] -= sign
+                    if start_code == EMPTY:
+                        opened += sign
+                elif end_code == EMPTY:
+                    s_gifts[start] += sign
+                if start_code == S_CELL:
+                    s_threats[end] += sign
+                    s_gifts[end] -= sign
+                    if end_code == EMPTY:
+                        opened += sign
+                elif start_code == EMPTY:
+                    s_gifts[end] += sign
+            #lines that needed an S here are dead
+            o_gifts = self.o_gifts
+            for _, _, far, mid in self.s_triplets[index]:
+                if cells[far] == S_CELL:
+                    o_gifts[mid] -= sign
+                if cells[mid] == O_CELL:
+                    s_gifts[far] -= sign
+        self.open_threats += opened
+
+    #list of lists copy of the cells, None = empty
+    @property
+    def grid(self) -> list[list[Cell]]:
+        size = self.board_size
+        return [[CELL_LETTERS[value] for value in self.cells[row * size:(row + 1) * size]] for row in range(size)]
 
     def in_bounds(self, row: int, col: int) -> bool:
         return 0 <= row < self.board_size and 0 <= col < self.board_size
@@ -79,43 +464,173 @@ class Board:
     def is_empty(self, row: int, col: int) -> bool:
         if not self.in_bounds(row, col):
             raise OutOfBoundsError("Out of bounds")
-        return self.grid[row][col] is None
+        return self.cells[row * self.board_size + col] == EMPTY
 
     def is_full(self)-> bool:
-        return all(cell is not None for row in self.grid for cell in row)
+        return self.filled_count == self.board_size * self.board_size
+
+    def empty_cells(self) -> list[Coordinates]:
+        coordinates = self.coordinates
+        return [coordinates[index] for index in self._empty[:len(self.cells) - self.filled_count]]
+
+    #flat indices of the empty cells, in no particular order
+    def empty_indices(self) -> array:
+        return self._empty[:len(self.cells) - self.filled_count]
 
     def get_cell(self, row: int, col: int) -> Cell:
         if not self.in_bounds(row, col):
             raise OutOfBoundsError("Out of bounds")
-        return self.grid[row][col]
+        return CELL_LETTERS[self.cells[row * self.board_size + col]]
 
     def place(self, row: int, col: int, letter: str) -> None:
         if not self.in_bounds(row, col):
             raise OutOfBoundsError("Out of bounds")
-        if self.grid[row][col] is not None:
+        index = row * self.board_size + col
+        if self.cells[index] != EMPTY:
             raise InvalidMoveError("Cell is already occupied")
-        self.grid[row][col] = letter
+        if letter == "S":
+            code = S_CELL
+        elif letter == "O":
+            code = O_CELL
+        else:
+            raise InvalidLetterError("Letter must be S or O")
+        #last empty cell takes this one's slot, _empty_pos[index] keeps the slot for remove
+        empty = self._empty
+        last = empty[len(self.cells) - self.filled_count - 1]
+        slot = self._empty_pos[index]
+        empty[slot] = last
+        self._empty_pos[last] = slot
+        self.filled_count += 1
+        self.cells[index] = code
+        self.sym_hash ^= self._sym_keys[index][code - 1]
+        self._update_threats(index, code, 1)
+        self.open_threats -= self.s_threats[index] + self.o_threats[index]
+
+    #cell hash under each transform, sym_hashes[0] is the board as it stands
+    @property
+    def sym_hashes(self) -> list[int]:
+        h = self.sym_hash
+        return [(h >> 64 * transform) & 0xFFFFFFFFFFFFFFFF for transform in range(SYMMETRIES)]
+
+    #smallest transformed copy of the cells and the transform that gives it, equal for symmetric boards
+    def canonical(self) -> tuple[bytes, int]:
+        gathers = self.geometry.symmetry.gathers
+        return min((bytes(gather(self.cells)), transform) for transform, gather in enumerate(gathers))
+
+    def transform_cell(self, transform: int, row: int, col: int) -> Coordinates:
+        return transform_cell(transform, row, col, self.board_size)
+
+    def untransform_cell(self, transform: int, row: int, col: int) -> Coordinates:
+        return untransform_cell(transform, row, col, self.board_size)
+
+    #true if letter at row, col leaves an sos one cell short of completion for the next player
+    def gives_away(self, row: int, col: int, letter: str) -> bool:
+        gifts = self.s_gifts if letter == "S" else self.o_gifts
+        return gifts[row * self.board_size + col] > 0
+
+    #lines letter at row, col would complete
+    def threats(self, row: int, col: int, letter: str) -> int:
+        threats = self.s_threats if letter == "S" else self.o_threats
+        return threats[row * self.board_size + col]
+
+    #clear a placed letter, inverse of place
+    def remove(self, row: int, col: int) -> None:
+        if not self.in_bounds(row, col):
+            raise OutOfBoundsError("Out of bounds")
+        index = row * self.board_size + col
+        value = self.cells[index]
+        if value == EMPTY:
+            raise InvalidMoveError("Cell is already empty")
+        self.sym_hash ^= self._sym_keys[index][value == O_CELL]
+        self._update_threats(index, value, -1)
+        self.open_threats += self.s_threats[index] + self.o_threats[index]
+        self.cells[index] = EMPTY
+        #swap back whatever took this cell's slot, undoing moves in reverse restores the exact order
+        empty = self._empty
+        positions = self._empty_pos
+        end = len(self.cells) - self.filled_count
+        slot = positions[index]
+        if slot < end:
+            moved = empty[slot]
+            empty[end] = moved
+            positions[moved] = end
+        else:
+            slot = end
+        empty[slot] = index
+        positions[index] = slot
+        self.filled_count -= 1
 
 #abstract base class for both simple and general - turn order, placing validation, sos line and completion tracking
-@dataclass
+@dataclass(slots=True)
 class BaseGame(ABC):
     board_size: int
     starting_player: Player = DEFAULT_STARTING_PLAYER
+    max_size: int = MAX_N
 
     board: Board = field(init=False)
     current_player: Player = field(init=False)
     is_over: bool = field(default=False, init=False)
     winner: Player | None = field(default=None, init=False)
-    lines: list[CompletedSOS] = field(default_factory=list, init=False)
+    #completed lines packed 4 bytes each, read through the lines property
+    _line_data: array = field(default_factory=lambda: array("I"), init=False, repr=False)
     red_score: int = field(default=0, init=False)
     blue_score: int = field(default=0, init=False)
+    #two packed slots per move for unmake_move, read through the history property
+    _history_data: array = field(default_factory=lambda: array("Q"), init=False, repr=False)
+    #incremental hash of cells, side to move, mode and general score difference
+    zobrist: int = field(default=0, init=False)
+    _keys: ZobristKeys = field(init=False, repr=False)
+
+    mode: ClassVar[Mode]
 
     #checks independent of gui radio button constraints
     def __post_init__(self) -> None:
         if not isinstance(self.starting_player, Player):
             raise ValueError("Invalid player")
-        self.board = Board(self.board_size)
+        self.board = Board(self.board_size, self.max_size)
         self.current_player = self.starting_player
+        self._keys = self.board.geometry.zobrist
+        self.zobrist = self.compute_zobrist()
+
+    #zobrist keys come from the shared geometry of the board
+    def __getstate__(self) -> dict:
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.name != "_keys"}
+
+    def __setstate__(self, state: dict) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._keys = self.board.geometry.zobrist
+
+    #hash of everything except the cells
+    def _state_hash(self) -> int:
+        keys = self._keys
+        h = keys.blue_to_move if self.current_player == Player.BLUE else 0
+        if self.mode == Mode.GENERAL:
+            h ^= keys.general_mode ^ keys.score_diff(self.red_score - self.blue_score)
+        return h
+
+    #full recomputation, make_move keeps zobrist equal to this incrementally
+    def compute_zobrist(self) -> int:
+        h = self._state_hash()
+        for index, value in enumerate(self.board.cells):
+            if value != EMPTY:
+                h ^= self._keys.cells[index][value == O_CELL]
+        return h
+
+    #smallest of the 8 symmetric hashes and its transform, one key for all symmetric positions
+    def canonical_zobrist(self) -> tuple[int, int]:
+        state = self._state_hash()
+        return min((h ^ state, transform) for transform, h in enumerate(self.board.sym_hashes))
+
+    #every transform reaching the canonical hash, more than one when the position is itself symmetric
+    def canonical_transforms(self) -> tuple[int, list[int]]:
+        state = self._state_hash()
+        hashes = [h ^ state for h in self.board.sym_hashes]
+        key = min(hashes)
+        return key, [transform for transform, h in enumerate(hashes) if h == key]
+
+    def canonical(self) -> tuple[bytes, int]:
+        return self.board.canonical()
 
     def _switch_turns(self) -> None:
         self.current_player = Player.BLUE if self.current_player == Player.RED else Player.RED
@@ -124,65 +639,127 @@ class BaseGame(ABC):
         if self.is_over:
             raise InvalidMoveError("Game over")
         letter = validate_letter(letter)
+        self.make_move(row, col, letter)
+
+    #place without letter normalization for search, returns lines scored
+    def make_move(self, row: int, col: int, letter: str) -> int:
+        if self.is_over:
+            raise InvalidMoveError("Game over")
+        player = self.current_player
+        lines_before = len(self._line_data)
+        zobrist_before = self.zobrist
+        state_before = self._state_hash()
         self.board.place(row, col, letter) #place letter
         self._after_move(row, col, letter)
         if not self.is_over:
             self._switch_turns()
+        scored = len(self._line_data) - lines_before
+        self.zobrist = (zobrist_before ^ state_before ^ self._state_hash()
+                        ^ self._keys.cells[row * self.board_size + col][letter == "O"])
+        history = self._history_data
+        history.append((row * self.board_size + col) << 6 | scored << 2 | player)
+        history.append(zobrist_before)
+        return scored
+
+    #restore state before the last make_move, O(lines scored)
+    def unmake_move(self) -> None:
+        history = self._history_data
+        if not history:
+            raise InvalidMoveError("No move to undo")
+        zobrist_before = history.pop()
+        packed = history.pop()
+        row, col = divmod(packed >> 6, self.board_size)
+        scored = (packed >> 2) & 15
+        player = PLAYERS[packed & 3]
+        if scored:
+            del self._line_data[-scored:]
+            if player == Player.RED:
+                self.red_score -= scored
+            else:
+                self.blue_score -= scored
+        self.board.remove(row, col)
+        self.current_player = player
+        self.is_over = False
+        self.winner = None
+        self.zobrist = zobrist_before
 
     @abstractmethod
     def _after_move(self, row: int,col: int, letter:str) -> None:
         ...
 
-    def get_lines(self) -> list[CompletedSOS]:
-        return list(self.lines)
+    @property
+    def lines(self) -> LinesView:
+        return LinesView(self._line_data, self.board_size)
+
+    #(row, col, lines scored, player, zobrist before) per move, the view follows the game as it changes
+    @property
+    def history(self) -> HistoryView:
+        return HistoryView(self._history_data, self.board_size)
+
+    #no copy, the view follows the game as it changes
+    def get_lines(self) -> LinesView:
+        return self.lines
 
     #append new sos lines and increment score
     def sos_line(self, new_lines: list[CompletedSOS]) -> None:
         if not new_lines:
             return
-        self.lines.extend(new_lines)
+        size = self.board_size
+        self._line_data.extend(pack_line(line, size) for line in new_lines)
         scored = len(new_lines)
         if self.current_player == Player.RED:
             self.red_score += scored
         else:
             self.blue_score += scored
     #returns list of CompletedSOS segments with owner as current player
+    #precomputed triplets through the cell, O(1) whatever the board size
     def new_lines_from_move(self, row: int, col: int, letter: str, player: Player) -> list[CompletedSOS]:
+        board = self.board
+        index = row * board.board_size + col
         lines: list[CompletedSOS] = []
-
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)] #horizontal, vert, diagonal, diagonal
-
-        def add_line(start: Coordinates, end: Coordinates) -> None:
-            lines.append(CompletedSOS(start, end, player))
-
-        #placed O, must be in middle of SOS
-        if letter == "O":
-            for d_row, d_col in directions:
-                start = (row - d_row, col - d_col)
-                end = (row + d_row, col + d_col)
-                if not (self.board.in_bounds(*start) and self.board.in_bounds(*end)):
-                    continue
-                if self.board.get_cell(*start) == "S" and self.board.get_cell(*end) == "S":
-                    add_line(start, end)
-        #placed S, must be at either end of SOS
+        #the threat counts say whether anything scores, the triplets only need walking to name the lines
         if letter == "S":
-            for d_row, d_col in directions:
-                #S at start of SOS
-                mid = (row + d_row, col + d_col)
-                end = (row + 2 * d_row, col + 2 * d_col)
-                if self.board.in_bounds(*mid) and self.board.in_bounds(*end):
-                    if self.board.get_cell(*mid) == "O" and self.board.get_cell(*end) == "S":
-                        add_line((row, col), end)
-                #S at end SOS
-                start = (row - 2 * d_row, col - 2 * d_col)
-                mid_back = (row - d_row, col - d_col)
-                if not (self.board.in_bounds(*start) and self.board.in_bounds(*mid_back)):
-                    continue
-                if self.board.get_cell(*mid_back) == "O" and self.board.get_cell(*start) == "S":
-                    add_line(start, (row, col))
+            if board.s_threats[index]:
+                cells = board.cells
+                coordinates = board.coordinates
+                for start, end, other, mid in board.s_triplets[index]:
+                    if cells[other] == S_CELL and cells[mid] == O_CELL:
+                        lines.append(CompletedSOS(coordinates[start], coordinates[end], player))
+        elif board.o_threats[index]:
+            cells = board.cells
+            coordinates = board.coordinates
+            for start, end in board.o_triplets[index]:
+                if cells[start] == S_CELL and cells[end] == S_CELL:
+                    lines.append(CompletedSOS(coordinates[start], coordinates[end], player))
         return lines
 
+    #every scoring (row, col, letter, lines) for the side to move, read off the board threat counts
+    def scoring_moves(self) -> list[tuple[int, int, str, int]]:
+        board = self.board
+        if not board.open_threats:
+            return []
+        s_threats = board.s_threats
+        o_threats = board.o_threats
+        #only empty cells carry threats, sorted back to row-major order
+        hits = []
+        for index in board.empty_indices():
+            if s_threats[index] or o_threats[index]:
+                hits.append(index)
+        hits.sort()
+        coordinates = board.coordinates
+        moves = []
+        for index in hits:
+            row, col = coordinates[index]
+            if o_threats[index]:
+                moves.append((row, col, "O", o_threats[index]))
+            if s_threats[index]:
+                moves.append((row, col, "S", s_threats[index]))
+        return moves
+
 class SimpleGame(BaseGame):
+    __slots__ = ()
+    mode = Mode.SIMPLE
+
     def _after_move(self, row: int, col: int, letter:str) -> None:
         new_lines = self.new_lines_from_move(row, col, letter, self.current_player)
         self.sos_line(new_lines)
@@ -196,6 +773,9 @@ class SimpleGame(BaseGame):
             self.winner = None
 
 class GeneralGame(BaseGame):
+    __slots__ = ()
+    mode = Mode.GENERAL
+
     def _after_move(self, row: int, col: int, letter:str) -> None:
         new_lines = self.new_lines_from_move(row, col, letter, self.current_player)
         self.sos_line(new_lines)
@@ -210,11 +790,12 @@ class GeneralGame(BaseGame):
                 self.winner = None
             return
 
-def start_game(*, board_size: int, mode: str | Mode, starting_player: Player = DEFAULT_STARTING_PLAYER) -> BaseGame:
+def start_game(*, board_size: int, mode: str | Mode, starting_player: Player = DEFAULT_STARTING_PLAYER,
+               max_size: int = MAX_N) -> BaseGame:
     validated_mode = validate_mode(mode)
     if validated_mode == Mode.SIMPLE:
-        return SimpleGame(board_size=board_size, starting_player=starting_player)
-    return GeneralGame(board_size=board_size, starting_player=starting_player)
+        return SimpleGame(board_size=board_size, starting_player=starting_player, max_size=max_size)
+    return GeneralGame(board_size=board_size, starting_player=starting_player, max_size=max_size)
 
 
 
@@ -0,0 +1,196 @@
+#opt in call counts and timings for the game logic and computer opponents, nothing is wrapped until enable()
+#    profiler = sos_profile.enable()
+#    ... play games ...
+#    print(profiler.prometheus())
+#    sos_profile.disable()
+#counters are per process, self-play and server workers each keep their own
+
+import threading
+import time
+from dataclasses import dataclass
+from functools import wraps
+from typing import Callable
+
+from sos_logic import BaseGame, Board
+from sos_computer import ComputerOpponent
+
+#(class, method name, metric label) patched for every instance
+LOGIC_TARGETS: tuple[tuple[type, str, str], ...] = (
+    (BaseGame, "place_letter", "place_letter"),
+    (BaseGame, "new_lines_from_move", "new_lines_from_move"),
+    (Board, "is_full", "is_full"),
+)
+
+@dataclass(slots=True)
+class CallStats:
+    calls: int = 0
+    seconds: float = 0.0 #includes time in nested instrumented calls
+    max_seconds: float = 0.0
+
+    def to_json(self) -> dict:
+        return {"calls": self.calls, "seconds": self.seconds, "max_seconds": self.max_seconds}
+
+@dataclass(slots=True)
+class SearchStats:
+    decisions: int = 0
+    nodes: int = 0 #negamax nodes or mcts playouts
+    seconds: float = 0.0
+    last_nodes: int = 0
+    last_seconds: float = 0.0
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+    def to_json(self) -> dict:
+        return {"decisions": self.decisions, "nodes": self.nodes, "seconds": self.seconds,
+                "nodes_per_second": self.nodes_per_second, "last_nodes": self.last_nodes,
+                "last_seconds": self.last_seconds}
+
+def _opponent_classes() -> list[type[ComputerOpponent]]:
+    found = []
+    pending = list(ComputerOpponent.__subclasses__())
+    while pending:
+        cls = pending.pop()
+        found.append(cls)
+        pending.extend(cls.__subclasses__())
+    return sorted((cls for cls in found if "choose_move" in cls.__dict__), key=lambda cls: cls.__name__)
+
+#work done by the last choose_move, searching opponents expose nodes or playouts
+def _search_nodes(opponent: ComputerOpponent) -> int | None:
+    nodes = getattr(opponent, "nodes", None)
+    if nodes is None:
+        nodes = getattr(opponent, "last_playouts", None)
+    return nodes
+
+class Profiler:
+    def __init__(self) -> None:
+        self.calls: dict[str, CallStats] = {}
+        self.searches: dict[str, SearchStats] = {}
+        self._lock = threading.Lock()
+        self._originals: list[tuple[type, str, Callable]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._originals)
+
+    def _record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stats = self.calls.get(name)
+            if stats is None:
+                stats = self.calls[name] = CallStats()
+            stats.calls += 1
+            stats.seconds += seconds
+            if seconds > stats.max_seconds:
+                stats.max_seconds = seconds
+
+    def _record_search(self, name: str, nodes: int, seconds: float) -> None:
+        with self._lock:
+            stats = self.searches.get(name)
+            if stats is None:
+                stats = self.searches[name] = SearchStats()
+            stats.decisions += 1
+            stats.nodes += nodes
+            stats.seconds += seconds
+            stats.last_nodes = nodes
+            stats.last_seconds = seconds
+
+    def _timed(self, method: Callable, name: str) -> Callable:
+        record = self._record
+        clock = time.perf_counter
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record(name, clock() - start)
+        return timed
+
+    def _timed_choice(self, method: Callable, name: str) -> Callable:
+        record = self._record
+        record_search = self._record_search
+        clock = time.perf_counter
+
+        @wraps(method)
+        def timed(opponent, *args, **kwargs):
+            start = clock()
+            try:
+                return method(opponent, *args, **kwargs)
+            finally:
+                seconds = clock() - start
+                record(name, seconds)
+                nodes = _search_nodes(opponent)
+                if nodes is not None:
+                    record_search(type(opponent).__name__, nodes, seconds)
+        return timed
+
+    def _patch(self, cls: type, attribute: str, wrapped: Callable) -> None:
+        self._originals.append((cls, attribute, cls.__dict__[attribute]))
+        setattr(cls, attribute, wrapped)
+
+    #wrap the hot paths, a second call while enabled does nothing
+    def enable(self) -> None:
+        if self.enabled:
+            return
+        for cls, attribute, name in LOGIC_TARGETS:
+            self._patch(cls, attribute, self._timed(cls.__dict__[attribute], name))
+        for cls in _opponent_classes():
+            name = f"choose_move:{cls.__name__}"
+            self._patch(cls, "choose_move", self._timed_choice(cls.__dict__["choose_move"], name))
+
+    #put the original methods back, the counters are kept
+    def disable(self) -> None:
+        while self._originals:
+            cls, attribute, original = self._originals.pop()
+            setattr(cls, attribute, original)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.searches.clear()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {"calls": {name: stats.to_json() for name, stats in sorted(self.calls.items())},
+                    "searches": {name: stats.to_json() for name, stats in sorted(self.searches.items())}}
+
+    #prometheus text exposition format
+    def prometheus(self, prefix: str = "sos") -> str:
+        with self._lock:
+            calls = sorted(self.calls.items())
+            searches = sorted(self.searches.items())
+        lines = []
+
+        #counts print every digit, seconds and rates print as the shortest exact float
+        def metric(name: str, kind: str, help_text: str, label: str, rows: list[tuple[str, int | float]]) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for value_label, value in rows:
+                text = f"{value:d}" if isinstance(value, int) else repr(float(value))
+                lines.append(f'{prefix}_{name}{{{label}="{value_label}"}} {text}')
+
+        metric("calls_total", "counter", "Calls of instrumented functions", "function",
+               [(name, stats.calls) for name, stats in calls])
+        metric("call_seconds_total", "counter", "Time spent in instrumented functions", "function",
+               [(name, stats.seconds) for name, stats in calls])
+        metric("call_seconds_max", "gauge", "Slowest single call", "function",
+               [(name, stats.max_seconds) for name, stats in calls])
+        metric("search_nodes_total", "counter", "Nodes or playouts searched by computer opponents", "opponent",
+               [(name, stats.nodes) for name, stats in searches])
+        metric("search_nodes_per_second", "gauge", "Search speed over all decisions", "opponent",
+               [(name, stats.nodes_per_second) for name, stats in searches])
+        return "\n".join(lines) + "\n"
+
+_profiler = Profiler()
+
+def profiler() -> Profiler:
+    return _profiler
+
+def enable() -> Profiler:
+    _profiler.enable()
+    return _profiler
+
+def disable() -> None:
+    _profiler.disable()
@@ -0,0 +1,170 @@
+#game records for replays and datasets
+#binary file: MAGIC, then per game [board_size - 1][flags][move count varint][moves], flags bit 0 general,
+#bit 1 blue starts, each move is cell index * 2 + (1 if O) in move_width(board_size) little endian bytes,
+#one byte per move up to 11x11
+#jsonl file: one object per game, same shape as sos_selfplay results so those files read back too
+
+import json
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterable, Iterator, TextIO
+
+from sos_logic import BaseGame, Mode, Player, start_game, validate_mode, LARGE_MAX_N, MIN_N
+from sos_search import Move
+
+MAGIC = b"SOSR\x01"
+
+class RecordFormatError(ValueError):
+    pass
+
+@dataclass(slots=True)
+class GameRecord:
+    board_size: int
+    mode: Mode
+    starting_player: Player = Player.RED
+    moves: list[Move] = field(default_factory=list)
+
+    @classmethod
+    def from_game(cls, game: BaseGame) -> "GameRecord":
+        moves = [(row, col, game.board.get_cell(row, col)) for row, col, *_ in game.history]
+        return cls(game.board_size, game.mode, game.starting_player, moves)
+
+    #new game with every move applied, place_letter checks each one
+    def replay(self) -> BaseGame:
+        game = start_game(board_size=self.board_size, mode=self.mode, starting_player=self.starting_player,
+                          max_size=LARGE_MAX_N)
+        for row, col, letter in self.moves:
+            game.place_letter(row, col, letter)
+        return game
+
+    def to_json(self) -> dict:
+        return {
+            "board_size": self.board_size,
+            "mode": str(self.mode),
+            "starting_player": self.starting_player.name.lower(),
+            "moves": ["%d,%d,%s" % move for move in self.moves],
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "GameRecord":
+        try:
+            moves = []
+            for item in data["moves"]:
+                row, col, letter = item.split(",")
+                moves.append((int(row), int(col), letter))
+            return cls(int(data["board_size"]), validate_mode(data["mode"]),
+                       Player[str(data.get("starting_player", "red")).upper()], moves)
+        except (KeyError, ValueError, AttributeError) as e:
+            raise RecordFormatError(f"Bad record: {e}") from e
+
+def move_width(board_size: int) -> int:
+    return ((2 * board_size * board_size - 1).bit_length() + 7) // 8
+
+def _write_varint(value: int, out: bytearray) -> None:
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+def encode_record(record: GameRecord) -> bytes:
+    size = record.board_size
+    if not MIN_N <= size <= LARGE_MAX_N:
+        raise RecordFormatError("Board size out of range")
+    flags = (1 if record.mode == Mode.GENERAL else 0) | (2 if record.starting_player == Player.BLUE else 0)
+    out = bytearray((size - 1, flags))
+    _write_varint(len(record.moves), out)
+    width = move_width(size)
+    for row, col, letter in record.moves:
+        code = (row * size + col) * 2 + (1 if letter == "O" else 0)
+        out += code.to_bytes(width, "little")
+    return bytes(out)
+
+def _read_varint(f: BinaryIO) -> int:
+    value = 0
+    shift = 0
+    while True:
+        byte = f.read(1)
+        if not byte:
+            raise RecordFormatError("Truncated record")
+        value |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return value
+        shift += 7
+
+def _read_binary(f: BinaryIO) -> Iterator[GameRecord]:
+    while True:
+        header = f.read(2)
+        if not header:
+            return
+        if len(header) < 2:
+            raise RecordFormatError("Truncated record")
+        size = header[0] + 1
+        mode = Mode.GENERAL if header[1] & 1 else Mode.SIMPLE
+        starting = Player.BLUE if header[1] & 2 else Player.RED
+        count = _read_varint(f)
+        width = move_width(size)
+        data = f.read(count * width)
+        if len(data) < count * width:
+            raise RecordFormatError("Truncated record")
+        if width == 1:
+            codes: Iterable[int] = data
+        else:
+            codes = (int.from_bytes(data[i:i + width], "little") for i in range(0, len(data), width))
+        moves = []
+        for code in codes:
+            row, col = divmod(code >> 1, size)
+            moves.append((row, col, "O" if code & 1 else "S"))
+        yield GameRecord(size, mode, starting, moves)
+
+def _read_jsonl(f: TextIO) -> Iterator[GameRecord]:
+    for line in f:
+        if line.strip():
+            yield GameRecord.from_json(json.loads(line))
+
+#streaming writer, binary unless the path ends in .jsonl or jsonl=True
+class RecordWriter:
+    def __init__(self, path: str, jsonl: bool | None = None, append: bool = False) -> None:
+        self.jsonl = path.endswith(".jsonl") if jsonl is None else jsonl
+        self.count = 0
+        if self.jsonl:
+            self._file = open(path, "a" if append else "w")
+        else:
+            self._file = open(path, "ab" if append else "wb")
+            if self._file.tell() == 0:
+                self._file.write(MAGIC)
+
+    def write(self, record: GameRecord) -> None:
+        if self.jsonl:
+            self._file.write(json.dumps(record.to_json()) + "\n")
+        else:
+            self._file.write(encode_record(record))
+        self.count += 1
+
+    def write_game(self, game: BaseGame) -> None:
+        self.write(GameRecord.from_game(game))
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+#lazily yields records, format detected from the file header
+def read_records(path: str) -> Iterator[GameRecord]:
+    with open(path, "rb") as f:
+        binary = f.read(len(MAGIC)) == MAGIC
+        if binary:
+            yield from _read_binary(f)
+            return
+    with open(path) as f:
+        yield from _read_jsonl(f)
+
+#lazily yields finished games, one at a time
+def replay_records(path: str) -> Iterator[BaseGame]:
+    for record in read_records(path):
+        yield record.replay()
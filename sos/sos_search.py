@@ -0,0 +1,81 @@
+from dataclasses import dataclass
+from enum import IntEnum
+
+Move = tuple[int, int, str]
+
+#bound flag for stored search values
+class Bound(IntEnum):
+    EXACT = 0
+    LOWER = 1 #value is at least this (beta cutoff)
+    UPPER = 2 #value is at most this (failed low)
+
+@dataclass(slots=True)
+class TTEntry:
+    key: int
+    depth: int
+    value: int
+    bound: Bound
+    move: Move | None
+    generation: int
+
+#fixed size zobrist keyed table shared between searches and opponents
+class TranspositionTable:
+    def __init__(self, capacity: int = 1 << 18) -> None:
+        if capacity < 1:
+            raise ValueError("Capacity must be positive")
+        #round up to power of two so index is a mask
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self._mask = size - 1
+        self._slots: list[TTEntry | None] = [None] * size
+        self.generation = 0
+        self.filled = 0
+        self.probes = 0
+        self.hits = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._mask + 1
+
+    def __len__(self) -> int:
+        return self.filled
+
+    #entries from older generations are replaced first
+    def new_search(self) -> None:
+        self.generation += 1
+
+    def clear(self) -> None:
+        self._slots = [None] * self.capacity
+        self.generation = 0
+        self.filled = 0
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key: int) -> TTEntry | None:
+        self.probes += 1
+        entry = self._slots[key & self._mask]
+        if entry is None or entry.key != key:
+            return None
+        self.hits += 1
+        return entry
+
+    #replace empty, same position, stale generation, or shallower entry
+    def store(self, key: int, depth: int, value: int, bound: Bound, move: Move | None = None) -> None:
+        index = key & self._mask
+        entry = self._slots[index]
+        if entry is None:
+            self._slots[index] = TTEntry(key, depth, value, bound, move, self.generation)
+            self.filled += 1
+            return
+        if entry.key == key:
+            if move is None:
+                move = entry.move #keep best move from a shallower search
+        elif entry.generation == self.generation and depth < entry.depth:
+            return
+        entry.key = key
+        entry.depth = depth
+        entry.value = value
+        entry.bound = bound
+        entry.move = move
+        entry.generation = self.generation
@@ -0,0 +1,256 @@
+#headless self-play, run from the sos folder: python -m sos_selfplay --games 1000 --red easy --blue hard
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from itertools import islice
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, asdict, field
+from typing import Iterable, Iterator, TextIO
+
+from sos_logic import start_game, Mode, Player, MIN_N, LARGE_MAX_N
+from sos_computer import (ComputerOpponent, EasyComputerOpponent, HardComputerOpponent, MCTSComputerOpponent,
+                          PerfectComputerOpponent, OpeningBookOpponent)
+from sos_search import Move
+from sos_record import GameRecord, RecordWriter
+
+OPPONENTS: dict[str, type[ComputerOpponent]] = {
+    "easy": EasyComputerOpponent,
+    "hard": HardComputerOpponent,
+    "mcts": MCTSComputerOpponent,
+    "perfect": PerfectComputerOpponent, #perfect:tablebase=path
+    "book": OpeningBookOpponent, #book:book=path,fallback=hard
+}
+
+#opponent name plus constructor keyword arguments, side is filled in per game
+@dataclass(frozen=True)
+class OpponentSpec:
+    name: str
+    options: tuple[tuple[str, object], ...] = ()
+
+    def build(self, side: Player) -> ComputerOpponent:
+        if self.name not in OPPONENTS:
+            raise ValueError(f"Unknown opponent {self.name}")
+        return OPPONENTS[self.name](side, **dict(self.options))
+
+    def __str__(self) -> str:
+        if not self.options:
+            return self.name
+        return self.name + ":" + ",".join(f"{key}={value}" for key, value in self.options)
+
+#"hard:time_limit=0.1,max_depth=3" -> OpponentSpec
+def parse_opponent(text: str) -> OpponentSpec:
+    name, _, rest = text.partition(":")
+    options: list[tuple[str, object]] = []
+    for item in filter(None, rest.split(",")):
+        key, _, raw = item.partition("=")
+        try:
+            value: object = json.loads(raw)
+        except json.JSONDecodeError:
+            value = raw
+        options.append((key.strip(), value))
+    spec = OpponentSpec(name.strip().lower(), tuple(options))
+    if spec.name not in OPPONENTS:
+        raise ValueError(f"Unknown opponent {spec.name}, choose from {', '.join(OPPONENTS)}")
+    return spec
+
+@dataclass(frozen=True)
+class GameTask:
+    index: int
+    red: OpponentSpec
+    blue: OpponentSpec
+    board_size: int
+    mode: Mode
+    starting_player: Player
+    seed: int
+    time_limit: float | None = None
+
+@dataclass
+class GameResult:
+    index: int
+    board_size: int
+    mode: Mode
+    starting_player: Player
+    winner: Player | None
+    red_score: int
+    blue_score: int
+    seconds: float
+    moves: list[Move] = field(default_factory=list)
+
+    def to_json(self) -> dict:
+        data = asdict(self)
+        data["mode"] = str(self.mode)
+        data["starting_player"] = self.starting_player.name.lower()
+        data["winner"] = self.winner.name.lower() if self.winner is not None else None
+        data["moves"] = ["%d,%d,%s" % move for move in self.moves]
+        return data
+
+    def to_record(self) -> GameRecord:
+        return GameRecord(self.board_size, self.mode, self.starting_player, self.moves)
+
+def play_game(red: ComputerOpponent, blue: ComputerOpponent, *, board_size: int, mode: Mode,
+              starting_player: Player = Player.RED, time_limit: float | None = None, index: int = 0) -> GameResult:
+    game = start_game(board_size=board_size, mode=mode, starting_player=starting_player, max_size=LARGE_MAX_N)
+    computers = {Player.RED: red, Player.BLUE: blue}
+    moves: list[Move] = []
+    start = time.perf_counter()
+    while not game.is_over:
+        row, col, letter = computers[game.current_player].choose_move(game, time_limit=time_limit)
+        game.place_letter(row, col, letter)
+        moves.append((row, col, letter))
+    return GameResult(index, board_size, game.mode, starting_player, game.winner, game.red_score, game.blue_score,
+                      time.perf_counter() - start, moves)
+
+#opponents are reused per worker process, building a hard opponent allocates its table
+_opponent_cache: dict[tuple[OpponentSpec, Player], ComputerOpponent] = {}
+
+def _opponent(spec: OpponentSpec, side: Player) -> ComputerOpponent:
+    opponent = _opponent_cache.get((spec, side))
+    if opponent is None:
+        opponent = _opponent_cache[(spec, side)] = spec.build(side)
+    return opponent
+
+def run_task(task: GameTask) -> GameResult:
+    random.seed(task.seed) #easy opponent draws from the module random
+    return play_game(_opponent(task.red, Player.RED), _opponent(task.blue, Player.BLUE),
+                     board_size=task.board_size, mode=task.mode, starting_player=task.starting_player,
+                     time_limit=task.time_limit, index=task.index)
+
+#games cycle through every size and mode, starting player alternates so neither side gets the first move
+def make_tasks(red: OpponentSpec, blue: OpponentSpec, games: int, sizes: list[int], modes: list[Mode],
+               seed: int = 0, time_limit: float | None = None) -> Iterator[GameTask]:
+    combos = [(size, mode) for size in sizes for mode in modes]
+    for index in range(games):
+        size, mode = combos[index % len(combos)]
+        starting = Player.RED if (index // len(combos)) % 2 == 0 else Player.BLUE
+        yield GameTask(index, red, blue, size, mode, starting, seed * 1_000_003 + index, time_limit)
+
+def _run_chunk(tasks: list[GameTask]) -> list[GameResult]:
+    return [run_task(task) for task in tasks]
+
+#results stream back in task order, tasks are read lazily with at most window chunks in flight
+#so millions of games never sit in memory as submitted futures
+def run_selfplay(tasks: Iterable[GameTask], workers: int = 1, chunksize: int = 16,
+                 window: int | None = None) -> Iterator[GameResult]:
+    if workers <= 1:
+        for task in tasks:
+            yield run_task(task)
+        return
+    tasks = iter(tasks)
+    window = window if window is not None else 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: deque[Future] = deque()
+
+        def submit() -> None:
+            chunk = list(islice(tasks, chunksize))
+            if chunk:
+                pending.append(executor.submit(_run_chunk, chunk))
+
+        for _ in range(window):
+            submit()
+        while pending:
+            results = pending.popleft().result()
+            submit()
+            yield from results
+
+@dataclass
+class Summary:
+    games: int = 0
+    red_wins: int = 0
+    blue_wins: int = 0
+    draws: int = 0
+    red_points: int = 0
+    blue_points: int = 0
+    seconds: float = 0.0
+
+    def add(self, result: GameResult) -> None:
+        self.games += 1
+        if result.winner == Player.RED:
+            self.red_wins += 1
+        elif result.winner == Player.BLUE:
+            self.blue_wins += 1
+        else:
+            self.draws += 1
+        self.red_points += result.red_score
+        self.blue_points += result.blue_score
+
+    def to_json(self) -> dict:
+        games = max(self.games, 1)
+        return {
+            "games": self.games,
+            "red_win_rate": self.red_wins / games,
+            "blue_win_rate": self.blue_wins / games,
+            "draw_rate": self.draws / games,
+            "red_mean_score": self.red_points / games,
+            "blue_mean_score": self.blue_points / games,
+            "seconds": self.seconds,
+            "games_per_second": self.games / self.seconds if self.seconds > 0 else 0.0,
+        }
+
+def format_summary(red: OpponentSpec, blue: OpponentSpec, summary: Summary) -> str:
+    data = summary.to_json()
+    return (f"{data['games']} games  red={red}  blue={blue}\n"
+            f"red wins {data['red_win_rate']:.1%}  blue wins {data['blue_win_rate']:.1%}  draws {data['draw_rate']:.1%}\n"
+            f"mean score red {data['red_mean_score']:.2f}  blue {data['blue_mean_score']:.2f}\n"
+            f"{data['games_per_second']:.1f} games/sec over {data['seconds']:.1f}s")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="sos_selfplay", description="Play computer opponents against each other")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--red", type=parse_opponent, default=parse_opponent("easy"),
+                        help="opponent name with options, e.g. hard:time_limit=0.05")
+    parser.add_argument("--blue", type=parse_opponent, default=parse_opponent("easy"))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3])
+    parser.add_argument("--modes", nargs="+", default=[Mode.SIMPLE.value], choices=[m.value for m in Mode])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds per computer move")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", default=None, help="stream results as JSON lines to a file, - for stdout")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    parser.add_argument("--record", default=None, help="append game records to this file, .jsonl for text")
+    return parser
+
+def main(argv: list[str] | None = None, stdout: TextIO | None = None) -> Summary:
+    stdout = stdout if stdout is not None else sys.stdout
+    args = build_parser().parse_args(argv)
+    for size in args.sizes:
+        if not MIN_N <= size <= LARGE_MAX_N:
+            raise SystemExit(f"Board size must be between {MIN_N} and {LARGE_MAX_N}")
+    modes = [Mode(m) for m in args.modes]
+    tasks = make_tasks(args.red, args.blue, args.games, args.sizes, modes, args.seed, args.time_limit)
+
+    out: TextIO | None = None
+    if args.out == "-":
+        out = stdout
+    elif args.out:
+        out = open(args.out, "w")
+    writer = RecordWriter(args.record, append=True) if args.record else None
+    summary = Summary()
+    start = time.perf_counter()
+    try:
+        for result in run_selfplay(tasks, workers=args.workers):
+            summary.add(result)
+            if out is not None:
+                out.write(json.dumps(result.to_json()) + "\n")
+            if writer is not None:
+                writer.write(result.to_record())
+    finally:
+        if out is not None and out is not stdout:
+            out.close()
+        if writer is not None:
+            writer.close()
+    summary.seconds = time.perf_counter() - start
+
+    report = sys.stderr if out is stdout else stdout
+    if args.json:
+        print(json.dumps(summary.to_json()), file=report)
+    else:
+        print(format_summary(args.red, args.blue, summary), file=report)
+    return summary
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+#asyncio game server, one json object per line over tcp, run from the sos folder:
+#python -m sos_server serve --port 8765
+#python -m sos_server load --port 8765 --games 2000 --connections 100
+#client messages:
+#  {"type": "new", "board_size": 5, "mode": "general", "starting_player": "red", "side": "red", "opponent": "easy"}
+#  {"type": "move", "game": 1, "row": 0, "col": 0, "letter": "S"}
+#  {"type": "state", "game": 1}, {"type": "close", "game": 1}, {"type": "metrics"}
+#server messages: game (full state after new or state), update (moves and lines since the last message for
+#that game), closed, metrics, error. side is the player the client controls, "both" for two local players,
+#opponent plays the other side, required with a single side, and thinks in an executor so the event loop never
+#waits for it. finished games and games whose opponent fails are dropped once their last message is sent
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from sos_logic import BaseGame, Mode, Player, start_game, validate_mode, LARGE_MAX_N
+from sos_computer import ComputerOpponent
+from sos_search import Move
+from sos_selfplay import OpponentSpec, parse_opponent
+
+DEFAULT_PORT = 8765
+LATENCY_SAMPLES = 10_000 #recent samples kept per metric
+
+class ProtocolError(ValueError):
+    pass
+
+def _player_name(player: Player | None) -> str | None:
+    return player.name.lower() if player is not None else None
+
+def _parse_player(name: str) -> Player:
+    try:
+        return Player[str(name).upper()]
+    except KeyError:
+        raise ProtocolError(f"Unknown player {name}") from None
+
+#percentiles over a window of recent samples
+class LatencyStats:
+    def __init__(self, samples: int = LATENCY_SAMPLES) -> None:
+        self._samples: deque[float] = deque(maxlen=samples)
+        self.count = 0
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, p: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def to_json(self) -> dict:
+        return {
+            "count": self.count,
+            "p50_ms": self.percentile(50) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": max(self._samples, default=0.0) * 1000,
+        }
+
+@dataclass
+class Session:
+    game_id: int
+    game: BaseGame
+    humans: frozenset[Player]
+    computer: OpponentSpec | None
+    writer: asyncio.StreamWriter
+    #history and line counts already sent, the next update carries everything after them
+    sent_moves: int = 0
+    sent_lines: int = 0
+    thinking: bool = False
+    task: asyncio.Task | None = field(default=None, repr=False)
+
+#opponents are cached per executor thread or process, one search at a time each
+_local = threading.local()
+
+def _computer_move(spec: OpponentSpec, side: Player, game: BaseGame, time_limit: float | None) -> Move:
+    cache = getattr(_local, "opponents", None)
+    if cache is None:
+        cache = _local.opponents = {}
+    opponent: ComputerOpponent | None = cache.get((spec, side))
+    if opponent is None:
+        opponent = cache[(spec, side)] = spec.build(side)
+    return opponent.choose_move(game, time_limit=time_limit)
+
+class GameServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, executor: Executor | None = None,
+                 workers: int | None = None, time_limit: float | None = 0.5, max_size: int = LARGE_MAX_N) -> None:
+        self.host = host
+        self.port = port
+        self._own_executor = executor is None
+        self.executor = executor if executor is not None else ProcessPoolExecutor(max_workers=workers)
+        self.time_limit = time_limit
+        self.max_size = max_size
+        self.sessions: dict[int, Session] = {}
+        self._next_id = 1
+        self._server: asyncio.Server | None = None
+        self.move_latency = LatencyStats() #client move received to update written
+        self.computer_latency = LatencyStats() #computer turn start to update written
+        self.games_started = 0
+        self.games_finished = 0
+        self.moves = 0
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1] #port 0 picks a free one
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for session in list(self.sessions.values()):
+            self._drop(session)
+        if self._own_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def metrics(self) -> dict:
+        return {
+            "games_active": len(self.sessions),
+            "games_started": self.games_started,
+            "games_finished": self.games_finished,
+            "moves": self.moves,
+            "move_latency": self.move_latency.to_json(),
+            "computer_latency": self.computer_latency.to_json(),
+        }
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        owned: set[int] = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                received = time.perf_counter()
+                message = None
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ProtocolError("Message must be an object")
+                    reply = self._dispatch(message, writer, owned)
+                except (ValueError, KeyError, TypeError) as e: #includes the game's own move errors
+                    game_id = message.get("game") if isinstance(message, dict) else None
+                    reply = {"type": "error", "game": game_id, "message": str(e)}
+                if reply is not None:
+                    self._send(writer, reply)
+                    if reply.get("type") == "update":
+                        self.move_latency.record(time.perf_counter() - received)
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    break
+        finally:
+            for game_id in owned:
+                session = self.sessions.get(game_id)
+                if session is not None:
+                    self._drop(session)
+            writer.close()
+
+    def _dispatch(self, message: dict, writer: asyncio.StreamWriter, owned: set[int]) -> dict | None:
+        kind = message.get("type")
+        if kind == "metrics":
+            return {"type": "metrics", **self.metrics()}
+        if kind == "new":
+            session = self._new_session(message, writer)
+            owned.add(session.game_id)
+            self._maybe_think(session)
+            return self._full_state(session)
+        session = self.sessions.get(message.get("game"))
+        if session is None or session.writer is not writer:
+            raise ProtocolError("Unknown game")
+        if kind == "move":
+            return self._move(session, message)
+        if kind == "state":
+            return self._full_state(session)
+        if kind == "close":
+            self._drop(session)
+            owned.discard(session.game_id)
+            return {"type": "closed", "game": session.game_id}
+        raise ProtocolError(f"Unknown message type {kind}")
+
+    def _new_session(self, message: dict, writer: asyncio.StreamWriter) -> Session:
+        mode = validate_mode(message.get("mode", Mode.SIMPLE.value))
+        starting = _parse_player(message.get("starting_player", "red"))
+        game = start_game(board_size=int(message.get("board_size", 3)), mode=mode, starting_player=starting,
+                          max_size=self.max_size)
+        side = message.get("side", "red")
+        humans = frozenset(Player) if side == "both" else frozenset([_parse_player(side)])
+        opponent = message.get("opponent")
+        computer = parse_opponent(opponent) if opponent and len(humans) == 1 else None
+        if computer is None and len(humans) == 1:
+            raise ProtocolError("One sided game needs an opponent")
+        session = Session(self._next_id, game, humans, computer, writer)
+        self.sessions[session.game_id] = session
+        self._next_id += 1
+        self.games_started += 1
+        return session
+
+    def _move(self, session: Session, message: dict) -> dict:
+        game = session.game
+        if session.thinking or game.current_player not in session.humans:
+            raise ProtocolError("Not your turn")
+        game.place_letter(int(message["row"]), int(message["col"]), str(message["letter"]))
+        self.moves += 1
+        update = self._update(session)
+        self._maybe_think(session)
+        return update
+
+    #computer turn runs in the executor on a copy, the update is pushed when it answers
+    def _maybe_think(self, session: Session) -> None:
+        game = session.game
+        if game.is_over or session.computer is None or game.current_player in session.humans:
+            return
+        session.thinking = True
+        session.task = asyncio.get_running_loop().create_task(self._think(session))
+
+    async def _think(self, session: Session) -> None:
+        start = time.perf_counter()
+        game = session.game
+        side = game.current_player
+        loop = asyncio.get_running_loop()
+        try:
+            row, col, letter = await loop.run_in_executor(self.executor, _computer_move, session.computer, side,
+                                                          copy.deepcopy(game), self.time_limit)
+            if self.sessions.get(session.game_id) is not session:
+                return #closed while thinking
+            game.place_letter(row, col, letter)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e: #a broken opponent ends the game for this client only
+            self._send(session.writer, {"type": "error", "game": session.game_id, "message": str(e)})
+            session.task = None #this task, nothing to cancel
+            self._drop(session)
+            return
+        finally:
+            session.thinking = False
+        self.moves += 1
+        self._send(session.writer, self._update(session))
+        self.computer_latency.record(time.perf_counter() - start)
+        try:
+            await session.writer.drain()
+        except ConnectionError:
+            return
+        self._maybe_think(session)
+
+    def _lines_json(self, session: Session, start: int) -> list[list]:
+        return [[*line.start, *line.end, _player_name(line.player)] for line in session.game.lines[start:]]
+
+    def _status(self, session: Session) -> dict:
+        game = session.game
+        return {
+            "game": session.game_id,
+            "red_score": game.red_score,
+            "blue_score": game.blue_score,
+            "current_player": _player_name(game.current_player),
+            "is_over": game.is_over,
+            "winner": _player_name(game.winner),
+        }
+
+    #board diff: every move and line since the last message for this game
+    def _update(self, session: Session) -> dict:
+        game = session.game
+        moves = [[row, col, game.board.get_cell(row, col), _player_name(player)]
+                 for row, col, _, player, _ in game.history[session.sent_moves:]]
+        update = {"type": "update", "move_number": len(game.history), "moves": moves,
+                  "lines": self._lines_json(session, session.sent_lines), **self._status(session)}
+        self._mark_sent(session)
+        return update
+
+    def _full_state(self, session: Session) -> dict:
+        game = session.game
+        state = {"type": "game", "board_size": game.board_size, "mode": str(game.mode),
+                 "sides": sorted(_player_name(p) for p in session.humans),
+                 "cells": ["".join(cell or "." for cell in row) for row in game.board.grid],
+                 "lines": self._lines_json(session, 0), "move_number": len(game.history), **self._status(session)}
+        self._mark_sent(session)
+        return state
+
+    def _mark_sent(self, session: Session) -> None:
+        session.sent_moves = len(session.game.history)
+        session.sent_lines = len(session.game.lines)
+        if session.game.is_over and self.sessions.get(session.game_id) is session and not session.thinking:
+            self._finish(session)
+
+    def _finish(self, session: Session) -> None:
+        self.games_finished += 1
+        del self.sessions[session.game_id]
+
+    def _drop(self, session: Session) -> None:
+        if self.sessions.get(session.game_id) is session:
+            del self.sessions[session.game_id]
+        if session.task is not None and not session.task.done():
+            session.task.cancel()
+
+    @staticmethod
+    def _send(writer: asyncio.StreamWriter, message: dict) -> None:
+        if not writer.is_closing():
+            writer.write(json.dumps(message).encode() + b"\n")
+
+@dataclass
+class LoadResult:
+    games: int = 0
+    moves: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    latency: LatencyStats = field(default_factory=LatencyStats) #client side round trip per move
+
+    def to_json(self) -> dict:
+        return {"games": self.games, "moves": self.moves, "errors": self.errors, "seconds": self.seconds,
+                "moves_per_second": self.moves / self.seconds if self.seconds > 0 else 0.0,
+                "latency": self.latency.to_json()}
+
+async def _read_message(reader: asyncio.StreamReader) -> dict:
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Server closed the connection")
+    return json.loads(line)
+
+#one connection playing its games one after another, random legal moves against the server opponent
+async def _load_connection(host: str, port: int, games: int, board_size: int, mode: Mode, opponent: str | None,
+                           rng: random.Random, result: LoadResult) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(games):
+            writer.write(json.dumps({"type": "new", "board_size": board_size, "mode": str(mode), "side": "red",
+                                     "starting_player": rng.choice(["red", "blue"]),
+                                     "opponent": opponent}).encode() + b"\n")
+            message = await _read_message(reader)
+            if message["type"] == "error":
+                result.errors += 1
+                continue
+            empty = {(r, c) for r, row in enumerate(message["cells"]) for c, cell in enumerate(row) if cell == "."}
+            game_id = message["game"]
+            sent_at: float | None = None
+            while True:
+                if message["type"] == "error":
+                    result.errors += 1
+                    break
+                if message["type"] == "update":
+                    for row, col, _, _ in message["moves"]:
+                        empty.discard((row, col))
+                    if sent_at is not None:
+                        result.latency.record(time.perf_counter() - sent_at)
+                        result.moves += 1
+                        sent_at = None
+                if message["is_over"]:
+                    break
+                if message["current_player"] == "red" and sent_at is None:
+                    row, col = rng.choice(sorted(empty))
+                    sent_at = time.perf_counter()
+                    writer.write(json.dumps({"type": "move", "game": game_id, "row": row, "col": col,
+                                             "letter": rng.choice("SO")}).encode() + b"\n")
+                message = await _read_message(reader)
+            result.games += 1
+    finally:
+        writer.close()
+
+async def run_load_test(host: str = "127.0.0.1", port: int = DEFAULT_PORT, games: int = 100, connections: int = 10,
+                        board_size: int = 5, mode: Mode = Mode.GENERAL, opponent: str | None = "easy",
+                        seed: int = 0) -> LoadResult:
+    result = LoadResult()
+    start = time.perf_counter()
+    shares = [games // connections + (1 if i < games % connections else 0) for i in range(connections)]
+    await asyncio.gather(*(_load_connection(host, port, share, board_size, mode, opponent,
+                                            random.Random(seed * 1_000_003 + i), result)
+                           for i, share in enumerate(shares) if share))
+    result.seconds = time.perf_counter() - start
+    return result
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="sos_server", description="SOS game server and load test client")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes for computer moves")
+    serve.add_argument("--time-limit", type=float, default=0.5, help="seconds per computer move")
+    load = commands.add_parser("load", help="play many games against a running server")
+    load.add_argument("--host", default="127.0.0.1")
+    load.add_argument("--port", type=int, default=DEFAULT_PORT)
+    load.add_argument("--games", type=int, default=1000)
+    load.add_argument("--connections", type=int, default=50)
+    load.add_argument("--size", type=int, default=5)
+    load.add_argument("--mode", default=Mode.GENERAL.value, choices=[m.value for m in Mode])
+    load.add_argument("--opponent", default="easy", help="server side opponent, e.g. hard:max_depth=2")
+    load.add_argument("--seed", type=int, default=0)
+    return parser
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    if args.command == "serve":
+        server = GameServer(args.host, args.port, workers=args.workers, time_limit=args.time_limit)
+        print(f"listening on {args.host}:{args.port}", file=sys.stderr)
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            pass
+        return
+    result = asyncio.run(run_load_test(args.host, args.port, args.games, args.connections, args.size,
+                                       Mode(args.mode), args.opponent, args.seed))
+    print(json.dumps(result.to_json(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#exact solver and on-disk tablebase for small boards, run from the sos folder:
+#python -m sos_tablebase --size 3 --mode general --out tb_3_general.sostb
+#values are for the side to move and depend only on the cells, turns always alternate and both sides
+#have the same moves: simple 1 win, 0 draw, -1 loss, general the best future score margin
+
+import argparse
+import mmap
+import struct
+import sys
+import time
+from operator import itemgetter
+
+from sos_logic import BaseGame, Mode, EMPTY, S_CELL, O_CELL, geometry, validate_mode
+
+MAGIC = b"SOSTB\x01"
+HEADER = struct.Struct("<6sBBQ") #magic, board size, mode (0 simple, 1 general), entry count
+ENTRY = struct.Struct("<Qh") #canonical key, value
+_DIGITS = bytes.maketrans(b"\x00\x01\x02", b"012")
+
+#base 3 number of the smallest of the 8 symmetric cell orders, exact so there are no collisions
+def canonical_key(cells: bytes | bytearray, gathers: tuple[itemgetter, ...]) -> int:
+    smallest = min(bytes(gather(cells)) for gather in gathers)
+    return int(smallest.translate(_DIGITS), 3)
+
+#value of every reachable position with an empty cell, keyed by canonical_key
+def solve(board_size: int, mode: str | Mode) -> dict[int, int]:
+    mode = validate_mode(mode)
+    general = mode == Mode.GENERAL
+    shared = geometry(board_size)
+    s_table, o_table, gathers = shared.s_triplets, shared.o_triplets, shared.symmetry.gathers
+    cells = bytearray(board_size * board_size)
+    values: dict[int, int] = {}
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * len(cells) + 100))
+
+    def lines(index: int, code: int) -> int:
+        if code == S_CELL:
+            return sum(1 for _, _, other, mid in s_table[index] if cells[other] == S_CELL and cells[mid] == O_CELL)
+        return sum(1 for start, end in o_table[index] if cells[start] == S_CELL and cells[end] == S_CELL)
+
+    def search(empty: int) -> int:
+        key = canonical_key(cells, gathers)
+        value = values.get(key)
+        if value is not None:
+            return value
+        best = -len(cells) * 8
+        for index in range(len(cells)):
+            if cells[index] != EMPTY:
+                continue
+            for code in (S_CELL, O_CELL):
+                scored = lines(index, code)
+                if scored and not general:
+                    best = 1 #first sos wins, keep going so every reachable position gets a value
+                    continue
+                if empty == 1:
+                    child = 0
+                else:
+                    cells[index] = code
+                    child = search(empty - 1)
+                    cells[index] = EMPTY
+                best = max(best, scored - child if general else -child)
+        values[key] = best
+        return best
+
+    search(len(cells))
+    return values
+
+def write_tablebase(path: str, board_size: int, mode: str | Mode, values: dict[int, int]) -> None:
+    mode = validate_mode(mode)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, board_size, 1 if mode == Mode.GENERAL else 0, len(values)))
+        for key in sorted(values):
+            f.write(ENTRY.pack(key, values[key]))
+
+#sorted entries in a file, mapped on first lookup and binary searched
+class Tablebase:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            magic, self.board_size, mode, self.count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a tablebase")
+        self.mode = Mode.GENERAL if mode else Mode.SIMPLE
+        self._gathers = geometry(self.board_size).symmetry.gathers
+        self._file = None
+        self._map: mmap.mmap | None = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _mapped(self) -> mmap.mmap:
+        if self._map is None:
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def get(self, key: int) -> int | None:
+        data = self._mapped()
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry_key, value = ENTRY.unpack_from(data, HEADER.size + middle * ENTRY.size)
+            if entry_key == key:
+                return value
+            if entry_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def lookup(self, cells: bytes | bytearray) -> int | None:
+        return self.get(canonical_key(cells, self._gathers))
+
+    def covers(self, game: BaseGame) -> bool:
+        return game.board_size == self.board_size and game.mode == self.mode
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+            self._file = None
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="sos_tablebase", description="Solve a small board and write its tablebase")
+    parser.add_argument("--size", type=int, default=3)
+    parser.add_argument("--mode", default=Mode.SIMPLE.value, choices=[m.value for m in Mode])
+    parser.add_argument("--out", required=True)
+    return parser
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    values = solve(args.size, args.mode)
+    write_tablebase(args.out, args.size, args.mode, values)
+    root = values[0]
+    print(f"{len(values)} positions in {time.perf_counter() - start:.1f}s, value of the empty board {root}")
+
+if __name__ == "__main__":
+    main()
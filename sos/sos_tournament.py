@@ -0,0 +1,308 @@
+#tournaments between computer opponents with bradley-terry ratings on the elo scale, run from the sos folder:
+#python -m sos_tournament --player easy --player hard:max_depth=2 --player mcts:playouts=300 \
+#    --games-per-pair 20 --sizes 4 5 --modes simple general --checkpoint run.jsonl
+#every finished game is appended to the checkpoint, running the same command again skips those games
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+from dataclasses import dataclass
+from typing import Iterator, TextIO
+
+from sos_logic import Mode, Player, MIN_N, LARGE_MAX_N
+from sos_selfplay import OpponentSpec, GameTask, parse_opponent, run_selfplay
+
+ROUND_ROBIN = "round-robin"
+SWISS = "swiss"
+ELO_SCALE = 400 / math.log(10)
+
+@dataclass(frozen=True)
+class TournamentConfig:
+    entrants: tuple[OpponentSpec, ...]
+    format: str = ROUND_ROBIN
+    games_per_pair: int = 2 #per size and mode, colors alternate
+    sizes: tuple[int, ...] = (3,)
+    modes: tuple[Mode, ...] = (Mode.SIMPLE,)
+    rounds: int = 5 #swiss only
+    seed: int = 0
+    time_limit: float | None = None
+
+    def __post_init__(self) -> None:
+        names = self.names
+        if len(names) < 2:
+            raise ValueError("A tournament needs at least two players")
+        if len(set(names)) != len(names):
+            raise ValueError("Players must be different")
+        if self.format not in (ROUND_ROBIN, SWISS):
+            raise ValueError(f"Unknown format {self.format}")
+
+    @property
+    def names(self) -> list[str]:
+        return [str(spec) for spec in self.entrants]
+
+    #the checkpoint header, a resumed run must match it
+    def to_json(self) -> dict:
+        return {"entrants": self.names, "format": self.format, "games_per_pair": self.games_per_pair,
+                "sizes": list(self.sizes), "modes": [str(m) for m in self.modes], "rounds": self.rounds,
+                "seed": self.seed, "time_limit": self.time_limit}
+
+@dataclass(frozen=True)
+class MatchResult:
+    index: int
+    round: int
+    red: str
+    blue: str
+    board_size: int
+    mode: Mode
+    winner: Player | None
+    red_score: int
+    blue_score: int
+
+    #result for the red player, 1 win, 0.5 draw, 0 loss
+    @property
+    def red_points(self) -> float:
+        return 0.5 if self.winner is None else float(self.winner == Player.RED)
+
+    def to_json(self) -> dict:
+        return {"index": self.index, "round": self.round, "red": self.red, "blue": self.blue,
+                "board_size": self.board_size, "mode": str(self.mode),
+                "winner": self.winner.name.lower() if self.winner is not None else None,
+                "red_score": self.red_score, "blue_score": self.blue_score}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "MatchResult":
+        winner = Player[data["winner"].upper()] if data["winner"] else None
+        return cls(data["index"], data["round"], data["red"], data["blue"], data["board_size"], Mode(data["mode"]),
+                   winner, data["red_score"], data["blue_score"])
+
+#append only json lines, first line is the config
+class Checkpoint:
+    def __init__(self, path: str, config: TournamentConfig) -> None:
+        self.path = path
+        self.results: list[MatchResult] = []
+        header = config.to_json()
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                first = f.readline()
+                if json.loads(first) != header:
+                    raise ValueError(f"{path} belongs to a different tournament")
+                offset = end = len(first)
+                for line in f:
+                    offset += len(line)
+                    try:
+                        result = MatchResult.from_json(json.loads(line))
+                    except (ValueError, KeyError):
+                        continue #line cut short by an interrupted write
+                    if line.endswith(b"\n"):
+                        self.results.append(result)
+                        end = offset
+            #drop a torn tail so the next result starts on its own line
+            os.truncate(path, end)
+            self._file: TextIO = open(path, "a")
+        else:
+            self._file = open(path, "w")
+            self._file.write(json.dumps(header) + "\n")
+            self._file.flush()
+
+    def append(self, result: MatchResult) -> None:
+        self._file.write(json.dumps(result.to_json()) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+#games for one round of pairings, (red, blue) entrant indexes swap every game
+def pairing_tasks(config: TournamentConfig, pairs: list[tuple[int, int]], round_number: int,
+                  first_index: int) -> Iterator[tuple[GameTask, int]]:
+    index = first_index
+    for first, second in pairs:
+        for game in range(config.games_per_pair):
+            red, blue = (first, second) if game % 2 == 0 else (second, first)
+            starting = Player.RED if (game // 2) % 2 == 0 else Player.BLUE
+            for size in config.sizes:
+                for mode in config.modes:
+                    yield GameTask(index, config.entrants[red], config.entrants[blue], size, mode, starting,
+                                   config.seed * 1_000_003 + index, config.time_limit), round_number
+                    index += 1
+
+def round_robin_pairs(count: int) -> list[tuple[int, int]]:
+    return [(first, second) for first in range(count) for second in range(first + 1, count)]
+
+#players sorted by points so far, each paired with the next player it has not met yet
+#an odd player out sits the round, the lowest ranked of those with the fewest byes
+def swiss_pairs(names: list[str], results: list[MatchResult]) -> list[tuple[int, int]]:
+    points = [0.0] * len(names)
+    met: set[tuple[int, int]] = set()
+    played: dict[int, set[int]] = {} #round number to the players in it
+    lookup = {name: i for i, name in enumerate(names)}
+    for result in results:
+        red, blue = lookup[result.red], lookup[result.blue]
+        points[red] += result.red_points
+        points[blue] += 1 - result.red_points
+        met.add((min(red, blue), max(red, blue)))
+        played.setdefault(result.round, set()).update((red, blue))
+    byes = [sum(1 for players in played.values() if i not in players) for i in range(len(names))]
+    order = sorted(range(len(names)), key=lambda i: (-points[i], i))
+    if len(order) % 2:
+        bye = min(reversed(order), key=lambda i: byes[i])
+        order.remove(bye)
+    pairs = []
+    while order:
+        first = order.pop(0)
+        partner = next((i for i in order if (min(first, i), max(first, i)) not in met), order[0])
+        order.remove(partner)
+        pairs.append((first, partner))
+    return pairs
+
+def _games_per_pairing(config: TournamentConfig) -> int:
+    return config.games_per_pair * len(config.sizes) * len(config.modes)
+
+#plays every game not already in the checkpoint, returns all results in index order
+def run_tournament(config: TournamentConfig, workers: int = 1, checkpoint: str | None = None,
+                   progress: TextIO | None = None) -> list[MatchResult]:
+    store = Checkpoint(checkpoint, config) if checkpoint else None
+    results = {result.index: result for result in store.results} if store else {}
+    names = config.names
+    try:
+        if config.format == ROUND_ROBIN:
+            schedule = [(0, round_robin_pairs(len(names)))]
+        else:
+            schedule = [(number, None) for number in range(config.rounds)]
+        first_index = 0
+        for round_number, pairs in schedule:
+            if pairs is None: #swiss rounds are paired from the finished rounds before them
+                earlier = [r for r in results.values() if r.round < round_number]
+                pairs = swiss_pairs(names, sorted(earlier, key=lambda r: r.index))
+            tasks = {task.index: (task, number) for task, number in
+                     pairing_tasks(config, pairs, round_number, first_index)}
+            first_index += len(pairs) * _games_per_pairing(config)
+            pending = [task for index, (task, _) in tasks.items() if index not in results]
+            for game in run_selfplay(pending, workers=workers):
+                task, number = tasks[game.index]
+                result = MatchResult(game.index, number, str(task.red), str(task.blue), game.board_size, game.mode,
+                                     game.winner, game.red_score, game.blue_score)
+                results[result.index] = result
+                if store is not None:
+                    store.append(result)
+                if progress is not None and len(results) % 100 == 0:
+                    print(f"{len(results)} games", file=progress)
+    finally:
+        if store is not None:
+            store.close()
+    return [results[index] for index in sorted(results)]
+
+#bradley-terry strengths by minorization-maximization, draws count half a win each way
+#returns elo scale ratings with mean 0
+def bradley_terry(names: list[str], results: list[MatchResult], iterations: int = 500,
+                  tolerance: float = 1e-9) -> dict[str, float]:
+    count = len(names)
+    lookup = {name: i for i, name in enumerate(names)}
+    wins = [0.0] * count
+    games = [[0.0] * count for _ in range(count)]
+    for result in results:
+        red, blue = lookup[result.red], lookup[result.blue]
+        wins[red] += result.red_points
+        wins[blue] += 1 - result.red_points
+        games[red][blue] += 1
+        games[blue][red] += 1
+    #a small prior draw against every other player keeps unbeaten and winless players finite
+    prior = 0.5
+    strengths = [1.0] * count
+    for _ in range(iterations):
+        updated = []
+        for i in range(count):
+            denominator = sum((games[i][j] + 2 * prior) / (strengths[i] + strengths[j])
+                              for j in range(count) if j != i)
+            updated.append((wins[i] + prior * (count - 1)) / denominator)
+        scale = math.exp(sum(math.log(s) for s in updated) / count) #geometric mean 1
+        updated = [s / scale for s in updated]
+        change = max(abs(a - b) for a, b in zip(updated, strengths))
+        strengths = updated
+        if change < tolerance:
+            break
+    return {name: ELO_SCALE * math.log(strengths[i]) for i, name in enumerate(names)}
+
+@dataclass
+class Rating:
+    name: str
+    games: int = 0
+    points: float = 0.0
+    elo: float = 0.0
+    low: float = 0.0 #confidence interval from bootstrap resampling of the games
+    high: float = 0.0
+
+    def to_json(self) -> dict:
+        return {"name": self.name, "games": self.games, "points": self.points, "elo": round(self.elo, 1),
+                "low": round(self.low, 1), "high": round(self.high, 1)}
+
+def ratings(names: list[str], results: list[MatchResult], bootstrap: int = 200, confidence: float = 0.95,
+            seed: int = 0) -> list[Rating]:
+    table = {name: Rating(name) for name in names}
+    for result in results:
+        table[result.red].games += 1
+        table[result.blue].games += 1
+        table[result.red].points += result.red_points
+        table[result.blue].points += 1 - result.red_points
+    for name, elo in bradley_terry(names, results).items():
+        table[name].elo = table[name].low = table[name].high = elo
+    if bootstrap and results:
+        rng = random.Random(seed)
+        samples: dict[str, list[float]] = {name: [] for name in names}
+        for _ in range(bootstrap):
+            resampled = rng.choices(results, k=len(results))
+            for name, elo in bradley_terry(names, resampled, iterations=100, tolerance=1e-6).items():
+                samples[name].append(elo)
+        tail = (1 - confidence) / 2
+        for name, values in samples.items():
+            values.sort()
+            table[name].low = values[int(tail * (len(values) - 1))]
+            table[name].high = values[int(math.ceil((1 - tail) * (len(values) - 1)))]
+    return sorted(table.values(), key=lambda r: -r.elo)
+
+def format_ratings(rows: list[Rating]) -> str:
+    width = max(len("player"), *(len(r.name) for r in rows))
+    lines = [f"{'player':<{width}}  {'games':>6}  {'score':>6}  {'elo':>7}  {'95% interval':>17}"]
+    for r in rows:
+        score = r.points / r.games if r.games else 0.0
+        lines.append(f"{r.name:<{width}}  {r.games:>6}  {score:>6.1%}  {r.elo:>7.1f}  "
+                     f"[{r.low:>7.1f}, {r.high:>7.1f}]")
+    return "\n".join(lines)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="sos_tournament", description="Rate computer opponents against each other")
+    parser.add_argument("--player", type=parse_opponent, action="append", required=True,
+                        help="opponent with options, repeat for each player, e.g. hard:max_depth=2")
+    parser.add_argument("--format", default=ROUND_ROBIN, choices=[ROUND_ROBIN, SWISS])
+    parser.add_argument("--rounds", type=int, default=5, help="swiss rounds")
+    parser.add_argument("--games-per-pair", type=int, default=2, help="games per pairing for each size and mode")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3])
+    parser.add_argument("--modes", nargs="+", default=[Mode.SIMPLE.value], choices=[m.value for m in Mode])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds per computer move")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--checkpoint", default=None, help="json lines file to resume from and append to")
+    parser.add_argument("--bootstrap", type=int, default=200, help="resamples for the rating intervals")
+    parser.add_argument("--json", action="store_true", help="print ratings as JSON")
+    return parser
+
+def main(argv: list[str] | None = None, stdout: TextIO | None = None) -> list[Rating]:
+    stdout = stdout if stdout is not None else sys.stdout
+    args = build_parser().parse_args(argv)
+    for size in args.sizes:
+        if not MIN_N <= size <= LARGE_MAX_N:
+            raise SystemExit(f"Board size must be between {MIN_N} and {LARGE_MAX_N}")
+    config = TournamentConfig(tuple(args.player), args.format, args.games_per_pair, tuple(args.sizes),
+                              tuple(Mode(m) for m in args.modes), args.rounds, args.seed, args.time_limit)
+    results = run_tournament(config, workers=args.workers, checkpoint=args.checkpoint, progress=sys.stderr)
+    rows = ratings(config.names, results, bootstrap=args.bootstrap, seed=args.seed)
+    if args.json:
+        print(json.dumps([row.to_json() for row in rows]), file=stdout)
+    else:
+        print(format_ratings(rows), file=stdout)
+    return rows
+
+if __name__ == "__main__":
+    main()
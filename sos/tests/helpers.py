@@ -0,0 +1,21 @@
+#seeded random play shared by the tests
+import random
+
+from sos_logic import start_game, BaseGame, Board, Mode, Player, LARGE_MAX_N
+from sos_search import Move
+
+#uniform empty cell and letter, rng draws the cell first then the letter
+def random_move(board: Board, rng: random.Random) -> Move:
+    row, col = rng.choice(board.empty_cells())
+    return row, col, rng.choice("SO")
+
+#plays random moves until the game ends or it has moves in its history
+def play_random(game: BaseGame, rng: random.Random, moves: int | None = None) -> BaseGame:
+    while not game.is_over and (moves is None or len(game.history) < moves):
+        game.place_letter(*random_move(game.board, rng))
+    return game
+
+def random_game(board_size: int, mode: Mode, seed: int, starting_player: Player = Player.RED,
+                moves: int | None = None) -> BaseGame:
+    game = start_game(board_size=board_size, mode=mode, starting_player=starting_player, max_size=LARGE_MAX_N)
+    return play_random(game, random.Random(seed), moves)
@@ -0,0 +1,79 @@
+import unittest
+
+from sos_logic import start_game, Mode, Player, InvalidMoveError, EMPTY
+
+try:
+    import numpy as np
+    from sos_batch import BatchGames, S, O, NO_WINNER, COUNT_DTYPE
+except ImportError: #numpy is optional
+    np = None
+
+LETTERS = {1: "S", 2: "O"}
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TestBatchMatchesGames(unittest.TestCase):
+    def check_mode(self, mode: Mode, board_size: int, count: int, seed: int):
+        rng = np.random.default_rng(seed)
+        batch = BatchGames(count, board_size, mode, starting_player=Player.BLUE)
+        games = [start_game(board_size=board_size, mode=mode, starting_player=Player.BLUE) for _ in range(count)]
+        while not batch.is_over.all():
+            rows, cols, letters = batch.random_moves(rng)
+            scored = batch.apply(rows, cols, letters)
+            for k, game in enumerate(games):
+                if game.is_over:
+                    self.assertEqual(scored[k], 0)
+                    continue
+                self.assertEqual(game.make_move(int(rows[k]), int(cols[k]), LETTERS[int(letters[k])]), scored[k])
+            for k, game in enumerate(games):
+                self.assertEqual(bool(batch.is_over[k]), game.is_over)
+                self.assertEqual(int(batch.current_player[k]), game.current_player)
+                self.assertEqual((int(batch.red_score[k]), int(batch.blue_score[k])), (game.red_score, game.blue_score))
+        for k, game in enumerate(games):
+            expected = NO_WINNER if game.winner is None else int(game.winner)
+            self.assertEqual(int(batch.winner[k]), expected)
+            grid = [[{None: 0, "S": S, "O": O}[game.board.get_cell(r, c)] for c in range(board_size)]
+                    for r in range(board_size)]
+            self.assertEqual(batch.cells[k].tolist(), grid)
+
+    def test_simple_matches(self):
+        for size in (3, 5, 8):
+            with self.subTest(size=size):
+                self.check_mode(Mode.SIMPLE, size, 40, size)
+
+    def test_general_matches(self):
+        for size in (3, 6, 8):
+            with self.subTest(size=size):
+                self.check_mode(Mode.GENERAL, size, 20, size + 100)
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TestBatchMoves(unittest.TestCase):
+    def test_occupied_cell_rejected(self):
+        batch = BatchGames(2, 3, Mode.SIMPLE)
+        batch.apply([0, 1], [0, 1], [S, O])
+        with self.assertRaises(InvalidMoveError):
+            batch.apply([0, 2], [0, 2], [S, S])
+
+    def test_play_random_finishes(self):
+        batch = BatchGames(64, 4, Mode.GENERAL)
+        batch.play_random(np.random.default_rng(0))
+        self.assertTrue(batch.is_over.all())
+        self.assertTrue((batch.filled == 16).all())
+
+    def test_large_board_counts(self):
+        #a 200x200 board has more cells and lines than int16 holds, fill it directly and play the end
+        batch = BatchGames(1, 200, Mode.GENERAL, max_size=256)
+        cells = batch.cells
+        cells[:] = O
+        cells[0, 0, :3] = [S, O, EMPTY]
+        cells[0, 1, 0] = EMPTY
+        batch.filled[:] = 200 * 200 - 2
+        batch.red_score[:] = 40_000
+        self.assertEqual(batch.red_score.dtype, COUNT_DTYPE)
+        self.assertEqual(list(batch.apply([1], [0], [O])), [0])
+        self.assertEqual(list(batch.apply([0], [2], [S])), [1])
+        self.assertEqual((int(batch.filled[0]), int(batch.red_score[0]), int(batch.blue_score[0])), (40_000, 40_000, 1))
+        self.assertTrue(batch.is_over[0])
+        self.assertEqual(batch.winner[0], Player.RED)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout, redirect_stderr
+
+from sos_bench import run_benchmarks, compare, default_benchmarks, main
+
+class TestBenchmarks(unittest.TestCase):
+    def test_names_cover_sizes_and_modes(self):
+        names = default_benchmarks()
+        for expected in ("board_place", "is_full", "easy_choose_move_8", "new_lines_from_move_3",
+                         "random_game_simple_8", "random_game_general_3"):
+            self.assertIn(expected, names)
+
+    def test_run_selected(self):
+        results = run_benchmarks(["is_full", "random_game_simple_3"], repeat=1, min_time=0.0)
+        self.assertEqual(set(results), {"is_full", "random_game_simple_3"})
+        self.assertGreater(results["is_full"]["seconds_per_op"], 0)
+
+    def test_unknown_name(self):
+        with self.assertRaises(ValueError):
+            run_benchmarks(["nope"])
+
+    def test_compare(self):
+        baseline = {"a": {"seconds_per_op": 1.0}, "b": {"seconds_per_op": 1.0}}
+        results = {"a": {"seconds_per_op": 1.2}, "b": {"seconds_per_op": 2.0}, "c": {"seconds_per_op": 9.0}}
+        self.assertEqual(compare(results, baseline, tolerance=0.25), {"b": 2.0})
+
+    def test_main_fails_on_regression(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "baseline.json")
+            with open(path, "w") as f:
+                json.dump({"is_full": {"seconds_per_op": 1e-12}}, f)
+            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()) as err:
+                code = main(["is_full", "--repeat", "1", "--min-time", "0", "--baseline", path])
+        self.assertEqual(code, 1)
+        self.assertIn("REGRESSION is_full", err.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import io
+import os
+import random
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from sos_logic import start_game, Mode, Player, transform_cell
+from sos_record import GameRecord, RecordWriter
+from sos_book import BookBuilder, OpeningBook, main as book_main
+from sos_computer import OpeningBookOpponent, EasyComputerOpponent
+from tests.helpers import play_random
+
+def record(moves, mode=Mode.SIMPLE, size=4):
+    return GameRecord(size, mode, Player.RED, moves)
+
+#red wins with the fourth move
+RED_WIN = [(0, 0, "S"), (3, 3, "O"), (0, 1, "O"), (1, 0, "O"), (0, 2, "S")]
+
+class TestOpeningBook(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "book.sosb")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_symmetric_games_share_entries(self):
+        builder = BookBuilder(max_ply=1)
+        for transform in range(8):
+            moves = [(*transform_cell(transform, row, col, 4), letter) for row, col, letter in RED_WIN]
+            builder.add_record(record(moves))
+        self.assertEqual(builder.write(self.path), 1)
+        book = OpeningBook(self.path)
+        game = start_game(board_size=4, mode=Mode.SIMPLE, starting_player=Player.RED)
+        (entry,) = book.lookup(game)
+        self.assertEqual((entry.plays, entry.wins, entry.draws), (8, 8, 0))
+        self.assertIn(entry.move[:2], [(0, 0), (0, 3), (3, 0), (3, 3)])
+        book.close()
+
+    def test_best_move_mapped_to_board(self):
+        builder = BookBuilder(max_ply=4)
+        builder.add_record(record(RED_WIN))
+        losing = [(1, 1, "S"), (1, 2, "O"), (3, 3, "S"), (1, 3, "S")] #blue scores
+        builder.add_record(record(losing))
+        builder.write(self.path)
+        book = OpeningBook(self.path)
+        game = start_game(board_size=4, mode=Mode.SIMPLE, starting_player=Player.RED)
+        first = book.best_move(game)
+        self.assertIn(first, [(0, 0, "S"), (0, 3, "S"), (3, 0, "S"), (3, 3, "S")])
+        #a rotated line still finds the same continuation
+        for row, col, letter in [(3, 0, "S"), (0, 3, "O")]:
+            game.place_letter(row, col, letter)
+        self.assertIn(book.best_move(game), [(2, 0, "O"), (3, 1, "O")])
+        self.assertIsNone(book.best_move(game, min_plays=2))
+
+    def test_opponent_falls_back(self):
+        records_path = os.path.join(self.tmp.name, "games.sos")
+        rng = random.Random(3)
+        with RecordWriter(records_path) as writer:
+            for _ in range(20):
+                game = start_game(board_size=5, mode=Mode.GENERAL, starting_player=Player.RED)
+                writer.write_game(play_random(game, rng))
+        with redirect_stdout(io.StringIO()):
+            count = book_main([records_path, "--out", self.path, "--max-ply", "3"])
+        self.assertGreater(count, 0)
+        self.assertEqual(len(OpeningBook(self.path)), count)
+
+        opponent = OpeningBookOpponent(Player.RED, self.path, fallback=EasyComputerOpponent(Player.RED))
+        game = start_game(board_size=5, mode=Mode.GENERAL, starting_player=Player.RED)
+        while not game.is_over:
+            game.place_letter(*opponent.choose_move(game))
+        self.assertGreaterEqual(opponent.book_moves, 1)
+        self.assertLess(opponent.book_moves, 25)
+
+if __name__ == '__main__':
+    unittest.main()
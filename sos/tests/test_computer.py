@@ -1,8 +1,12 @@
 import unittest
 import random
+import threading
+import time
 
 from sos_logic import (start_game, Mode, Player, InvalidMoveError)
-from sos_computer import EasyComputerOpponent
+from sos_computer import EasyComputerOpponent, HardComputerOpponent, MCTSComputerOpponent
+from sos_search import TranspositionTable
+from tests.helpers import random_game
 
 #user story 8: move against computer opponent in simple game
 class TestSimplePlayerComputer(unittest.TestCase):
@@ -152,3 +156,163 @@ class TestComputerMove(unittest.TestCase):
         self.assertTrue(game.board.is_empty(row, col))
         self.assertIn(letter, ("S", "O"))
 
+
+class TestHardComputer(unittest.TestCase):
+    def test_takes_winning_move_simple(self):
+        game = start_game(board_size=4, mode=Mode.SIMPLE, starting_player=Player.RED)
+        game.place_letter(0, 0, "S")
+        game.place_letter(3, 3, "O")
+        game.place_letter(0, 2, "S")
+        computer = HardComputerOpponent(Player.BLUE, time_limit=1.0)
+        self.assertEqual(computer.choose_move(game), (0, 1, "O"))
+
+    def test_avoids_gift_moves(self):
+        #red S in the center, cells near it can hand red an SOS back
+        game = start_game(board_size=5, mode=Mode.SIMPLE, starting_player=Player.RED)
+        game.place_letter(2, 2, "S")
+        computer = HardComputerOpponent(Player.BLUE, time_limit=None, max_depth=2)
+        row, col, letter = computer.choose_move(game)
+        self.assertFalse(game.board.gives_away(row, col, letter))
+        game.place_letter(row, col, letter)
+        for r, c in game.board.empty_cells():
+            for candidate in ("S", "O"):
+                self.assertEqual(game.new_lines_from_move(r, c, candidate, Player.RED), [])
+
+    def test_general_takes_most_lines(self):
+        game = start_game(board_size=3, mode=Mode.GENERAL, starting_player=Player.RED)
+        for row, col in [(0, 0), (0, 2), (2, 0), (2, 2)]:
+            game.board.place(row, col, "S")
+        game.zobrist = game.compute_zobrist()
+        computer = HardComputerOpponent(Player.RED, time_limit=None, max_depth=1)
+        self.assertEqual(computer.choose_move(game), (1, 1, "O")) #two diagonals at once
+
+    def test_search_restores_game(self):
+        random.seed(2)
+        game = start_game(board_size=6, mode=Mode.GENERAL, starting_player=Player.RED)
+        for _ in range(6):
+            game.place_letter(*EasyComputerOpponent(game.current_player).choose_move(game))
+        zobrist, history, lines = game.zobrist, list(game.history), list(game.lines)
+        computer = HardComputerOpponent(game.current_player, time_limit=None, node_limit=3000)
+        row, col, letter = computer.choose_move(game)
+        self.assertTrue(game.board.is_empty(row, col))
+        self.assertEqual((game.zobrist, game.history, list(game.lines)), (zobrist, history, lines))
+        self.assertGreaterEqual(computer.depth_reached, 1)
+
+    def test_shared_table_and_time_limit(self):
+        table = TranspositionTable(capacity=1 << 12)
+        red = HardComputerOpponent(Player.RED, table=table)
+        blue = HardComputerOpponent(Player.BLUE, table=table)
+        game = start_game(board_size=4, mode=Mode.GENERAL, starting_player=Player.RED)
+        computers = {Player.RED: red, Player.BLUE: blue}
+        while not game.is_over:
+            game.place_letter(*computers[game.current_player].choose_move(game, time_limit=0.05))
+        self.assertTrue(game.board.is_full())
+        self.assertGreater(len(table), 0)
+
+    def test_time_limit_on_large_board(self):
+        game = random_game(64, Mode.GENERAL, 5, moves=64 * 64 // 4)
+        computer = HardComputerOpponent(game.current_player)
+        start = time.perf_counter()
+        computer.choose_move(game, time_limit=0.5)
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+    def test_stop_from_another_thread(self):
+        game = start_game(board_size=6, mode=Mode.GENERAL, starting_player=Player.RED)
+        history = list(game.history)
+        computer = HardComputerOpponent(Player.RED, time_limit=None)
+        moves = []
+        thread = threading.Thread(target=lambda: moves.append(computer.choose_move(game)))
+        thread.start()
+        time.sleep(0.05)
+        computer.stop()
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+        row, col, letter = moves[0]
+        self.assertTrue(game.board.is_empty(row, col))
+        self.assertEqual(game.history, history)
+
+    def test_search_after_stop(self):
+        game = start_game(board_size=5, mode=Mode.GENERAL, starting_player=Player.RED)
+        computer = HardComputerOpponent(Player.RED, time_limit=None)
+        thread = threading.Thread(target=computer.choose_move, args=(game,))
+        thread.start()
+        time.sleep(0.05)
+        computer.stop()
+        thread.join(timeout=5)
+        #later searches run to their own budget instead of stopping at the first check
+        computer.node_limit = 4096
+        game.place_letter(2, 2, "S")
+        computer.choose_move(game)
+        self.assertEqual(computer.nodes, 4096)
+        game.place_letter(0, 0, "O")
+        computer.ponder(game, threading.Event())
+        self.assertEqual(computer.nodes, 4096)
+
+    def test_ponder_warms_table(self):
+        random.seed(6)
+        game = start_game(board_size=5, mode=Mode.GENERAL, starting_player=Player.RED)
+        for _ in range(4):
+            game.place_letter(*EasyComputerOpponent(game.current_player).choose_move(game))
+        pondering = HardComputerOpponent(Player.BLUE, time_limit=None, max_depth=3)
+        fresh = HardComputerOpponent(Player.BLUE, time_limit=None, max_depth=3)
+        history = list(game.history)
+        predicted = pondering.ponder(game, threading.Event())
+        self.assertEqual(game.history, history)
+        game.place_letter(*predicted)
+        fresh.choose_move(game)
+        pondering.choose_move(game)
+        self.assertEqual(pondering.ponder_hits, 1)
+        self.assertEqual(pondering.depth_reached, 3)
+        self.assertLess(pondering.nodes, fresh.nodes)
+
+    def test_ponder_stops_on_event(self):
+        game = start_game(board_size=6, mode=Mode.GENERAL, starting_player=Player.RED)
+        computer = HardComputerOpponent(Player.BLUE, time_limit=None)
+        stop_event = threading.Event()
+        thread = threading.Thread(target=computer.ponder, args=(game, stop_event))
+        thread.start()
+        time.sleep(0.05)
+        stop_event.set()
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+        self.assertIsNotNone(computer.ponder_move)
+        self.assertIsNone(EasyComputerOpponent(Player.RED).ponder(game, stop_event))
+
+    def test_symmetry_shrinks_table(self):
+        sizes = {}
+        for symmetry in (False, True):
+            game = start_game(board_size=4, mode=Mode.GENERAL, starting_player=Player.RED)
+            computer = HardComputerOpponent(Player.RED, time_limit=None, max_depth=3, symmetry=symmetry)
+            computer.choose_move(game)
+            sizes[symmetry] = len(computer.table)
+        self.assertLess(sizes[True] * 2, sizes[False])
+
+class TestMCTSComputer(unittest.TestCase):
+    def test_takes_winning_move_simple(self):
+        game = start_game(board_size=3, mode=Mode.SIMPLE, starting_player=Player.RED)
+        game.place_letter(0, 0, "S")
+        game.place_letter(1, 1, "O")
+        computer = MCTSComputerOpponent(Player.RED, playouts=50, seed=1)
+        self.assertEqual(computer.choose_move(game), (2, 2, "S"))
+
+    def test_general_prefers_scoring(self):
+        game = start_game(board_size=4, mode=Mode.GENERAL, starting_player=Player.RED)
+        game.place_letter(0, 0, "S")
+        game.place_letter(3, 3, "O")
+        game.place_letter(0, 2, "S")
+        zobrist, history = game.zobrist, list(game.history)
+        computer = MCTSComputerOpponent(Player.BLUE, playouts=2000, time_limit=None, seed=3)
+        self.assertEqual(computer.choose_move(game), (0, 1, "O"))
+        self.assertEqual((game.zobrist, game.history), (zobrist, history))
+        self.assertEqual(computer.last_playouts, 2000)
+        self.assertGreater(computer.playouts_per_second, 0)
+
+    def test_parallel_workers(self):
+        game = start_game(board_size=4, mode=Mode.GENERAL, starting_player=Player.RED)
+        computer = MCTSComputerOpponent(Player.RED, playouts=200, time_limit=None, workers=2, seed=5)
+        try:
+            row, col, letter = computer.choose_move(game)
+        finally:
+            computer.close()
+        self.assertTrue(game.board.is_empty(row, col))
+        self.assertEqual(computer.last_playouts, 200)
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+from sos_logic import start_game, Mode, Player
+from sos_record import GameRecord, RecordWriter
+from tests.helpers import random_game
+
+try:
+    import numpy as np
+    from sos_dataset import PositionWriter, PositionDataset, export_records, position_dtype
+    from sos_batch import MAX_BATCH_SIZE
+except ImportError: #numpy is optional
+    np = None
+
+def random_record(board_size: int, mode: Mode, seed: int) -> GameRecord:
+    return GameRecord.from_game(random_game(board_size, mode, seed, (Player.RED, Player.BLUE)[seed % 2]))
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TestPositionDataset(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "positions.npy")
+        self.records = [random_record(4, mode, seed) for seed, mode in enumerate([Mode.GENERAL, Mode.SIMPLE] * 5)]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_rows_match_games(self):
+        with PositionWriter(self.path, 4, buffer_rows=7) as writer:
+            for record in self.records:
+                writer.add_record(record)
+        data = PositionDataset(self.path)
+        self.assertEqual(len(data), sum(len(r.moves) for r in self.records))
+        self.assertEqual(data.board_size, 4)
+
+        index = 0
+        for record in self.records:
+            game = start_game(board_size=4, mode=record.mode, starting_player=record.starting_player)
+            final = record.replay()
+            for row, col, letter in record.moves:
+                position = data.batch(index, index + 1)[0]
+                self.assertEqual(data.side_to_move(index), game.current_player)
+                self.assertEqual((position["red_score"], position["blue_score"]), (game.red_score, game.blue_score))
+                s_plane = [[cell == "S" for cell in r] for r in game.board.grid]
+                self.assertEqual(position["planes"][0].astype(bool).tolist(), s_plane)
+                self.assertEqual(divmod(int(position["move"]) // 2, 4), (row, col))
+                expected = 0 if final.winner is None else (1 if final.winner == game.current_player else -1)
+                self.assertEqual(position["outcome"], expected)
+                game.place_letter(row, col, letter)
+                index += 1
+
+    def test_batches_are_views(self):
+        export_records(self.records, self.path, 4)
+        data = PositionDataset(self.path)
+        batch = data.batch(3, 9)
+        self.assertIsInstance(data.data, np.memmap)
+        self.assertFalse(batch.flags.owndata)
+        self.assertTrue(np.shares_memory(batch, data.data))
+        self.assertEqual(data.field("planes", 3, 9).shape, (6, 2, 4, 4))
+        self.assertEqual(len(data.sample(np.random.default_rng(0), 5)), 5)
+
+    def test_export_from_record_file(self):
+        records_path = os.path.join(self.tmp.name, "games.sos")
+        with RecordWriter(records_path) as writer:
+            for record in self.records + [random_record(5, Mode.GENERAL, 99)]:
+                writer.write(record)
+        count = export_records(records_path, self.path, 4) #5x5 game is skipped
+        self.assertEqual(count, sum(len(r.moves) for r in self.records))
+        self.assertEqual(len(np.load(self.path, mmap_mode="r")), count)
+
+    def test_counts_fit_largest_board(self):
+        dtype = position_dtype(190)
+        for name in ("move_number", "red_score", "blue_score"):
+            self.assertGreaterEqual(np.iinfo(dtype[name]).max, 4 * MAX_BATCH_SIZE ** 2)
+        row = np.zeros(1, dtype=dtype)
+        row["move_number"] = 190 * 190 - 1
+        row["red_score"] = 40_000
+        self.assertEqual((int(row["move_number"][0]), int(row["red_score"][0])), (36_099, 40_000))
+        with self.assertRaises(ValueError):
+            PositionWriter(self.path, MAX_BATCH_SIZE + 1)
+
+    def test_wrong_size(self):
+        with PositionWriter(self.path, 3) as writer:
+            with self.assertRaises(ValueError):
+                writer.add_record(self.records[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,9 @@
+import copy
+import pickle
+import random
 import unittest
-from sos_logic import Board, InvalidBoardSizeError, MIN_N, MAX_N
+from sos_logic import Board, InvalidBoardSizeError, MIN_N, MAX_N, LARGE_MAX_N, build_triplet_table, start_game, Mode
+from sos_logic import geometry, PREBUILT_SIZES, _geometry_cache
 
 class TestBoardSize(unittest.TestCase):
     def test_valid_selection(self):
@@ -28,5 +32,128 @@ class TestBoardInit(unittest.TestCase):
             for c in range(n):
                 self.assertIsNone(b.grid[r][c]), f"Expected None at ({r}, {c})"
 
+class TestTripletTable(unittest.TestCase):
+    def test_triplet_counts(self):
+        #every line of 3 appears twice in s table and once in o table
+        for n in range(MIN_N, MAX_N + 1):
+            s_table, o_table = build_triplet_table(n)
+            lines = 2 * n * (n - 2) + 2 * (n - 2) * (n - 2)
+            self.assertEqual(sum(len(t) for t in s_table), 2 * lines)
+            self.assertEqual(sum(len(t) for t in o_table), lines)
+            #corner O never completes a line, center O of 3x3 sits in 4
+            self.assertEqual(len(o_table[0]), 0)
+        s_table, o_table = build_triplet_table(3)
+        self.assertEqual(len(o_table[4]), 4)
+        self.assertEqual(len(s_table[0]), 3)
+
+class TestBoardEmptyCells(unittest.TestCase):
+    def test_tracking(self):
+        b = Board(3)
+        self.assertEqual(b.filled_count, 0)
+        self.assertEqual(len(b.empty_cells()), 9)
+        b.place(1, 1, "O")
+        b.place(0, 2, "S")
+        self.assertEqual(b.filled_count, 2)
+        self.assertNotIn((1, 1), b.empty_cells())
+        self.assertEqual(sorted(b.empty_cells()), [(0, 0), (0, 1), (1, 0), (1, 2), (2, 0), (2, 1), (2, 2)])
+        self.assertFalse(b.is_full())
+
+    def test_undo_restores_order(self):
+        b = Board(4)
+        b.place(2, 2, "S")
+        before = b.empty_cells()
+        moves = [(0, 0), (3, 3), (1, 2), (0, 1)]
+        for row, col in moves:
+            b.place(row, col, "O")
+        for row, col in reversed(moves):
+            b.remove(row, col)
+        self.assertEqual(b.empty_cells(), before)
+
+    def test_remove_in_any_order(self):
+        rng = random.Random(4)
+        b = Board(5)
+        filled = []
+        for _ in range(300):
+            if filled and rng.random() < 0.45:
+                b.remove(*filled.pop(rng.randrange(len(filled))))
+            elif b.empty_cells():
+                row, col = rng.choice(b.empty_cells())
+                b.place(row, col, "S")
+                filled.append((row, col))
+            empty = b.empty_cells()
+            self.assertEqual(len(empty), len(set(empty)))
+            self.assertEqual(set(empty), {(r, c) for r in range(5) for c in range(5) if b.is_empty(r, c)})
+
+    def test_full_after_every_cell(self):
+        b = Board(3)
+        for row, col in b.empty_cells():
+            b.place(row, col, "O")
+        self.assertTrue(b.is_full())
+        self.assertEqual(b.empty_cells(), [])
+
+class TestLargeBoards(unittest.TestCase):
+    def test_configurable_max(self):
+        b = Board(32, max_size=LARGE_MAX_N)
+        self.assertEqual(len(b.cells), 32 * 32)
+        with self.assertRaises(InvalidBoardSizeError):
+            Board(33, max_size=32)
+        with self.assertRaises(InvalidBoardSizeError):
+            Board(LARGE_MAX_N + 1, max_size=LARGE_MAX_N + 1)
+
+    def test_grid_view(self):
+        b = Board(4)
+        b.place(1, 2, "S")
+        b.place(3, 0, "O")
+        self.assertEqual(b.grid[1][2], "S")
+        self.assertEqual(b.grid[3][0], "O")
+        self.assertEqual(sum(cell is None for row in b.grid for cell in row), 14)
+
+    def test_large_game_scores(self):
+        g = start_game(board_size=40, mode=Mode.GENERAL, max_size=LARGE_MAX_N)
+        g.place_letter(39, 37, "S")
+        g.place_letter(39, 38, "O")
+        g.place_letter(39, 39, "S")
+        self.assertEqual(g.red_score, 1)
+        self.assertEqual(g.lines[0].start, (39, 37))
+        self.assertEqual(g.lines[0].end, (39, 39))
+        self.assertEqual(g.scoring_moves(), [])
+
+class TestBoardCopy(unittest.TestCase):
+    def test_copies_share_tables(self):
+        game = start_game(board_size=5, mode=Mode.GENERAL)
+        for row, col, letter in [(0, 0, "S"), (0, 2, "S"), (0, 1, "O"), (4, 4, "O")]:
+            game.place_letter(row, col, letter)
+        for other in (copy.deepcopy(game), pickle.loads(pickle.dumps(game))):
+            self.assertIs(other.board.geometry, game.board.geometry)
+            self.assertIs(other.board.s_triplets, game.board.s_triplets)
+            self.assertEqual((other.board.grid, other.board.empty_cells(), list(other.lines), other.history),
+                             (game.board.grid, game.board.empty_cells(), list(game.lines), game.history))
+            self.assertEqual((other.zobrist, other.canonical_zobrist()), (game.zobrist, game.canonical_zobrist()))
+            other.place_letter(1, 1, "S")
+            other.unmake_move()
+            self.assertIsNone(game.board.get_cell(1, 1))
+            self.assertEqual(other.zobrist, other.compute_zobrist())
+
+class TestGeometry(unittest.TestCase):
+    def test_prebuilt_and_shared(self):
+        for n in PREBUILT_SIZES:
+            self.assertIn(n, _geometry_cache)
+        first = start_game(board_size=6, mode=Mode.SIMPLE)
+        second = start_game(board_size=6, mode=Mode.GENERAL)
+        self.assertIs(first.board.geometry, second.board.geometry)
+        self.assertIs(first.board.s_triplets, geometry(6).s_triplets)
+        self.assertIs(first._keys, second._keys)
+
+    def test_large_size_built_on_first_use(self):
+        shared = geometry(40)
+        self.assertIs(Board(40, LARGE_MAX_N).geometry, shared)
+        self.assertEqual((shared.s_triplets, shared.o_triplets), build_triplet_table(40))
+        #every triplet is a straight run of three in-bounds cells
+        for index, triplets in enumerate(shared.o_triplets):
+            row, col = divmod(index, 40)
+            for start, end in triplets:
+                (start_row, start_col), (end_row, end_col) = divmod(start, 40), divmod(end, 40)
+                self.assertEqual((start_row + end_row, start_col + end_col), (2 * row, 2 * col))
+
 if __name__ == '__main__':
     unittest.main()
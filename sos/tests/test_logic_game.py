@@ -1,8 +1,12 @@
 import unittest
+import random
 
-from sos_logic import (Mode, start_game, Board,
+from sos_logic import (Mode, start_game, Board, CompletedSOS, LinesView, pack_line, unpack_line,
     InvalidMoveError, MIN_N, DEFAULT_STARTING_PLAYER, InvalidLetterError, InvalidGameModeError,
-                       OutOfBoundsError, validate_mode, Player)
+                       OutOfBoundsError, validate_mode, Player, EMPTY, S_CELL, O_CELL)
+import pickle
+
+from tests.helpers import random_move
 
 class TestGameMode(unittest.TestCase):
     def test_valid_modes(self):
@@ -75,6 +79,17 @@ class TestInvalidMovesAndLetters(unittest.TestCase):
         with self.assertRaises(InvalidLetterError):
             self.g.place_letter(0, 0, "X")
 
+    def test_raw_letter_checked(self):
+        zobrist = self.g.zobrist
+        for letter in ("s", "x", ""):
+            with self.assertRaises(InvalidLetterError):
+                self.g.make_move(0, 0, letter)
+            with self.assertRaises(InvalidLetterError):
+                self.g.board.place(1, 1, letter)
+        self.assertEqual((self.g.history, self.g.zobrist, self.g.board.filled_count), ([], zobrist, 0))
+        self.assertEqual(len(self.g.board.empty_cells()), self.g.board_size ** 2)
+        self.assertIsNone(self.g.board.get_cell(0, 0))
+
 #logic/gui doesnt allow, for ac 3.2/2.1
 class TestInvalidMode(unittest.TestCase):
     def test_invalid_mode(self):
@@ -205,5 +220,208 @@ class TestCompletedSOSSegment(unittest.TestCase):
         self.assertEqual(segment.end, (0, 2))
         self.assertEqual(segment.player, Player.RED)
 
+#triplet table scoring matches a direct scan of the grid
+class TestNewLinesMatchesScan(unittest.TestCase):
+    @staticmethod
+    def scan(board, row, col, letter):
+        found = set()
+        for d_row, d_col in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+            for offset in (0, 1, 2):
+                start = (row - offset * d_row, col - offset * d_col)
+                cells = [(start[0] + k * d_row, start[1] + k * d_col) for k in range(3)]
+                if not all(board.in_bounds(*cell) for cell in cells):
+                    continue
+                values = [letter if cell == (row, col) else board.get_cell(*cell) for cell in cells]
+                if values == ["S", "O", "S"]:
+                    found.add((cells[0], cells[2]))
+        return found
+
+    def test_random_boards(self):
+        rng = random.Random(7)
+        for n in (3, 5, 8):
+            g = start_game(board_size=n, mode=Mode.GENERAL)
+            cells = [(row, col) for row in range(n) for col in range(n)]
+            rng.shuffle(cells)
+            for row, col in cells:
+                for r in range(n):
+                    for c in range(n):
+                        if not g.board.is_empty(r, c):
+                            continue
+                        for letter in ("S", "O"):
+                            lines = g.new_lines_from_move(r, c, letter, g.current_player)
+                            self.assertEqual({(s.start, s.end) for s in lines}, self.scan(g.board, r, c, letter))
+                g.place_letter(row, col, rng.choice("SO"))
+
+class TestScoringMoves(unittest.TestCase):
+    def test_matches_new_lines(self):
+        rng = random.Random(5)
+        for n in (3, 6, 8):
+            g = start_game(board_size=n, mode=Mode.GENERAL)
+            while not g.is_over:
+                expected = []
+                for row, col in sorted(g.board.empty_cells()):
+                    for letter in ("O", "S"):
+                        count = len(g.new_lines_from_move(row, col, letter, g.current_player))
+                        if count:
+                            expected.append((row, col, letter, count))
+                self.assertEqual(g.scoring_moves(), expected)
+                g.make_move(*random_move(g.board, rng))
+
+    def test_double_line(self):
+        g = start_game(board_size=3, mode=Mode.GENERAL)
+        for row, col in [(0, 0), (0, 2), (2, 0), (2, 2)]:
+            g.board.place(row, col, "S")
+        self.assertIn((1, 1, "O", 2), g.scoring_moves())
+        self.assertIn((0, 1, "O", 1), g.scoring_moves())
+
+#threat and gift counts recomputed from scratch, per cell and letter
+def brute_threats(board: Board) -> tuple[list[int], list[int], list[int], list[int]]:
+    cells = board.cells
+    counts = [[0] * len(cells) for _ in range(4)] #s threats, o threats, s gifts, o gifts
+    for index in range(len(cells)):
+        for _, _, far, mid in board.s_triplets[index]:
+            counts[0][index] += cells[far] == S_CELL and cells[mid] == O_CELL
+            counts[2][index] += ((cells[far] == S_CELL and cells[mid] == EMPTY)
+                                 or (cells[mid] == O_CELL and cells[far] == EMPTY))
+        for start, end in board.o_triplets[index]:
+            counts[1][index] += cells[start] == S_CELL and cells[end] == S_CELL
+            counts[3][index] += ((cells[start] == S_CELL and cells[end] == EMPTY)
+                                 or (cells[end] == S_CELL and cells[start] == EMPTY))
+    return tuple(counts)
+
+class TestThreatMap(unittest.TestCase):
+    def assertCounts(self, board: Board):
+        s_threats, o_threats, s_gifts, o_gifts = brute_threats(board)
+        self.assertEqual(list(board.s_threats), s_threats)
+        self.assertEqual(list(board.o_threats), o_threats)
+        self.assertEqual(list(board.s_gifts), s_gifts)
+        self.assertEqual(list(board.o_gifts), o_gifts)
+        empty = [i for i, code in enumerate(board.cells) if code == EMPTY]
+        self.assertEqual(board.open_threats, sum(s_threats[i] + o_threats[i] for i in empty))
+
+    def test_counts_follow_moves_and_undo(self):
+        rng = random.Random(11)
+        for n in (3, 5, 8):
+            g = start_game(board_size=n, mode=Mode.GENERAL)
+            while not g.is_over:
+                g.make_move(*random_move(g.board, rng))
+                self.assertCounts(g.board)
+                if rng.random() < 0.3:
+                    g.unmake_move()
+                    self.assertCounts(g.board)
+            while g.history:
+                g.unmake_move()
+            self.assertCounts(g.board)
+            self.assertFalse(any(g.board.s_gifts) or any(g.board.o_gifts))
+
+    def test_remove_out_of_order(self):
+        rng = random.Random(3)
+        board = Board(6)
+        filled = []
+        for _ in range(200):
+            if filled and rng.random() < 0.4:
+                board.remove(*filled.pop(rng.randrange(len(filled))))
+            elif board.empty_cells():
+                row, col, letter = random_move(board, rng)
+                board.place(row, col, letter)
+                filled.append((row, col))
+            self.assertCounts(board)
+
+    def test_gives_away_and_threats(self):
+        g = start_game(board_size=4, mode=Mode.GENERAL)
+        g.make_move(0, 0, "S")
+        self.assertTrue(g.board.gives_away(0, 1, "O"))
+        self.assertTrue(g.board.gives_away(0, 2, "S"))
+        self.assertFalse(g.board.gives_away(0, 1, "S"))
+        g.make_move(0, 1, "O")
+        self.assertEqual(g.board.threats(0, 2, "S"), 1)
+        self.assertEqual(g.board.open_threats, 1)
+        self.assertEqual(g.scoring_moves(), [(0, 2, "S", 1)])
+
+    def test_pickle_keeps_counts(self):
+        g = start_game(board_size=5, mode=Mode.SIMPLE)
+        for row, col, letter in [(0, 0, "S"), (4, 4, "O"), (2, 2, "O")]:
+            g.make_move(row, col, letter)
+        copy = pickle.loads(pickle.dumps(g))
+        self.assertCounts(copy.board)
+        copy.make_move(1, 1, "S")
+        self.assertCounts(copy.board)
+        self.assertEqual(list(g.board.s_threats), brute_threats(g.board)[0])
+
+class TestPackedLines(unittest.TestCase):
+    def test_round_trip(self):
+        for start, end in [((0, 0), (0, 2)), ((1, 3), (3, 3)), ((2, 2), (4, 4)), ((0, 4), (2, 2))]:
+            for player in Player:
+                line = CompletedSOS(start, end, player)
+                self.assertEqual(unpack_line(pack_line(line, 5), 5), line)
+        #reversed endpoints are stored in table order
+        self.assertEqual(unpack_line(pack_line(CompletedSOS((2, 2), (0, 4), Player.RED), 5), 5),
+                         CompletedSOS((0, 4), (2, 2), Player.RED))
+
+    def test_view_tracks_game(self):
+        g = start_game(board_size=3, mode=Mode.GENERAL, starting_player=Player.RED)
+        view = g.get_lines()
+        self.assertIsInstance(view, LinesView)
+        for row, col in [(0, 0), (2, 0), (0, 2), (2, 2)]:
+            g.place_letter(row, col, "S")
+        g.place_letter(1, 1, "O") #red completes both diagonals
+        self.assertEqual(len(view), 2)
+        self.assertEqual({(seg.start, seg.end) for seg in view}, {((0, 0), (2, 2)), ((0, 2), (2, 0))})
+        self.assertEqual(view[-1:], [view[1]])
+        self.assertEqual(len(view.packed()), 2)
+        with self.assertRaises(TypeError):
+            view.packed()[0] = 0
+
+    def test_view_equals_list(self):
+        g = start_game(board_size=3, mode=Mode.GENERAL, starting_player=Player.RED)
+        self.assertEqual(g.get_lines(), [])
+        self.assertTrue(g.get_lines() == [])
+        for row, col, letter in [(0, 0, "S"), (0, 1, "O"), (0, 2, "S")]:
+            g.place_letter(row, col, letter)
+        line = CompletedSOS((0, 0), (0, 2), Player.RED)
+        self.assertTrue(g.get_lines() == [line])
+        self.assertTrue(g.get_lines() == (line,))
+        self.assertTrue(g.get_lines() != [])
+        self.assertEqual(g.get_lines(), pickle.loads(pickle.dumps(g)).get_lines())
+
+#make_move/unmake_move restore every field
+class TestUnmakeMove(unittest.TestCase):
+    @staticmethod
+    def snapshot(g):
+        return ([row[:] for row in g.board.grid], sorted(g.board.empty_cells()),
+                g.board.filled_count, g.red_score, g.blue_score, list(g.lines), g.current_player, g.is_over, g.winner)
+
+    def test_unmake_restores_state(self):
+        rng = random.Random(3)
+        for mode in (Mode.SIMPLE, Mode.GENERAL):
+            g = start_game(board_size=4, mode=mode)
+            snapshots = []
+            while not g.is_over:
+                snapshots.append(self.snapshot(g))
+                g.make_move(*random_move(g.board, rng))
+            while snapshots:
+                g.unmake_move()
+                self.assertEqual(self.snapshot(g), snapshots.pop())
+            self.assertEqual(g.history, [])
+
+    def test_unmake_scoring_move(self):
+        g = start_game(board_size=3, mode=Mode.SIMPLE, starting_player=Player.RED)
+        g.place_letter(0, 0, "S")
+        g.place_letter(0, 1, "O")
+        self.assertEqual(g.make_move(0, 2, "S"), 1)
+        self.assertEqual(g.winner, Player.RED)
+        g.unmake_move()
+        self.assertFalse(g.is_over)
+        self.assertIsNone(g.winner)
+        self.assertEqual(g.red_score, 0)
+        self.assertEqual(list(g.lines), [])
+        self.assertEqual(g.current_player, Player.RED)
+        self.assertTrue(g.board.is_empty(0, 2))
+
+    def test_unmake_without_moves(self):
+        g = start_game(board_size=3, mode=Mode.GENERAL)
+        with self.assertRaises(InvalidMoveError):
+            g.unmake_move()
+
 if __name__ == '__main__':
     unittest.main()
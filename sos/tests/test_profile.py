@@ -0,0 +1,93 @@
+import random
+import unittest
+
+from sos_logic import start_game, Mode, Player, BaseGame, Board
+from sos_computer import EasyComputerOpponent, HardComputerOpponent, MCTSComputerOpponent
+import sos_profile
+from sos_profile import Profiler, CallStats, SearchStats
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.profiler = Profiler()
+
+    def tearDown(self):
+        self.profiler.disable()
+
+    def play(self, red, blue, board_size: int = 4):
+        game = start_game(board_size=board_size, mode=Mode.GENERAL, starting_player=Player.RED)
+        while not game.is_over:
+            player = red if game.current_player == Player.RED else blue
+            game.place_letter(*player.choose_move(game))
+        return game
+
+    def test_disabled_leaves_methods_untouched(self):
+        originals = (BaseGame.place_letter, BaseGame.new_lines_from_move, Board.is_full,
+                     HardComputerOpponent.choose_move)
+        self.profiler.enable()
+        self.assertIsNot(BaseGame.place_letter, originals[0])
+        self.profiler.disable()
+        self.assertEqual((BaseGame.place_letter, BaseGame.new_lines_from_move, Board.is_full,
+                          HardComputerOpponent.choose_move), originals)
+        self.assertFalse(self.profiler.enabled)
+
+    def test_counts_calls(self):
+        random.seed(2)
+        self.profiler.enable()
+        self.profiler.enable() #no double wrapping
+        game = self.play(EasyComputerOpponent(Player.RED), EasyComputerOpponent(Player.BLUE))
+        calls = self.profiler.to_dict()["calls"]
+        self.assertEqual(calls["place_letter"]["calls"], len(game.history))
+        self.assertEqual(calls["new_lines_from_move"]["calls"], len(game.history))
+        self.assertEqual(calls["choose_move:EasyComputerOpponent"]["calls"], len(game.history))
+        self.assertGreaterEqual(calls["is_full"]["calls"], len(game.history))
+        self.assertGreater(calls["place_letter"]["seconds"], 0)
+        self.assertEqual(self.profiler.to_dict()["searches"], {})
+        self.profiler.reset()
+        self.assertEqual(self.profiler.to_dict(), {"calls": {}, "searches": {}})
+
+    def test_search_nodes(self):
+        self.profiler.enable()
+        hard = HardComputerOpponent(Player.RED, time_limit=None, max_depth=2)
+        mcts = MCTSComputerOpponent(Player.BLUE, playouts=50, seed=1)
+        self.play(hard, mcts)
+        searches = self.profiler.to_dict()["searches"]
+        self.assertEqual(set(searches), {"HardComputerOpponent", "MCTSComputerOpponent"})
+        for stats in searches.values():
+            self.assertGreater(stats["nodes"], 0)
+            self.assertGreater(stats["nodes_per_second"], 0)
+        self.assertEqual(searches["MCTSComputerOpponent"]["last_nodes"], 50)
+        self.assertEqual(searches["HardComputerOpponent"]["last_nodes"], hard.nodes)
+
+    def test_prometheus_text(self):
+        self.profiler.enable()
+        self.play(HardComputerOpponent(Player.RED, time_limit=None, max_depth=1), EasyComputerOpponent(Player.BLUE))
+        text = self.profiler.prometheus()
+        self.assertIn("# TYPE sos_calls_total counter", text)
+        self.assertIn('sos_calls_total{function="place_letter"} 16', text)
+        self.assertIn('sos_search_nodes_per_second{opponent="HardComputerOpponent"}', text)
+        for line in text.splitlines():
+            if not line.startswith("#"):
+                name, value = line.rsplit(" ", 1)
+                float(value)
+
+    def test_prometheus_keeps_large_counts(self):
+        self.profiler.calls["place_letter"] = CallStats(12_345_678, 1234.5678901, 0.25)
+        self.profiler.searches["HardComputerOpponent"] = SearchStats(3, 98_765_432_101, 7.5)
+        text = self.profiler.prometheus()
+        self.assertIn('sos_calls_total{function="place_letter"} 12345678\n', text)
+        self.assertIn('sos_call_seconds_total{function="place_letter"} 1234.5678901\n', text)
+        self.assertIn('sos_search_nodes_total{opponent="HardComputerOpponent"} 98765432101\n', text)
+        self.assertIn(f'sos_search_nodes_per_second{{opponent="HardComputerOpponent"}} {98_765_432_101 / 7.5!r}\n',
+                      text)
+
+    def test_module_profiler(self):
+        shared = sos_profile.enable()
+        try:
+            self.assertIs(shared, sos_profile.profiler())
+            self.assertTrue(shared.enabled)
+        finally:
+            sos_profile.disable()
+        self.assertFalse(shared.enabled)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from sos_logic import Mode, Player
+from sos_record import (GameRecord, RecordWriter, RecordFormatError, read_records, replay_records, encode_record,
+                        move_width, MAGIC)
+from sos_selfplay import main as selfplay_main
+from tests.helpers import random_game
+
+class TestGameRecord(unittest.TestCase):
+    def test_from_game_replays(self):
+        game = random_game(5, Mode.GENERAL, 1, Player.BLUE)
+        record = GameRecord.from_game(game)
+        replayed = record.replay()
+        self.assertEqual(replayed.board.grid, game.board.grid)
+        self.assertEqual((replayed.red_score, replayed.blue_score, replayed.winner),
+                         (game.red_score, game.blue_score, game.winner))
+
+    def test_one_byte_per_move(self):
+        self.assertEqual(move_width(8), 1)
+        self.assertEqual(move_width(12), 2)
+        self.assertEqual(move_width(256), 3)
+        record = GameRecord.from_game(random_game(8, Mode.GENERAL, 2))
+        self.assertEqual(len(encode_record(record)), 2 + 1 + 64)
+
+class TestRecordFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.games = [random_game(size, mode, seed, player)
+                      for seed, (size, mode, player) in enumerate([(3, Mode.SIMPLE, Player.RED),
+                                                                   (8, Mode.GENERAL, Player.BLUE),
+                                                                   (12, Mode.SIMPLE, Player.BLUE),
+                                                                   (20, Mode.GENERAL, Player.RED)])]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def round_trip(self, name: str):
+        path = os.path.join(self.tmp.name, name)
+        with RecordWriter(path) as writer:
+            for game in self.games:
+                writer.write_game(game)
+        records = read_records(path)
+        self.assertEqual(next(records), GameRecord.from_game(self.games[0])) #lazy, one at a time
+        self.assertEqual(list(records), [GameRecord.from_game(g) for g in self.games[1:]])
+        for game, replayed in zip(self.games, replay_records(path)):
+            self.assertEqual((replayed.winner, replayed.red_score, replayed.blue_score),
+                             (game.winner, game.red_score, game.blue_score))
+        return path
+
+    def test_binary(self):
+        path = self.round_trip("games.sos")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(len(MAGIC)), MAGIC)
+
+    def test_jsonl(self):
+        self.round_trip("games.jsonl")
+
+    def test_append(self):
+        path = os.path.join(self.tmp.name, "games.sos")
+        for game in self.games:
+            with RecordWriter(path, append=True) as writer:
+                writer.write_game(game)
+        self.assertEqual(len(list(read_records(path))), len(self.games))
+
+    def test_truncated(self):
+        path = os.path.join(self.tmp.name, "bad.sos")
+        with open(path, "wb") as f:
+            f.write(MAGIC + encode_record(GameRecord.from_game(self.games[1]))[:-3])
+        with self.assertRaises(RecordFormatError):
+            list(read_records(path))
+
+    def test_selfplay_writes_records(self):
+        path = os.path.join(self.tmp.name, "selfplay.sos")
+        with redirect_stdout(io.StringIO()):
+            selfplay_main(["--games", "6", "--sizes", "4", "--modes", "general", "--workers", "1", "--record", path])
+        games = list(replay_records(path))
+        self.assertEqual(len(games), 6)
+        self.assertTrue(all(game.is_over for game in games))
+
+if __name__ == '__main__':
+    unittest.main()
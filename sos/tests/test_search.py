@@ -0,0 +1,129 @@
+import unittest
+import random
+
+from sos_logic import start_game, Mode, Player, SYMMETRIES, transform_cell, untransform_cell
+from sos_search import TranspositionTable, Bound
+from tests.helpers import random_move
+
+class TestZobristHash(unittest.TestCase):
+    def test_incremental_matches_full(self):
+        rng = random.Random(11)
+        for mode in (Mode.SIMPLE, Mode.GENERAL):
+            g = start_game(board_size=5, mode=mode)
+            hashes = [g.zobrist]
+            while not g.is_over:
+                g.make_move(*random_move(g.board, rng))
+                self.assertEqual(g.zobrist, g.compute_zobrist())
+                hashes.append(g.zobrist)
+            while g.history:
+                hashes.pop()
+                g.unmake_move()
+                self.assertEqual(g.zobrist, hashes[-1])
+
+    def test_transposed_moves_same_hash(self):
+        a = start_game(board_size=4, mode=Mode.SIMPLE)
+        b = start_game(board_size=4, mode=Mode.SIMPLE)
+        for row, col, letter in [(0, 0, "S"), (3, 3, "O"), (1, 2, "S"), (2, 0, "O")]:
+            a.make_move(row, col, letter)
+        for row, col, letter in [(1, 2, "S"), (2, 0, "O"), (0, 0, "S"), (3, 3, "O")]:
+            b.make_move(row, col, letter)
+        self.assertEqual(a.zobrist, b.zobrist)
+
+    def test_side_mode_and_score_change_hash(self):
+        red = start_game(board_size=3, mode=Mode.GENERAL, starting_player=Player.RED)
+        blue = start_game(board_size=3, mode=Mode.GENERAL, starting_player=Player.BLUE)
+        simple = start_game(board_size=3, mode=Mode.SIMPLE, starting_player=Player.RED)
+        self.assertNotEqual(red.zobrist, blue.zobrist)
+        self.assertNotEqual(red.zobrist, simple.zobrist)
+        #same cells, one side scored the line
+        a = start_game(board_size=3, mode=Mode.GENERAL, starting_player=Player.RED)
+        for row, col, letter in [(0, 0, "S"), (0, 1, "O"), (2, 2, "O"), (0, 2, "S")]:
+            a.make_move(row, col, letter)
+        b = start_game(board_size=3, mode=Mode.GENERAL, starting_player=Player.RED)
+        for row, col, letter in [(0, 0, "S"), (0, 1, "O"), (0, 2, "S"), (2, 2, "O")]:
+            b.make_move(row, col, letter)
+        self.assertEqual(a.current_player, b.current_player)
+        self.assertNotEqual(a.red_score - a.blue_score, b.red_score - b.blue_score)
+        self.assertNotEqual(a.zobrist, b.zobrist)
+
+class TestSymmetry(unittest.TestCase):
+    def test_transforms_invert(self):
+        for size in (3, 4, 5):
+            seen = set()
+            for transform in range(SYMMETRIES):
+                cells = tuple(transform_cell(transform, r, c, size) for r in range(size) for c in range(size))
+                self.assertEqual(len(set(cells)), size * size)
+                seen.add(cells)
+                for r in range(size):
+                    for c in range(size):
+                        self.assertEqual(untransform_cell(transform, *transform_cell(transform, r, c, size), size),
+                                         (r, c))
+            self.assertEqual(len(seen), SYMMETRIES)
+
+    def test_symmetric_positions_share_canonical(self):
+        rng = random.Random(4)
+        for mode in (Mode.SIMPLE, Mode.GENERAL):
+            moves = []
+            g = start_game(board_size=5, mode=mode)
+            for _ in range(7):
+                row, col, letter = random_move(g.board, rng)
+                g.make_move(row, col, letter)
+                moves.append((row, col, letter))
+            key, transform = g.canonical_zobrist()
+            cells, cell_transform = g.canonical()
+            for t in range(SYMMETRIES):
+                other = start_game(board_size=5, mode=mode)
+                for row, col, letter in moves:
+                    other.make_move(*transform_cell(t, row, col, 5), letter)
+                self.assertEqual(other.canonical_zobrist()[0], key)
+                self.assertEqual(other.canonical()[0], cells)
+            #canonical board is the real board moved by the transform
+            for row, col in [(r, c) for r in range(5) for c in range(5)]:
+                new_row, new_col = g.board.transform_cell(cell_transform, row, col)
+                self.assertEqual(cells[new_row * 5 + new_col], g.board.cells[row * 5 + col])
+
+    def test_symmetric_hashes_follow_moves(self):
+        rng = random.Random(8)
+        g = start_game(board_size=4, mode=Mode.GENERAL)
+        empty = g.board.sym_hashes
+        self.assertEqual(g.board.sym_hashes[0] ^ g._state_hash(), g.zobrist)
+        while not g.is_over:
+            g.make_move(*random_move(g.board, rng))
+            self.assertEqual(g.board.sym_hashes[0] ^ g._state_hash(), g.zobrist)
+        while g.history:
+            g.unmake_move()
+        self.assertEqual(g.board.sym_hashes, empty)
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_store_and_probe(self):
+        tt = TranspositionTable(capacity=100)
+        self.assertEqual(tt.capacity, 128)
+        tt.store(12345, 3, 7, Bound.LOWER, (0, 1, "S"))
+        entry = tt.probe(12345)
+        self.assertEqual((entry.depth, entry.value, entry.bound, entry.move), (3, 7, Bound.LOWER, (0, 1, "S")))
+        self.assertIsNone(tt.probe(12345 + 128)) #same slot, different key
+        self.assertEqual(len(tt), 1)
+        self.assertEqual((tt.probes, tt.hits), (2, 1))
+
+    def test_replacement_policy(self):
+        tt = TranspositionTable(capacity=16)
+        tt.store(1, 5, 10, Bound.EXACT)
+        tt.store(17, 2, 20, Bound.EXACT) #shallower collision in same search is dropped
+        self.assertIsNotNone(tt.probe(1))
+        tt.store(17, 6, 20, Bound.EXACT) #deeper collision replaces
+        self.assertIsNone(tt.probe(1))
+        self.assertEqual(tt.probe(17).value, 20)
+        tt.new_search()
+        tt.store(33, 1, 30, Bound.UPPER) #stale entry replaced by any depth
+        self.assertEqual(tt.probe(33).value, 30)
+
+    def test_same_key_keeps_move(self):
+        tt = TranspositionTable(capacity=16)
+        tt.store(5, 1, 0, Bound.EXACT, (1, 1, "O"))
+        tt.store(5, 2, 4, Bound.UPPER)
+        self.assertEqual(tt.probe(5).move, (1, 1, "O"))
+        tt.clear()
+        self.assertIsNone(tt.probe(5))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from itertools import islice
+
+from sos_logic import Mode, Player
+from sos_computer import EasyComputerOpponent, HardComputerOpponent
+from sos_selfplay import (parse_opponent, OpponentSpec, make_tasks, run_selfplay, run_task, play_game,
+                          Summary, main)
+
+class TestOpponentSpec(unittest.TestCase):
+    def test_parse_with_options(self):
+        spec = parse_opponent("Hard:time_limit=0.01,max_depth=2")
+        self.assertEqual(spec, OpponentSpec("hard", (("time_limit", 0.01), ("max_depth", 2))))
+        opponent = spec.build(Player.BLUE)
+        self.assertIsInstance(opponent, HardComputerOpponent)
+        self.assertEqual((opponent.side, opponent.max_depth), (Player.BLUE, 2))
+
+    def test_unknown_opponent(self):
+        with self.assertRaises(ValueError):
+            parse_opponent("grandmaster")
+
+class TestSelfPlay(unittest.TestCase):
+    def test_play_game_finishes(self):
+        result = play_game(EasyComputerOpponent(Player.RED), EasyComputerOpponent(Player.BLUE),
+                           board_size=4, mode=Mode.GENERAL)
+        self.assertEqual(len(result.moves), 16)
+        self.assertEqual(result.mode, Mode.GENERAL)
+
+    def test_tasks_cycle_and_alternate(self):
+        easy = parse_opponent("easy")
+        tasks = list(make_tasks(easy, easy, 8, [3, 4], [Mode.SIMPLE, Mode.GENERAL], seed=1))
+        self.assertEqual([(t.board_size, t.mode) for t in tasks[:4]],
+                         [(3, Mode.SIMPLE), (3, Mode.GENERAL), (4, Mode.SIMPLE), (4, Mode.GENERAL)])
+        self.assertEqual([t.starting_player for t in tasks[::4]], [Player.RED, Player.BLUE])
+
+    def test_seeded_games_repeat(self):
+        easy = parse_opponent("easy")
+        tasks = list(make_tasks(easy, easy, 6, [4], [Mode.GENERAL], seed=2))
+        first = [r.moves for r in run_selfplay(tasks)]
+        again = [run_task(task).moves for task in tasks]
+        self.assertEqual(first, again)
+
+    def test_parallel_matches_serial(self):
+        easy = parse_opponent("easy")
+        tasks = list(make_tasks(easy, easy, 10, [3, 5], [Mode.SIMPLE], seed=3))
+        serial = [(r.index, r.moves) for r in run_selfplay(tasks)]
+        parallel = [(r.index, r.moves) for r in run_selfplay(tasks, workers=2, chunksize=2)]
+        self.assertEqual(serial, parallel)
+
+    def test_parallel_streams_lazily(self):
+        easy = parse_opponent("easy")
+        read = []
+
+        def tasks():
+            for task in make_tasks(easy, easy, 100_000, [3], [Mode.SIMPLE]):
+                read.append(task.index)
+                yield task
+
+        results = run_selfplay(tasks(), workers=2, chunksize=4, window=3)
+        first = next(results)
+        self.assertEqual(first.index, 0)
+        #only the window of chunks has been read, not the whole run
+        self.assertLessEqual(len(read), 4 * 4)
+        self.assertEqual([r.index for r in islice(results, 20)], list(range(1, 21)))
+        self.assertLessEqual(len(read), 4 * 4 + 24)
+        results.close()
+
+class TestSelfPlayCli(unittest.TestCase):
+    def test_main_streams_and_summarizes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "games.jsonl")
+            stdout = io.StringIO()
+            summary = main(["--games", "12", "--sizes", "3", "4", "--modes", "simple", "general",
+                            "--workers", "1", "--out", path, "--json"], stdout=stdout)
+            with open(path) as f:
+                rows = [json.loads(line) for line in f]
+        self.assertIsInstance(summary, Summary)
+        self.assertEqual(summary.games, 12)
+        self.assertEqual(summary.red_wins + summary.blue_wins + summary.draws, 12)
+        self.assertEqual(len(rows), 12)
+        self.assertIn(rows[0]["winner"], ("red", "blue", None))
+        data = json.loads(stdout.getvalue())
+        self.assertAlmostEqual(data["red_win_rate"] + data["blue_win_rate"] + data["draw_rate"], 1.0)
+        self.assertGreater(data["games_per_second"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
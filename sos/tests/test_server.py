@@ -0,0 +1,128 @@
+import asyncio
+import json
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from sos_server import GameServer, LatencyStats, run_load_test
+
+class TestLatencyStats(unittest.TestCase):
+    def test_percentiles(self):
+        stats = LatencyStats(samples=1000)
+        for ms in range(1, 101):
+            stats.record(ms / 1000)
+        data = stats.to_json()
+        self.assertEqual(data["count"], 100)
+        self.assertAlmostEqual(data["p50_ms"], 51)
+        self.assertAlmostEqual(data["p99_ms"], 100)
+
+class TestGameServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.server = GameServer(port=0, executor=self.executor, time_limit=0.05)
+        await self.server.start()
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        await self.server.close()
+        self.executor.shutdown()
+
+    async def request(self, message: dict) -> dict:
+        self.writer.write(json.dumps(message).encode() + b"\n")
+        return await self.receive()
+
+    async def receive(self) -> dict:
+        return json.loads(await asyncio.wait_for(self.reader.readline(), timeout=5))
+
+    async def test_two_local_players(self):
+        game = await self.request({"type": "new", "board_size": 3, "mode": "general", "side": "both"})
+        self.assertEqual((game["type"], game["cells"], game["current_player"]), ("game", ["...", "...", "..."], "red"))
+        game_id = game["game"]
+        for row, col, letter in [(0, 0, "S"), (2, 2, "O"), (0, 1, "O")]:
+            update = await self.request({"type": "move", "game": game_id, "row": row, "col": col, "letter": letter})
+            self.assertEqual(update["moves"], [[row, col, letter, update["moves"][0][3]]])
+        update = await self.request({"type": "move", "game": game_id, "row": 0, "col": 2, "letter": "s"})
+        self.assertEqual(update["lines"], [[0, 0, 0, 2, "blue"]])
+        self.assertEqual((update["blue_score"], update["current_player"]), (1, "red"))
+
+        error = await self.request({"type": "move", "game": game_id, "row": 0, "col": 2, "letter": "O"})
+        self.assertEqual((error["type"], error["game"]), ("error", game_id))
+        error = await self.request({"type": "move", "game": 999, "row": 0, "col": 0, "letter": "S"})
+        self.assertEqual(error["message"], "Unknown game")
+        error = await self.request({"type": "new", "board_size": 2})
+        self.assertEqual(error["type"], "error")
+
+        state = await self.request({"type": "state", "game": game_id})
+        self.assertEqual(state["cells"][0], "SOS")
+        self.assertEqual((await self.request({"type": "close", "game": game_id}))["type"], "closed")
+        self.assertEqual(self.server.metrics()["games_active"], 0)
+
+    async def test_computer_pushes_moves(self):
+        game = await self.request({"type": "new", "board_size": 3, "mode": "simple", "side": "red",
+                                   "starting_player": "blue", "opponent": "easy"})
+        self.assertEqual(game["current_player"], "blue")
+        update = await self.receive() #computer moved first
+        self.assertEqual((len(update["moves"]), update["moves"][0][3], update["current_player"]), (1, "blue", "red"))
+        row, col = next((r, c) for r in range(3) for c in range(3) if [r, c] != update["moves"][0][:2])
+        mine = await self.request({"type": "move", "game": game["game"], "row": row, "col": col, "letter": "O"})
+        self.assertEqual(mine["moves"][0][:2], [row, col])
+        if not mine["is_over"]:
+            reply = await self.receive()
+            self.assertEqual(reply["moves"][0][3], "blue")
+        metrics = (await self.request({"type": "metrics"}))
+        self.assertGreaterEqual(metrics["computer_latency"]["count"], 1)
+        self.assertEqual(metrics["move_latency"]["count"], 1)
+
+    async def test_not_your_turn(self):
+        #keep both executor workers busy so the computer turn is still pending
+        release = threading.Event()
+        busy = [self.executor.submit(release.wait) for _ in range(2)]
+        game = await self.request({"type": "new", "board_size": 4, "side": "blue", "opponent": "easy"})
+        error = await self.request({"type": "move", "game": game["game"], "row": 0, "col": 0, "letter": "S"})
+        self.assertEqual(error["message"], "Not your turn")
+        release.set()
+        for future in busy:
+            future.result()
+        self.assertEqual((await self.receive())["current_player"], "blue")
+
+    async def test_one_side_needs_opponent(self):
+        error = await self.request({"type": "new", "board_size": 4, "side": "red"})
+        self.assertEqual((error["type"], error["message"]), ("error", "One sided game needs an opponent"))
+        self.assertEqual(self.server.sessions, {})
+
+    async def test_failing_opponent_drops_game(self):
+        game = await self.request({"type": "new", "board_size": 4, "side": "red", "starting_player": "blue",
+                                   "opponent": "easy:bogus=1"})
+        error = await self.receive()
+        self.assertEqual((error["type"], error["game"]), ("error", game["game"]))
+        self.assertEqual(self.server.sessions, {})
+        error = await self.request({"type": "state", "game": game["game"]})
+        self.assertEqual(error["message"], "Unknown game")
+
+    async def test_load_client(self):
+        result = await run_load_test("127.0.0.1", self.server.port, games=12, connections=4, board_size=4)
+        self.assertEqual((result.games, result.errors), (12, 0))
+        self.assertGreater(result.moves, 12)
+        metrics = self.server.metrics()
+        self.assertEqual((metrics["games_finished"], metrics["games_active"]), (12, 0))
+        self.assertEqual(metrics["move_latency"]["count"], result.moves)
+
+    async def test_load_client_counts_rejected_games(self):
+        result = await run_load_test("127.0.0.1", self.server.port, games=6, connections=2, board_size=4,
+                                     opponent=None)
+        self.assertEqual((result.games, result.errors, result.moves), (0, 6, 0))
+
+    async def test_disconnect_drops_games(self):
+        await self.request({"type": "new", "board_size": 5, "side": "both"})
+        self.assertEqual(len(self.server.sessions), 1)
+        self.writer.close()
+        await self.writer.wait_closed()
+        for _ in range(50):
+            if not self.server.sessions:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(self.server.sessions, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import random
+import tempfile
+import unittest
+
+from sos_logic import start_game, Mode, Player, BaseGame
+from sos_logic import symmetry_tables
+from sos_tablebase import solve, write_tablebase, Tablebase, canonical_key
+from sos_computer import PerfectComputerOpponent, EasyComputerOpponent
+from tests.helpers import random_game
+
+#plain negamax with no memo or symmetry, same value scale as the tablebase
+def brute_value(game: BaseGame) -> int:
+    best = None
+    for row, col in game.board.empty_cells():
+        for letter in "SO":
+            scored = game.make_move(row, col, letter)
+            if game.mode == Mode.SIMPLE and scored:
+                value = 1
+            elif game.board.is_full():
+                value = scored
+            else:
+                child = brute_value(game)
+                value = scored - child if game.mode == Mode.GENERAL else -child
+            game.unmake_move()
+            best = value if best is None else max(best, value)
+    return best
+
+class TestTablebase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.values = {}
+        cls.paths = {}
+        for mode in Mode:
+            cls.values[mode] = solve(3, mode)
+            cls.paths[mode] = os.path.join(cls.tmp.name, f"tb_3_{mode}.sostb")
+            write_tablebase(cls.paths[mode], 3, mode, cls.values[mode])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_symmetric_positions_share_key(self):
+        tables = symmetry_tables(3)
+        cells = bytes([1, 2, 0, 0, 1, 0, 0, 0, 2])
+        keys = {canonical_key(bytes(gather(cells)), tables.gathers) for gather in tables.gathers}
+        self.assertEqual(len(keys), 1)
+
+    def test_values_match_brute_force(self):
+        for mode in Mode:
+            table = Tablebase(self.paths[mode])
+            self.assertEqual(len(table), len(self.values[mode]))
+            for seed in range(30):
+                game = random_game(3, mode, seed, moves=4 + seed % 3)
+                if game.is_over:
+                    continue
+                self.assertEqual(table.lookup(game.board.cells), brute_value(game))
+            table.close()
+
+    def test_lookup_matches_solver(self):
+        table = Tablebase(self.paths[Mode.GENERAL])
+        for key, value in self.values[Mode.GENERAL].items():
+            self.assertEqual(table.get(key), value)
+        self.assertIsNone(table.get(3 ** 9))
+
+    def test_perfect_never_loses(self):
+        random.seed(5)
+        for mode in Mode:
+            for game_index in range(10):
+                perfect_side = Player.RED if game_index % 2 else Player.BLUE
+                perfect = PerfectComputerOpponent(perfect_side, self.paths[mode])
+                easy = EasyComputerOpponent(Player.BLUE if perfect_side == Player.RED else Player.RED)
+                game = start_game(board_size=3, mode=mode, starting_player=Player.RED)
+                while not game.is_over:
+                    player = perfect if game.current_player == perfect_side else easy
+                    game.place_letter(*player.choose_move(game))
+                #3x3 is a draw with best play
+                self.assertIn(game.winner, (None, perfect_side))
+
+    def test_wrong_board(self):
+        perfect = PerfectComputerOpponent(Player.RED, self.paths[Mode.SIMPLE])
+        game = start_game(board_size=4, mode=Mode.SIMPLE, starting_player=Player.RED)
+        with self.assertRaises(ValueError):
+            perfect.choose_move(game)
+
+if __name__ == '__main__':
+    unittest.main()
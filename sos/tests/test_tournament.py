@@ -0,0 +1,143 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from sos_logic import Mode, Player
+from sos_selfplay import parse_opponent
+from sos_tournament import (TournamentConfig, MatchResult, SWISS, run_tournament, swiss_pairs, bradley_terry,
+                            ratings, main)
+
+def result(index: int, red: str, blue: str, winner: Player | None, round_number: int = 0) -> MatchResult:
+    return MatchResult(index, round_number, red, blue, 3, Mode.SIMPLE, winner, 0, 0)
+
+class TestTournament(unittest.TestCase):
+    def setUp(self):
+        self.players = (parse_opponent("easy"), parse_opponent("hard:max_depth=1"), parse_opponent("hard:max_depth=2"))
+
+    def test_round_robin_schedule(self):
+        config = TournamentConfig(self.players, games_per_pair=2, sizes=(3,), modes=(Mode.SIMPLE, Mode.GENERAL))
+        results = run_tournament(config)
+        self.assertEqual([r.index for r in results], list(range(12)))
+        for first in config.names:
+            for second in config.names:
+                if first != second:
+                    #every pair plays both colors
+                    self.assertEqual(sum(1 for r in results if (r.red, r.blue) == (first, second)), 2)
+
+    def test_resume_from_checkpoint(self):
+        config = TournamentConfig(self.players, games_per_pair=2, sizes=(3,))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.jsonl")
+            full = run_tournament(config, checkpoint=path)
+            with open(path) as f:
+                lines = f.readlines()
+            #drop the last games and cut the final line short as if the run was killed mid write
+            with open(path, "w") as f:
+                f.writelines(lines[:3])
+                f.write(lines[3][:10])
+            resumed = run_tournament(config, checkpoint=path)
+            self.assertEqual(resumed, full)
+            with open(path) as f:
+                self.assertGreaterEqual(sum(1 for _ in f), len(full) + 1)
+
+    def test_checkpoint_skips_bad_lines(self):
+        config = TournamentConfig(self.players, games_per_pair=2, sizes=(3,))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.jsonl")
+            full = run_tournament(config, checkpoint=path)
+            with open(path) as f:
+                lines = f.readlines()
+            #a garbled line in the middle, later results kept, torn tail
+            with open(path, "w") as f:
+                f.writelines(lines[:3] + ["{garbled\n"] + lines[4:6])
+                f.write(lines[6][:10])
+            resumed = run_tournament(config, checkpoint=path)
+            self.assertEqual(resumed, full)
+            with open(path) as f:
+                lines = f.readlines()
+            #results after the garbled line were kept, only the missing ones were appended
+            self.assertEqual(lines[3], "{garbled\n")
+            stored = [MatchResult.from_json(json.loads(line)) for line in lines[1:3] + lines[4:]]
+            self.assertEqual(sorted(stored, key=lambda r: r.index), full)
+
+    def test_checkpoint_from_other_tournament(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.jsonl")
+            run_tournament(TournamentConfig(self.players[:2], games_per_pair=1), checkpoint=path)
+            with self.assertRaises(ValueError):
+                run_tournament(TournamentConfig(self.players, games_per_pair=1), checkpoint=path)
+
+    def test_swiss_avoids_rematches(self):
+        names = ["a", "b", "c", "d"]
+        first = swiss_pairs(names, [])
+        self.assertEqual(first, [(0, 1), (2, 3)])
+        played = [result(0, "a", "b", Player.RED), result(1, "c", "d", Player.RED)]
+        second = swiss_pairs(names, played)
+        self.assertEqual(second, [(0, 2), (1, 3)])
+
+    def test_swiss_bye_rotates(self):
+        names = ["a", "b", "c"]
+        pairs = swiss_pairs(names, [])
+        self.assertEqual(pairs, [(0, 1)])
+        pairs = swiss_pairs(names, [result(0, "a", "b", None)])
+        self.assertIn(2, pairs[0])
+
+    def test_swiss_byes_spread_over_rounds(self):
+        names = ["a", "b", "c", "d", "e"]
+        played = []
+        byes = []
+        for round_number in range(5):
+            pairs = swiss_pairs(names, played)
+            byes.extend(set(range(5)) - {i for pair in pairs for i in pair})
+            for red, blue in pairs:
+                played.append(result(len(played), names[red], names[blue], Player.RED, round_number))
+        self.assertEqual(sorted(byes), [0, 1, 2, 3, 4])
+
+    def test_swiss_rounds(self):
+        config = TournamentConfig(self.players + (parse_opponent("mcts:playouts=20"),), format=SWISS, rounds=3,
+                                  games_per_pair=1)
+        results = run_tournament(config)
+        self.assertEqual(len(results), 6)
+        self.assertEqual(sorted({r.round for r in results}), [0, 1, 2])
+
+class TestRatings(unittest.TestCase):
+    def test_bradley_terry_orders_players(self):
+        results = []
+        for index in range(30):
+            results.append(result(index, "strong", "weak", Player.RED if index % 5 else Player.BLUE))
+        for index in range(30, 40):
+            results.append(result(index, "weak", "draws", None))
+        elo = bradley_terry(["strong", "weak", "draws"], results)
+        self.assertGreater(elo["strong"], elo["draws"])
+        self.assertAlmostEqual(elo["draws"], elo["weak"], delta=40)
+        self.assertAlmostEqual(sum(elo.values()), 0, places=6)
+        #4 wins in 5 is about 240 elo, the prior pulls it in a little
+        self.assertAlmostEqual(elo["strong"] - elo["weak"], 240, delta=40)
+
+    def test_intervals_contain_rating(self):
+        results = [result(i, "a", "b", Player.RED if i % 3 else Player.BLUE) for i in range(60)]
+        rows = ratings(["a", "b"], results, bootstrap=50)
+        self.assertEqual([r.name for r in rows], ["a", "b"])
+        for row in rows:
+            self.assertEqual(row.games, 60)
+            self.assertLessEqual(row.low, row.elo)
+            self.assertGreaterEqual(row.high, row.elo)
+            self.assertLess(row.low, row.high)
+        self.assertEqual(rows[0].points, 40)
+
+    def test_result_json_round_trip(self):
+        for winner in (Player.RED, Player.BLUE, None):
+            original = result(3, "a", "b", winner)
+            self.assertEqual(MatchResult.from_json(json.loads(json.dumps(original.to_json()))), original)
+
+    def test_main_prints_json(self):
+        out = io.StringIO()
+        main(["--player", "easy", "--player", "hard:max_depth=1", "--games-per-pair", "2", "--workers", "1",
+              "--bootstrap", "10", "--json"], stdout=out)
+        rows = json.loads(out.getvalue())
+        self.assertEqual({row["name"] for row in rows}, {"easy", "hard:max_depth=1"})
+
+if __name__ == '__main__':
+    unittest.main()